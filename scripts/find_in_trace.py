@@ -1,23 +1,18 @@
 #!/usr/bin/env python3
-import zipfile, sys
+# Old one-pattern command line and text output (first match per member, 3 lines before and 2
+# after) on top of trace_query.py, which takes many patterns/regexes/zips and writes NDJSON.
+import os, sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from trace_query import TraceQuery  # noqa: E402
 if len(sys.argv) < 3:
     print('Usage: find_in_trace.py <trace.zip> <pattern>')
     sys.exit(2)
 zipf=sys.argv[1]
 pat=sys.argv[2].lower()
 print('Searching',zipf,'for',pat)
-with zipfile.ZipFile(zipf) as z:
-    for name in z.namelist():
-        try:
-            data=z.read(name).decode('utf-8',errors='ignore')
-        except Exception:
-            continue
-        if pat in data.lower():
-            print('\n--',name)
-            for i,line in enumerate(data.splitlines()):
-                if pat in line.lower():
-                    start=max(0,i-3)
-                    end=min(i+3,len(data.splitlines()))
-                    for l in data.splitlines()[start:end]:
-                        print(l)
-                    break
+query=TraceQuery([pat], context=3, include_binary=True, max_count=1)
+for rec in query.query_zip(zipf):
+    if rec['type']=='match':
+        print('\n--',rec['member'])
+        for l in rec['before']+[rec['text']]+rec['after'][:2]:
+            print(l)
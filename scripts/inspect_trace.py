@@ -1,25 +1,27 @@
 #!/usr/bin/env python3
-import zipfile, sys
+import os, sys, zipfile
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from trace_scan import SignalMatcher, iter_chunks, read_spans  # noqa: E402
 if len(sys.argv) < 2:
     print('Usage: inspect_trace.py <trace.zip>'); sys.exit(2)
 zipf = sys.argv[1]
 keywords = ['CI: SSR initialUser','CI: SSR PROBE','test-user-server','data-role="admin"','x-e2e-ssr-probe','/api/test/set-test-user','set-cookie','__ssr_probe','__test_user']
+# one case-insensitive streaming pass per member finds the first offset of every keyword, a second
+# one reads the snippets around them; binary members are skipped (trace_scan.py)
+matcher = SignalMatcher(keywords)
 print('Opening', zipf)
 try:
     with zipfile.ZipFile(zipf) as z:
         for name in z.namelist():
-            try:
-                data=z.read(name).decode('utf-8',errors='ignore')
-            except Exception:
-                continue
-            found=[k for k in keywords if k.lower() in data.lower()]
+            hits = matcher.find_stream(iter_chunks(z, name))
+            found = [k for k in keywords if k in hits]
             if found:
                 print('\n---',name,'contains',found)
+                ordered = sorted(found, key=hits.get)
+                spans = read_spans(iter_chunks(z, name), [(max(0, hits[k]-200), hits[k]+200) for k in ordered])
+                snippets = dict(zip(ordered, spans))
                 for k in found:
-                    idx = data.lower().find(k.lower())
-                    start=max(0,idx-200)
-                    end=min(len(data), idx+200)
-                    snippet = data[start:end].replace('\n','\\n')
+                    snippet = snippets[k].decode('utf-8', errors='ignore').replace('\n','\\n')
                     print('  *',k, '->', snippet)
 except Exception as e:
     print('Error reading zip', e)
@@ -1,5 +1,17 @@
 #!/usr/bin/env python3
 import os, zipfile, json, sys
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from trace_scan import SignalScanner  # noqa: E402
+
+# every signature is matched case-insensitively in one pass per member (trace_scan.py)
+SIGNALS={
+    'probe': [('__ssr_probe=',)],
+    'cookie_on_probe': [('test_user','__ssr_probe')],
+    'server_log': [('CI: SSR initialUser',)],
+    # fallback Set-Cookie in response headers
+    'fallback': [('/api/test/set-test-user',), ('set-cookie','test_user')],
+}
+scanner=SignalScanner(SIGNALS)
 root=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'artifacts', 'playwright-report', 'test-results')
 rows=[]
 for entry in sorted(os.listdir(root)):
@@ -9,32 +21,12 @@ for entry in sorted(os.listdir(root)):
     zipf=os.path.join(d,'trace.zip')
     if not os.path.isfile(zipf):
         continue
-    probe_found=False
-    cookie_on_probe=False
-    server_log_present=False
-    fallback_hit=False
     try:
-        with zipfile.ZipFile(zipf) as z:
-            for name in z.namelist():
-                try:
-                    data=z.read(name).decode('utf-8',errors='ignore')
-                except Exception:
-                    continue
-                if '__ssr_probe=' in data:
-                    probe_found=True
-                if 'test_user' in data and '__ssr_probe' in data:
-                    cookie_on_probe=True
-                if 'CI: SSR initialUser' in data:
-                    server_log_present=True
-                if '/api/test/set-test-user' in data:
-                    fallback_hit=True
-                # fallback Set-Cookie in response headers
-                if 'set-cookie' in data.lower() and 'test_user' in data:
-                    fallback_hit=True
+        hit=scanner.scan_zip(zipf)
     except Exception as e:
         rows.append((entry,'error',str(e)))
         continue
-    rows.append((entry,'yes' if probe_found else 'no','yes' if cookie_on_probe else 'no','yes' if server_log_present else 'no','yes' if fallback_hit else 'no'))
+    rows.append((entry,)+tuple('yes' if k in hit else 'no' for k in SIGNALS))
 
 outf=os.path.join(os.path.dirname(os.path.dirname(__file__)), 'artifacts', 'trace-scan-results.md')
 with open(outf,'w',encoding='utf-8') as f:
@@ -1,75 +1,151 @@
 #!/usr/bin/env python3
-import os, zipfile, sys, json
+import argparse, os, zipfile, sys, json
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+from trace_index import INDEX_NAME, TraceIndex, scan_members, zip_crc  # noqa: E402
+from trace_scan import SignalScanner  # noqa: E402
 
-def scan(root):
+# row columns after the test name; every signature is matched case-insensitively (trace_scan.py)
+SIGNALS={
+    'probe': [('__ssr_probe=',), ('x-e2e-ssr-probe',)],
+    'cookie_on_probe': [('test_user','__ssr_probe')],
+    'server_log': [('CI: SSR initialUser',), ('CI: SSR PROBE RECEIVED',), ('CI: SSR PROBE',), ('test/ssr-probe:',), ('/api/test/ssr-probe',)],
+    'fallback': [('/api/test/set-test-user',), ('/api/test/ssr-probe',), ('set-cookie','test_user')],
+    # request headers may include x-e2e-ssr-probe
+    'probe_header': [('x-e2e-ssr-probe',)],
+}
+scanner=SignalScanner(SIGNALS)
+
+def find_trace(d):
+    # Find trace.zip in directory or nested
+    for p in [os.path.join(d,'trace.zip'), os.path.join(d,'trace','trace.zip')]:
+        if os.path.isfile(p):
+            return p
+    # also try to find any .zip within
+    for fn in os.listdir(d):
+        if fn.endswith('.zip'):
+            return os.path.join(d,fn)
+    return None
+
+def scan_trace(entry, zipf):
+    """One result row; a corrupt or unreadable zip becomes an error row."""
+    try:
+        hit=scanner.scan_zip(zipf)
+    except Exception as e:
+        return (entry,'error',str(e))
+    return (entry,)+tuple('yes' if k in hit else 'no' for k in SIGNALS)
+
+def scan_trace_indexed(entry, zipf, stored_crc, stored_row, known):
+    """scan_trace against index data: (row, crc, member records, or None if the stored row holds)."""
+    try:
+        with zipfile.ZipFile(zipf) as z:
+            crc=zip_crc(z)
+            if stored_row is not None and crc==stored_crc:
+                return stored_row, crc, None
+            hit, members=scan_members(scanner, z, known)
+    except Exception as e:
+        return (entry,'error',str(e)), None, []
+    return (entry,)+tuple('yes' if k in hit else 'no' for k in SIGNALS), crc, members
+
+def scan(root, workers=None, index=None):
+    """Rows for every rbac test-result directory under root, in sorted entry order.
+
+    Zips are scanned in a process pool (`workers` processes, default one per zip up to the CPU
+    count; 1 scans serially). Rows are collected in submission order, not completion order. A zip
+    whose worker raises gets an error row. If a worker process dies, the pool is broken for every
+    unfinished zip; those are retried one per fresh single-worker pool, so only the zip that kills
+    its worker again gets an error row and the rest of the sweep goes on.
+
+    With a TraceIndex, zips whose size and mtime are unchanged take their row from the index and
+    are never submitted; the rest are rescanned (reusing unchanged members) and stored back.
+    Error rows are not stored, so a zip that failed is scanned again on the next run.
+    """
     rows=[]
+    jobs=[]
+    seen=[]
     for entry in sorted(os.listdir(root)):
         if 'rbac-Role-Based-Access-Con' not in entry:
             continue
-        d=os.path.join(root,entry)
-        # Find trace.zip in directory or nested
-        zipf=None
-        for p in [os.path.join(d,'trace.zip'), os.path.join(d,'trace','trace.zip')]:
-            if os.path.isfile(p):
-                zipf=p
-                break
-        if not zipf:
-            # also try to find any .zip within
-            for fn in os.listdir(d):
-                if fn.endswith('.zip'):
-                    zipf=os.path.join(d,fn)
-                    break
+        zipf=find_trace(os.path.join(root,entry))
         if not zipf:
             rows.append((entry,'no-trace','no','no','no'))
             continue
-        probe_found=False
-        cookie_on_probe=False
-        server_log_present=False
-        fallback_hit=False
-        probe_header_in_req=False
-        try:
-            with zipfile.ZipFile(zipf) as z:
-                for name in z.namelist():
-                    try:
-                        data=z.read(name).decode('utf-8',errors='ignore')
-                    except Exception:
-                        continue
-                    if '__ssr_probe=' in data or 'x-e2e-ssr-probe' in data:
-                        probe_found=True
-                    if 'test_user' in data and '__ssr_probe' in data:
-                        cookie_on_probe=True
-                    if 'CI: SSR initialUser' in data or 'CI: SSR PROBE RECEIVED' in data or 'CI: SSR PROBE' in data or 'test/ssr-probe:' in data or '/api/test/ssr-probe' in data:
-                        server_log_present=True
-                    if '/api/test/set-test-user' in data or '/api/test/ssr-probe' in data:
-                        fallback_hit=True
-                    if 'set-cookie' in data.lower() and 'test_user' in data:
-                        fallback_hit=True
-                    # request headers may include x-e2e-ssr-probe
-                    if 'x-e2e-ssr-probe' in data.lower():
-                        probe_header_in_req=True
-        except Exception as e:
-            rows.append((entry,'error',str(e)))
-            continue
-        rows.append((entry,'yes' if probe_found else 'no','yes' if cookie_on_probe else 'no','yes' if server_log_present else 'no','yes' if fallback_hit else 'no','yes' if probe_header_in_req else 'no'))
+        seen.append(zipf)
+        args=(entry,zipf)
+        if index is not None:
+            row,crc=index.lookup(zipf)
+            if row is not None:
+                rows.append(row)
+                continue
+            args=(entry,zipf,crc,index.stored_row(zipf) if crc is not None else None,index.known_members(zipf))
+        jobs.append((len(rows),args))
+        rows.append(None)
+
+    def done(i,args,result):
+        if index is None:
+            rows[i]=result
+            return
+        rows[i],crc,members=result
+        if crc is not None:
+            # error rows (crc None) are not stored: the failure may be transient, so rescan next run
+            index.store(args[1],crc,rows[i],members)
+
+    fn=scan_trace if index is None else scan_trace_indexed
+    if workers is None:
+        workers=min(len(jobs), os.cpu_count() or 1)
+    if workers<=1 or len(jobs)<=1:
+        for i,args in jobs:
+            done(i,args,fn(*args))
+    else:
+        retry=[]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures=[(i,args,pool.submit(fn,*args)) for i,args in jobs]
+            for i,args,future in futures:
+                try:
+                    done(i,args,future.result())
+                except BrokenProcessPool:
+                    retry.append((i,args))
+                except Exception as e:
+                    rows[i]=(args[0],'error',f'{type(e).__name__}: {e}')
+        # a dead worker breaks the whole pool: isolate each unfinished zip so one bad zip costs one row
+        for i,args in retry:
+            try:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    done(i,args,pool.submit(fn,*args).result())
+            except Exception as e:
+                rows[i]=(args[0],'error',f'{type(e).__name__}: {e}')
+    if index is not None:
+        index.prune(root,set(seen))
     return rows
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print('Usage: scan_traces_ci.py <path-to-ci-artifacts-dir>')
-        sys.exit(2)
-    root=sys.argv[1]
-    if not os.path.isdir(root):
-        print('Dir not found',root); sys.exit(2)
-    rows=scan(root)
-    outf=os.path.join(root,'trace-scan-results-ci.md')
+def write_results(rows, outf):
     with open(outf,'w',encoding='utf-8') as f:
         f.write('| test name | probe nav present? | cookie on probe? | server log? | fallback hit? | probe header in trace? |\n')
         f.write('|---|---:|---:|---:|---:|---:|\n')
         for r in rows:
             if len(r)==6:
-                f.write(f'| `{r[0]}` | {r[1]} | {r[2]} | {r[3]} | {r[4]} | {r[5]} |\\n')
+                f.write(f'| `{r[0]}` | {r[1]} | {r[2]} | {r[3]} | {r[4]} | {r[5]} |\n')
             else:
-                f.write(f'| `{r[0]}` | error | error | error | {r[1]} |\\n')
+                f.write(f'| `{r[0]}` | error | error | error | {r[1]} |\n')
+
+if __name__ == '__main__':
+    parser=argparse.ArgumentParser(description='Scan rbac trace.zip files under a CI artifacts dir')
+    parser.add_argument('root', help='path to the CI artifacts dir')
+    parser.add_argument('--workers', type=int, help='Processes used to scan zips (default: one per zip, up to CPU count; 1 for serial)')
+    parser.add_argument('--index', help=f'SQLite index of earlier scans (default: <root>/{INDEX_NAME})')
+    parser.add_argument('--no-index', action='store_true', help='Scan every zip and do not read or write the index')
+    args=parser.parse_args()
+    root=args.root
+    if not os.path.isdir(root):
+        print('Dir not found',root); sys.exit(2)
+    index=None if args.no_index else TraceIndex(args.index or os.path.join(root,INDEX_NAME), SIGNALS)
+    rows=scan(root, workers=args.workers, index=index)
+    outf=os.path.join(root,'trace-scan-results-ci.md')
+    write_results(rows, outf)
     print('WROTE',outf)
+    if index is not None:
+        print('INDEX',index.path,'reused',index.hits,'scanned',index.misses)
+        index.close()
     for r in rows:
         print(r)
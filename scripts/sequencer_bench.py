@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+Sequencer benchmark suite
+
+Usage:
+  python scripts/sequencer_bench.py                                 # default shapes at 1k and 10k
+  python scripts/sequencer_bench.py --sizes 1000,100000,1000000 --shapes chain,wide
+  python scripts/sequencer_bench.py --save-baseline bench.json      # record a baseline
+  python scripts/sequencer_bench.py --baseline bench.json           # fail (exit 1) on regressions
+  python scripts/sequencer_bench.py --baseline                      # compare with the committed baseline
+  python scripts/sequencer_bench.py --baseline --fail-on memory     # report timings, fail only on peak memory
+  python scripts/sequencer_bench.py --repeat 10                     # best of 10 timing passes (default 3)
+
+Generates synthetic parser-output findings in several graph shapes, runs each sequencer stage
+(ingest, streaming ingest, build_graph, detect_cycles, schedule_patches) and reports per-stage
+wall time, time per finding and peak memory (tracemalloc). Timings are taken without tracemalloc
+running and each stage reports the fastest of several passes; peak memory is measured in a separate
+pass so tracing overhead does not distort the wall times. Peak memory is deterministic for a given
+Python, wall times are not (they vary by up to ~2x between processes on shared runners, even as the
+best of several passes), so CI gates on memory and only reports timing changes.
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import (  # noqa: E402
+    build_compact_graph,
+    build_graph,
+    clear_dependency_cache,
+    detect_cycles,
+    parse_json_findings,
+    schedule_patches,
+)
+
+
+# committed reference run (default sizes and shapes); `make bench-baseline` refreshes it
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sequencer_bench_baseline.json')
+
+CLASSES = ['Additive', 'Corrective', 'Destructive']
+IMPACTS = ['low', 'medium', 'high']
+
+
+def _finding(i: int, deps: List[str]) -> Dict:
+    return {
+        'id': f'B-{i}',
+        'classification': CLASSES[i % 3],
+        'confidence': 50 + (i * 7) % 50,
+        'impact': IMPACTS[(i // 3) % 3],
+        'object_type': 'table',
+        'schema': 'public',
+        'object_name': f'obj{i}',
+        'dependencies': deps,
+    }
+
+
+# --- synthetic findings generators -------------------------------------------------------------
+
+def gen_wide(n: int) -> List[Dict]:
+    """n independent findings: one huge first layer."""
+    return [_finding(i, []) for i in range(n)]
+
+
+def gen_chain(n: int) -> List[Dict]:
+    """Each finding depends on the previous one: n layers of width 1."""
+    return [_finding(i, [f'public.obj{i - 1}'] if i else []) for i in range(n)]
+
+
+def gen_diamond(n: int) -> List[Dict]:
+    """Stacked diamonds (top -> left/right -> bottom -> next top)."""
+    out = []
+    for i in range(n):
+        r = i % 4
+        if r == 0:
+            deps = [f'public.obj{i - 1}'] if i else []
+        elif r in (1, 2):
+            deps = [f'public.obj{i - r}']
+        else:
+            deps = [f'public.obj{i - 2}', f'public.obj{i - 1}']
+        out.append(_finding(i, deps))
+    return out
+
+
+def gen_cycles(n: int, ring: int = 3) -> List[Dict]:
+    """Disjoint rings of `ring` findings each: n // ring strongly connected components."""
+    out = []
+    for i in range(n):
+        base = i - i % ring
+        nxt = base + (i - base + 1) % ring
+        out.append(_finding(i, [f'public.obj{nxt}'] if nxt < n and nxt != i else []))
+    return out
+
+
+def gen_legacy(n: int) -> List[Dict]:
+    """Chain-shaped findings spread across every legacy field alias map_finding_to_patch accepts."""
+    out = []
+    for i in range(n):
+        v = i % 4
+        prev = f'obj{i - 1}'
+        f: Dict = {}
+        if v == 0:
+            f['finding_id'] = f'B-{i}'
+            f['class'] = CLASSES[i % 3].lower()
+            f['confidence_score'] = 60
+            f['severity'] = 'Low'
+            f['creates'] = [{'object_schema': 'public', 'object_name': f'obj{i}', 'object_type': 'table'}]
+            f['depends_on'] = [{'schema_name': 'public', 'object_id': prev, 'type': 'table'}] if i else []
+        elif v == 1:
+            f['id'] = f'B-{i}'
+            f['classification'] = CLASSES[i % 3]
+            f['estimated_impact'] = 'medium'
+            f['affected'] = [{'schema': 'public', 'object': f'obj{i}', 'kind': 'table'}]
+            f['dependencies'] = [f'public.{prev}:table']
+        elif v == 2:
+            f['name'] = f'obj{i}'
+            f['classification'] = CLASSES[i % 3]
+            f['confidence'] = '70'
+            f['affected_objects'] = [f'public.obj{i}']
+            f['depends_on'] = [f'public.{prev}']
+        else:
+            # no id at all: exercises the auto-id fallback
+            f['classification'] = CLASSES[i % 3]
+            f['object_name'] = f'obj{i}'
+            f['kind'] = 'table'
+            f['dependencies'] = [{'object_schema': 'public', 'object_name': prev, 'object_type': 'table'}]
+        out.append(f)
+    return out
+
+
+GENERATORS: Dict[str, Callable[[int], List[Dict]]] = {
+    'wide': gen_wide,
+    'chain': gen_chain,
+    'diamond': gen_diamond,
+    'cycles': gen_cycles,
+    'legacy': gen_legacy,
+}
+
+
+# --- stages -----------------------------------------------------------------------------------
+# Each stage takes the shared context dict, may add to it, and is timed on its own.
+
+def _stage_ingest(ctx):
+    ctx['patches'] = parse_json_findings(ctx['path'])
+
+
+def _stage_ingest_stream(ctx):
+    parse_json_findings(ctx['path'], stream=True)
+
+
+def _stage_build_graph(ctx):
+    ctx['nodes'], ctx['edges'], _, _ = build_graph(ctx['patches'])
+
+
+def _stage_build_compact_graph(ctx):
+    build_compact_graph(ctx['patches'])
+
+
+def _stage_detect_cycles(ctx):
+    detect_cycles(ctx['nodes'], ctx['edges'])
+
+
+def _stage_schedule(ctx):
+    schedule_patches(ctx['patches'])
+
+
+STAGES: List[Tuple[str, Callable[[Dict], None]]] = [
+    ('ingest', _stage_ingest),
+    ('ingest_stream', _stage_ingest_stream),
+    ('build_graph', _stage_build_graph),
+    ('build_compact_graph', _stage_build_compact_graph),
+    ('detect_cycles', _stage_detect_cycles),
+    ('schedule_patches', _stage_schedule),
+]
+
+
+def _run_stages(path: str, memory: bool) -> Dict[str, float]:
+    # every pass starts from the same state: no shared Dependency instances, no pending garbage
+    clear_dependency_cache()
+    gc.collect()
+    ctx = {'path': path}
+    out = {}
+    for name, fn in STAGES:
+        if memory:
+            tracemalloc.start()
+            fn(ctx)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            out[name] = peak
+        else:
+            t0 = time.perf_counter()
+            fn(ctx)
+            out[name] = time.perf_counter() - t0
+    return out
+
+
+def run_case(shape: str, size: int, memory: bool = True, repeat: int = 3) -> List[Dict]:
+    """Benchmark one (shape, size) case and return one result row per stage.
+
+    All stages run `repeat` times; each row keeps the stage's fastest time.
+    """
+    findings = GENERATORS[shape](size)
+    fd, path = tempfile.mkstemp(suffix='.json', prefix=f'seqbench-{shape}-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+            json.dump(findings, fh)
+        passes = [_run_stages(path, memory=False) for _ in range(max(1, repeat))]
+        times = {name: min(p[name] for p in passes) for name, _ in STAGES}
+        peaks = _run_stages(path, memory=True) if memory else {}
+    finally:
+        os.unlink(path)
+    return [
+        {'shape': shape, 'size': size, 'stage': name, 'seconds': round(times[name], 6), 'peak_bytes': peaks.get(name)}
+        for name, _ in STAGES
+    ]
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float, min_seconds: float,
+            metrics: Tuple[str, ...] = ('seconds', 'peak_bytes')) -> List[str]:
+    """Return human-readable regressions of `results` against `baseline` rows in the given metrics."""
+    base = {(r['shape'], r['size'], r['stage']): r for r in baseline}
+    regressions = []
+    for r in results:
+        b = base.get((r['shape'], r['size'], r['stage']))
+        if not b:
+            continue
+        if 'seconds' in metrics and r['seconds'] > min_seconds and r['seconds'] > b['seconds'] * tolerance:
+            regressions.append(f"{r['shape']}/{r['size']}/{r['stage']}: {b['seconds']:.4f}s -> {r['seconds']:.4f}s")
+        if ('peak_bytes' in metrics and r.get('peak_bytes') and b.get('peak_bytes')
+                and r['peak_bytes'] > b['peak_bytes'] * tolerance):
+            regressions.append(f"{r['shape']}/{r['size']}/{r['stage']}: peak {b['peak_bytes']} -> {r['peak_bytes']} bytes")
+    return regressions
+
+
+def _format_row(r: Dict) -> str:
+    peak = f"{r['peak_bytes'] / 1e6:9.1f} MB" if r.get('peak_bytes') is not None else '        n/a'
+    per_item = r['seconds'] / r['size'] * 1e6 if r['size'] else 0.0
+    return f"{r['shape']:<8} {r['size']:>8} {r['stage']:<20} {r['seconds']:>10.4f}s {per_item:>9.2f}us {peak}"
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Benchmark the sequencer pipeline on synthetic findings')
+    parser.add_argument('--sizes', default='1000,10000', help='Comma-separated patch counts (e.g. 1000,100000,1000000)')
+    parser.add_argument('--shapes', default=','.join(GENERATORS), help=f'Comma-separated shapes from: {", ".join(GENERATORS)}')
+    parser.add_argument('--no-memory', action='store_true', help='Skip the tracemalloc peak-memory pass')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing passes per case; the fastest is reported (default 3)')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help='Compare against this baseline JSON (default: the committed one) and exit 1 on regressions')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE,
+                        help='Write results to this baseline JSON (default: the committed one)')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='Allowed slowdown factor vs baseline (default 1.5)')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='Ignore timing regressions below this many seconds')
+    parser.add_argument('--fail-on', choices=('all', 'memory'), default='all',
+                        help='Regressions that exit 1: timings and peak memory (default) or peak memory only; '
+                             'timing regressions are still reported')
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    shapes = [s for s in args.shapes.split(',') if s]
+    unknown = [s for s in shapes if s not in GENERATORS]
+    if unknown:
+        parser.error(f'unknown shape(s): {", ".join(unknown)}')
+
+    results = []
+    print(f"{'shape':<8} {'size':>8} {'stage':<20} {'wall':>11} {'per item':>11} {'peak':>12}")
+    for shape in shapes:
+        for size in sizes:
+            for row in run_case(shape, size, memory=not args.no_memory, repeat=args.repeat):
+                print(_format_row(row))
+                results.append(row)
+
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as fh:
+            json.dump({'python': sys.version.split()[0], 'repeat': args.repeat, 'results': results}, fh, indent=2)
+        print(f'Baseline written to {args.save_baseline}')
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as fh:
+            baseline = json.load(fh)['results']
+        gated = ('seconds', 'peak_bytes') if args.fail_on == 'all' else ('peak_bytes',)
+        regressions = compare(results, baseline, args.tolerance, args.min_seconds, gated)
+        if args.fail_on == 'memory':
+            slower = compare(results, baseline, args.tolerance, args.min_seconds, ('seconds',))
+            if slower:
+                print('Timing regressions vs baseline (not gated):')
+                for line in slower:
+                    print(f'- {line}')
+        if regressions:
+            print('Regressions vs baseline:')
+            for line in regressions:
+                print(f'- {line}')
+            sys.exit(1)
+        print('No regressions vs baseline')
+
+
+if __name__ == '__main__':
+    main()
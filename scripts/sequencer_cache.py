@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of sequencing results
+
+CI reruns the sequencer on the same findings artifacts many times (parser-output validation,
+PR checks, release validation). SequencerCache stores each schedule_patches() result on disk under
+a SHA-256 of the normalized patches plus the priority tables (CLASS_PRIORITY, IMPACT_PRIORITY), so
+a rerun on unchanged input returns the stored layers/phases/cycles/unmatched without rebuilding
+the graph.
+
+Entries are plain JSON files in the cache directory (default: $SEQUENCER_CACHE_DIR or
+~/.cache/ai-mall-sequencer). Reads refresh an entry's mtime; when the directory grows past
+max_bytes the least recently used entries are evicted. Bump CACHE_VERSION whenever scheduling
+semantics change so stale plans are never served.
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import sequencer_runner as runner  # noqa: E402
+from sequencer_runner import Patch, RunProfile, _stage, intern_dependency, schedule_patches  # noqa: E402
+from sequencer_shards import schedule_patches_sharded  # noqa: E402
+
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir() -> str:
+    return os.environ.get('SEQUENCER_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'ai-mall-sequencer')
+
+
+def findings_digest(patches: List[Patch]) -> str:
+    """Hash the normalized patches (after legacy-field mapping) and the active priority tables."""
+    h = hashlib.sha256()
+    policy = {'version': CACHE_VERSION, 'class': runner.CLASS_PRIORITY, 'impact': runner.IMPACT_PRIORITY}
+    h.update(json.dumps(policy, sort_keys=True).encode('utf-8'))
+    for p in patches:
+        row = [p.id, p.classification, p.confidence, p.impact,
+               [[d.schema, d.name, d.kind] for d in p.dependencies],
+               [[a.schema, a.name, a.kind] for a in p.affects]]
+        h.update(b'\n')
+        h.update(json.dumps(row, separators=(',', ':')).encode('utf-8'))
+    return h.hexdigest()
+
+
+def _encode_result(result: Dict) -> Dict:
+    out = dict(result)
+    out['unmatched'] = [[pid, [d.schema, d.name, d.kind]] for pid, d in result['unmatched']]
+    if 'phases' in result:
+        out['phases'] = [[name, ids] for name, ids in result['phases']]
+    return out
+
+
+def _decode_result(data: Dict) -> Dict:
+    out = dict(data)
+    out['unmatched'] = [(pid, intern_dependency(*dep)) for pid, dep in data['unmatched']]
+    if 'phases' in data:
+        out['phases'] = [(name, ids) for name, ids in data['phases']]
+    return out
+
+
+class SequencerCache:
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key: str) -> Optional[Dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+            result = _decode_result(data)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            # corrupt or truncated entry: drop it and recompute
+            self.misses += 1
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path)  # LRU: a hit makes the entry most recently used
+        except OSError:
+            pass
+        self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as fh:
+                json.dump(_encode_result(result), fh, separators=(',', ':'))
+            os.replace(tmp, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((st.st_mtime_ns, name, st.st_size))
+            total += st.st_size
+        entries.sort()
+        for _, name, size in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+
+def schedule_patches_cached(patches: List[Patch], cache: Optional[SequencerCache],
+                            profile: Optional[RunProfile] = None, blocking: bool = True,
+                            workers: Optional[int] = None) -> Dict:
+    """schedule_patches() through the cache; cache=None always recomputes.
+
+    A cache hit does not rebuild the graph, so Patch.fanout is left as-is on the inputs (and a
+    profile only records the cache_lookup stage). Blocking and non-blocking results are stored
+    under different keys. workers > 1 computes misses with schedule_patches_sharded(), whose
+    results are identical.
+    """
+    if workers is not None and workers > 1:
+        def compute():
+            return schedule_patches_sharded(patches, workers=workers, profile=profile, blocking=blocking)
+    else:
+        def compute():
+            return schedule_patches(patches, profile=profile, blocking=blocking)
+    if cache is None:
+        return compute()
+    with _stage(profile, 'cache_lookup'):
+        key = findings_digest(patches) + ('' if blocking else '-partial')
+        result = cache.get(key)
+    if profile is not None:
+        profile.count(cache='hit' if result is not None else 'miss')
+    if result is None:
+        result = compute()
+        with _stage(profile, 'cache_store'):
+            cache.put(key, result)
+    return result
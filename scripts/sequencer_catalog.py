@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Catalog snapshot index for unmatched dependencies
+
+schedule_patches() reports every dependency that no patch produces as unmatched, including objects
+that already exist in the database. CatalogIndex loads an introspection catalog snapshot into a
+hashed set of normalized (schema, name, kind) keys so unmatched dependencies can be checked in bulk
+and only truly missing objects are left for triage:
+
+    catalog = load_catalog('catalog.json')
+    result['unmatched'] = catalog.missing(result['unmatched'])
+
+Accepted snapshot shapes: a list of object records (findings-style `schema`/`object_name`/
+`object_type`, information_schema `table_schema`/`table_name`/`table_type`, pg_catalog
+`nspname`/`relname`/`relkind` ...), `{"objects": [...]}`, a dict of sections such as
+`{"tables": [...], "functions": [...]}` (the section names the kind), NDJSON with one record per
+line, or 'schema.name[:kind]' strings.
+
+Names are normalized the way Postgres resolves identifiers: unquoted names fold to lower case,
+"Quoted" names keep their case, function argument lists are dropped. Tables, views, materialized
+views, foreign tables and sequences share one namespace (pg_class), so they match each other: a
+plain 'public.orders' dependency (parsed as kind 'table') is satisfied by a view named orders.
+"""
+import functools
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import NDJSON_EXTENSIONS, Dependency, iter_findings, parse_dependency  # noqa: E402
+
+
+CatalogKey = Tuple[str, str, str]
+
+SCHEMA_FIELDS = ('schema', 'object_schema', 'schema_name', 'table_schema', 'routine_schema', 'nspname', 'namespace')
+NAME_FIELDS = ('object_name', 'name', 'table_name', 'routine_name', 'relname', 'proname', 'typname', 'object')
+KIND_FIELDS = ('object_type', 'kind', 'type', 'table_type', 'routine_type', 'relkind')
+
+RELATION_KINDS = frozenset({'table', 'view', 'materialized view', 'foreign table', 'partitioned table', 'sequence'})
+KIND_ALIASES = {
+    'base table': 'table', 'relation': 'table', 'r': 'table', 'p': 'table', 'v': 'view',
+    'm': 'materialized view', 'matview': 'materialized view', 'f': 'foreign table', 's': 'sequence',
+    'i': 'index', 'procedure': 'function', 'routine': 'function', 'enum': 'type', 'domain': 'type',
+}
+# section name of a {"tables": [...], ...} snapshot -> default kind of its records
+SECTION_KINDS = {
+    'tables': 'table', 'views': 'view', 'materialized_views': 'materialized view', 'sequences': 'sequence',
+    'functions': 'function', 'routines': 'function', 'procedures': 'function', 'types': 'type',
+    'enums': 'type', 'domains': 'type', 'indexes': 'index', 'triggers': 'trigger', 'extensions': 'extension',
+    'policies': 'policy', 'schemas': 'schema',
+}
+
+
+def normalize_identifier(name: str) -> str:
+    """Postgres identifier folding: "Quoted" keeps its case (with "" unescaped), bare names lower-case."""
+    name = name.strip()
+    if len(name) >= 2 and name[0] == '"' and name[-1] == '"':
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_kind(kind: str) -> str:
+    """Canonical kind used in index keys; every pg_class kind collapses to 'relation'."""
+    kind = ' '.join(kind.strip().lower().replace('_', ' ').split())
+    kind = KIND_ALIASES.get(kind, kind)
+    return 'relation' if kind in RELATION_KINDS else kind
+
+
+_normalize_schema = functools.lru_cache(maxsize=4096)(normalize_identifier)
+
+
+def catalog_key(schema: str, name: str, kind: str) -> CatalogKey:
+    kind = normalize_kind(kind or 'table')
+    if kind == 'function' and '(' in name:
+        name = name[:name.index('(')]
+    return _normalize_schema(schema or 'public'), normalize_identifier(name), kind
+
+
+class CatalogIndex:
+    """Hashed set of normalized catalog objects."""
+
+    def __init__(self, objects: Iterable[Tuple[str, str, str]] = ()):
+        self._keys = {catalog_key(schema, name, kind) for schema, name, kind in objects}
+        # Dependency -> found; dependencies are interned, so repeats cost one dict lookup
+        self._memo: Dict[Dependency, bool] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, schema: str, name: str, kind: str = 'table'):
+        self._keys.add(catalog_key(schema, name, kind))
+        self._memo.clear()
+
+    def __contains__(self, dep: Dependency) -> bool:
+        # findings may carry non-string parts (e.g. "name": 5); no catalog object has such a name,
+        # so they stay unmatched (and may not even be hashable, so check before the memo)
+        if not (type(dep.schema) is str and type(dep.name) is str and type(dep.kind) is str):
+            return False
+        found = self._memo.get(dep)
+        if found is None:
+            found = self._memo[dep] = catalog_key(dep.schema, dep.name, dep.kind) in self._keys
+        return found
+
+    def missing(self, unmatched: List[Tuple[str, Dependency]]) -> List[Tuple[str, Dependency]]:
+        """Filter schedule_patches()-style (patch id, Dependency) pairs down to objects not in the catalog.
+
+        Dependencies are interned, so each distinct object is normalized and looked up once."""
+        return [(pid, d) for pid, d in unmatched if d not in self]
+
+
+def _record_object(record, default_kind: str) -> Optional[Tuple[str, str, str]]:
+    if isinstance(record, str):
+        d = parse_dependency(record)
+        if d is None:
+            return None
+        if ':' not in record and default_kind != 'table':
+            return d.schema, d.name, default_kind
+        return d.schema, d.name, d.kind
+    if not isinstance(record, dict):
+        return None
+    schema_keys, name_keys, kind_keys = _layout_fields(tuple(record))
+    schema, name, kind = 'public', None, default_kind
+    for k in name_keys:
+        if record[k]:
+            name = record[k]
+            break
+    for k in schema_keys:
+        if record[k]:
+            schema = record[k]
+            break
+    for k in kind_keys:
+        if record[k]:
+            kind = record[k]
+            break
+    if not (isinstance(name, str) and isinstance(schema, str) and isinstance(kind, str)):
+        return None
+    return schema, name, kind
+
+
+# snapshot rows share a few key layouts: resolve which alias fields each layout has once
+@functools.lru_cache(maxsize=256)
+def _layout_fields(layout: Tuple[str, ...]) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(k for k in fields if k in layout) for fields in (SCHEMA_FIELDS, NAME_FIELDS, KIND_FIELDS))
+
+
+def _section_kind(key: str) -> str:
+    if key in ('objects', 'findings'):
+        return 'table'
+    return SECTION_KINDS.get(key, key[:-1] if key.endswith('s') else key)
+
+
+def iter_catalog_objects(data) -> Iterable[Tuple[str, str, str]]:
+    """Yield (schema, name, kind) for every object record in a decoded snapshot (see module docstring)."""
+    if isinstance(data, list):
+        sections = [('table', data)]
+    elif isinstance(data, dict):
+        sections = [(_section_kind(key), value) for key, value in data.items() if isinstance(value, list)]
+    else:
+        raise ValueError('Unsupported catalog snapshot: list of objects or {"<section>": [...]} expected')
+    for kind, records in sections:
+        for record in records:
+            obj = _record_object(record, kind)
+            if obj is not None:
+                yield obj
+
+
+def load_catalog(path: str) -> CatalogIndex:
+    """Load a catalog snapshot file (JSON, or NDJSON with one record per line) into a CatalogIndex."""
+    if path.endswith(NDJSON_EXTENSIONS):
+        objects = (_record_object(record, 'table') for record in iter_findings(path))
+        return CatalogIndex(obj for obj in objects if obj is not None)
+    with open(path, 'r', encoding='utf-8') as fh:
+        data = json.load(fh)
+    return CatalogIndex(iter_catalog_objects(data))
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Incremental sequencer
+
+The sequencing rules require re-introspection after every applied patch group; usually only a
+handful of findings change between runs. IncrementalScheduler keeps the dependency graph
+(producer/dependent indexes, edges, indegrees, fanout), cycle status and Kahn layers alive
+between runs and re-resolves only what a change touches:
+
+    sched = IncrementalScheduler(parse_json_findings('introspection-findings.json'))
+    plan = sched.plan()                                   # same dict as schedule_patches()
+    diff = sched.apply(added=[new_finding], removed=['F-003'])
+
+Layers are maintained as longest-path depths (a patch's Kahn round is 1 + the deepest of its
+producers), so a change only re-layers the descendants of patches whose incoming edges changed.
+While the graph is acyclic, a cycle introduced by a change must pass through a new edge and is
+detected by the same restricted Kahn pass; only then (or while already blocked) is a full Tarjan
+run needed.
+"""
+import os
+import sys
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import (  # noqa: E402
+    Dependency,
+    Patch,
+    map_finding_to_patch,
+    object_key,
+    priority_key,
+    tarjan_scc_int,
+)
+
+
+ObjectKey = Tuple[str, str, str]
+FindingOrPatch = Union[Dict, Patch]
+
+
+def _as_patch(item: FindingOrPatch) -> Patch:
+    return item if isinstance(item, Patch) else map_finding_to_patch(item)
+
+
+class IncrementalScheduler:
+    """Persistent scheduler whose plan() always equals schedule_patches(self.patches())."""
+
+    def __init__(self, patches: Iterable[FindingOrPatch] = ()):
+        self._patches: Dict[str, Patch] = {}
+        # object -> ordered set (dict) of patch ids producing / depending on it
+        self._producers: Dict[ObjectKey, Dict[str, None]] = {}
+        self._dependents: Dict[ObjectKey, Dict[str, None]] = {}
+        self._in: Dict[str, Set[str]] = {}
+        self._out: Dict[str, Set[str]] = {}
+        self._unmatched: Dict[str, List[Dependency]] = {}
+        # last consistent layering (kept while blocked so the unblocking diff is meaningful)
+        self._depth: Dict[str, int] = {}
+        self._layers: Dict[int, Set[str]] = {}
+        self._sorted: Dict[int, List[str]] = {}
+        self._cycles: Optional[List[List[str]]] = None
+        added = [_as_patch(p) for p in patches]
+        if added:
+            self.apply(added=added)
+
+    # --- queries ------------------------------------------------------------------------------
+
+    @property
+    def status(self) -> str:
+        return 'blocked' if self._cycles else 'ok'
+
+    def patches(self) -> List[Patch]:
+        return list(self._patches.values())
+
+    def indegree(self, pid: str) -> int:
+        return len(self._in[pid])
+
+    def layer_of(self, pid: str) -> Optional[int]:
+        return None if self._cycles else self._depth.get(pid)
+
+    def plan(self) -> Dict:
+        """Materialize the current plan in schedule_patches() format."""
+        unmatched = [(pid, d) for pid in self._patches for d in self._unmatched[pid]]
+        if self._cycles:
+            return {'status': 'blocked', 'cycles': [list(c) for c in self._cycles], 'unmatched': unmatched}
+        layers = [list(self._sorted_layer(d)) for d in range(len(self._layers))]
+        phase_map = {'Additive': [], 'Corrective': [], 'Destructive': []}
+        for layer in layers:
+            for pid in layer:
+                phase_map[self._patches[pid].classification].append(pid)
+        phases = [('Additive', phase_map['Additive']), ('Corrective', phase_map['Corrective']),
+                  ('Destructive', phase_map['Destructive'])]
+        return {'status': 'ok', 'layers': layers, 'phases': phases, 'unmatched': unmatched}
+
+    # --- mutations ----------------------------------------------------------------------------
+
+    def add_finding(self, finding: FindingOrPatch) -> Dict:
+        return self.apply(added=[finding])
+
+    def update_finding(self, finding: FindingOrPatch) -> Dict:
+        return self.apply(updated=[finding])
+
+    def remove_finding(self, pid: str) -> Dict:
+        return self.apply(removed=[pid])
+
+    def apply(self, added: Iterable[FindingOrPatch] = (), updated: Iterable[FindingOrPatch] = (),
+              removed: Iterable[str] = ()) -> Dict:
+        """Apply a batch of changes and return the plan diff.
+
+        Raises ValueError when adding an existing id and KeyError when updating/removing an unknown
+        one. The diff reports the new status, added patches with their layer, removed ids, patches
+        whose layer moved ({id: (old, new)}), the current cycles and unmatched dependency changes.
+        """
+        previous_status = self.status
+        touched: Dict[str, None] = {}
+        seeds: Set[str] = set()
+        fanout_changed: Set[str] = set()
+        removed_ids: List[str] = []
+        new_ids: List[str] = []
+
+        for pid in removed:
+            if pid not in self._patches:
+                raise KeyError(pid)
+            self._detach(pid, touched, seeds, fanout_changed, keep_layer=False)
+            del self._patches[pid]
+            del self._unmatched[pid]
+            removed_ids.append(pid)
+        for item in updated:
+            p = _as_patch(item)
+            if p.id not in self._patches:
+                raise KeyError(p.id)
+            self._detach(p.id, touched, seeds, fanout_changed, keep_layer=True)
+            self._attach(p, touched)
+            seeds.add(p.id)
+        for item in added:
+            p = _as_patch(item)
+            if p.id in self._patches:
+                raise ValueError(f'Patch {p.id} already scheduled; use update_finding')
+            self._attach(p, touched)
+            self._unmatched[p.id] = []
+            seeds.add(p.id)
+            new_ids.append(p.id)
+
+        # re-resolve incoming edges and unmatched deps of every touched patch
+        unmatched_added: List[Tuple[str, Dependency]] = []
+        unmatched_resolved: List[Tuple[str, Dependency]] = []
+        for pid in touched:
+            if pid not in self._patches:
+                continue
+            new_in, unmatched = self._resolve(pid)
+            old_in = self._in[pid]
+            if new_in != old_in:
+                for q in old_in - new_in:
+                    self._out[q].discard(pid)
+                    fanout_changed.add(q)
+                for q in new_in - old_in:
+                    self._out[q].add(pid)
+                    fanout_changed.add(q)
+                self._in[pid] = new_in
+                seeds.add(pid)
+            old_unmatched = self._unmatched[pid]
+            if unmatched != old_unmatched:
+                unmatched_added.extend((pid, d) for d in unmatched if d not in old_unmatched)
+                unmatched_resolved.extend((pid, d) for d in old_unmatched if d not in unmatched)
+                self._unmatched[pid] = unmatched
+
+        for pid in fanout_changed | seeds:
+            p = self._patches.get(pid)
+            if p is not None:
+                p.fanout = len(self._out[pid])
+                self._mark_dirty(pid)
+
+        moved: Dict[str, Tuple[Optional[int], int]] = {}
+        if self._cycles is None:
+            region = self._descendants(seeds)
+            if not self._relayer(region, moved):
+                self._cycles = self._find_cycles()
+        elif seeds or removed_ids:
+            self._cycles = self._find_cycles()
+            if self._cycles is None:
+                self._relayer(set(self._patches), moved)
+
+        blocked = bool(self._cycles)
+        added_layers = {pid: (None if blocked else self._depth.get(pid)) for pid in new_ids}
+        for pid in new_ids:
+            moved.pop(pid, None)
+        return {
+            'status': self.status,
+            'previous_status': previous_status,
+            'added': added_layers,
+            'removed': removed_ids,
+            'moved': moved,
+            'cycles': self._cycles,
+            'unmatched_added': unmatched_added,
+            'unmatched_resolved': unmatched_resolved,
+        }
+
+    # --- internals ----------------------------------------------------------------------------
+
+    def _attach(self, p: Patch, touched: Dict[str, None]):
+        self._patches[p.id] = p
+        for a in p.affects:
+            self._producers.setdefault(object_key(a), {})[p.id] = None
+            touched.update(dict.fromkeys(self._dependents.get(object_key(a), ())))
+        for d in p.dependencies:
+            self._dependents.setdefault(object_key(d), {})[p.id] = None
+        self._in.setdefault(p.id, set())
+        self._out.setdefault(p.id, set())
+        touched[p.id] = None
+
+    def _detach(self, pid: str, touched: Dict[str, None], seeds: Set[str], fanout_changed: Set[str],
+                keep_layer: bool):
+        p = self._patches[pid]
+        for a in p.affects:
+            key = object_key(a)
+            producers = self._producers.get(key)
+            if producers is not None:
+                producers.pop(pid, None)
+                if not producers:
+                    del self._producers[key]
+            touched.update(dict.fromkeys(self._dependents.get(key, ())))
+        for d in p.dependencies:
+            key = object_key(d)
+            dependents = self._dependents.get(key)
+            if dependents is not None:
+                dependents.pop(pid, None)
+                if not dependents:
+                    del self._dependents[key]
+        for q in self._in.pop(pid):
+            self._out[q].discard(pid)
+            fanout_changed.add(q)
+        for s in self._out.pop(pid):
+            self._in[s].discard(pid)
+            seeds.add(s)
+        # an updated patch keeps its layer slot so the diff reports a move, not a re-add
+        depth = None if keep_layer else self._depth.pop(pid, None)
+        if depth is not None:
+            self._layers[depth].discard(pid)
+            self._sorted.pop(depth, None)
+            if not self._layers[depth]:
+                del self._layers[depth]
+        touched.pop(pid, None)
+
+    def _resolve(self, pid: str) -> Tuple[Set[str], List[Dependency]]:
+        srcs: Set[str] = set()
+        unmatched: List[Dependency] = []
+        for d in self._patches[pid].dependencies:
+            producers = self._producers.get(object_key(d))
+            if producers:
+                srcs.update(producers)
+            else:
+                unmatched.append(d)
+        srcs.discard(pid)
+        return srcs, unmatched
+
+    def _descendants(self, seeds: Set[str]) -> Set[str]:
+        region = {s for s in seeds if s in self._patches}
+        stack = list(region)
+        out = self._out
+        while stack:
+            for s in out[stack.pop()]:
+                if s not in region:
+                    region.add(s)
+                    stack.append(s)
+        return region
+
+    def _relayer(self, region: Set[str], moved: Dict) -> bool:
+        """Recompute longest-path depths inside `region` (closed under successors).
+
+        Returns False, leaving depths untouched, when the region contains a cycle."""
+        indeg = dict.fromkeys(region, 0)
+        for v in region:
+            for s in self._out[v]:
+                indeg[s] += 1
+        queue = [v for v, deg in indeg.items() if deg == 0]
+        new_depth: Dict[str, int] = {}
+        for v in queue:
+            d = 0
+            for q in self._in[v]:
+                dq = new_depth[q] if q in new_depth else self._depth[q]
+                if dq >= d:
+                    d = dq + 1
+            new_depth[v] = d
+            for s in self._out[v]:
+                indeg[s] -= 1
+                if indeg[s] == 0:
+                    queue.append(s)
+        if len(new_depth) < len(region):
+            return False
+        for v, d in new_depth.items():
+            old = self._depth.get(v)
+            if old == d:
+                continue
+            if old is not None:
+                self._layers[old].discard(v)
+                self._sorted.pop(old, None)
+                if not self._layers[old]:
+                    del self._layers[old]
+            self._layers.setdefault(d, set()).add(v)
+            self._sorted.pop(d, None)
+            self._depth[v] = d
+            prev = moved.get(v)
+            moved[v] = (prev[0] if prev else old, d)
+        return True
+
+    def _find_cycles(self) -> Optional[List[List[str]]]:
+        # same node numbering and successor order as build_compact_graph -> identical SCC output
+        ids = list(self._patches)
+        pos = {pid: i for i, pid in enumerate(ids)}
+        adj = [sorted(pos[s] for s in self._out[pid]) for pid in ids]
+        cycles = [[ids[i] for i in scc] for scc in tarjan_scc_int(adj)]
+        return cycles if cycles else None
+
+    def _mark_dirty(self, pid: str):
+        depth = self._depth.get(pid)
+        if depth is not None:
+            self._sorted.pop(depth, None)
+
+    def _sorted_layer(self, depth: int) -> List[str]:
+        layer = self._sorted.get(depth)
+        if layer is None:
+            patches = self._patches
+            layer = sorted(self._layers[depth], key=lambda pid: priority_key(patches[pid]))
+            self._sorted[depth] = layer
+        return layer
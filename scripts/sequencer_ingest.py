@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Fused validate + map ingest
+
+Without this, a findings artifact is read twice: validate_parser_output.py parses and validates it,
+then parse_json_findings parses it again and maps each finding. ingest_validated() reads the
+artifact once, as a stream. Each finding is checked against the schema (fast path, with
+jsonschema only for the messages of failing findings) and mapped to a Patch in the same step. It
+also hashes the raw bytes as they are read.
+
+Along the way it collects the signals described in SEQUENCER_README.md:
+
+- structural: schema errors, legacy/deprecated field names, duplicate ids, artifact shape
+- semantic:   classification mix, low confidence scores, normalization (auto ids, inferred affects)
+- integrity:  malformed/truncated JSON, empty artifact, checksum mismatch
+
+Signals are aggregated per code (count + a few examples) so the report stays small on
+million-finding artifacts. Any `error`-level signal is a hard failure: the caller must not
+schedule the patches.
+"""
+import codecs
+import hashlib
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import (  # noqa: E402
+    NDJSON_EXTENSIONS,
+    Patch,
+    iter_findings_from,
+    map_finding_to_patch,
+)
+from validate_parser_output import compiled_validators, fast_checks  # noqa: E402
+
+
+# Field names accepted by map_finding_to_patch that the schema does not define
+LEGACY_FIELDS = ('finding_id', 'class', 'confidence_score', 'estimated_impact', 'depends_on',
+                 'creates', 'affected', 'affected_objects')
+LOW_CONFIDENCE = 50
+MAX_EXAMPLES = 5
+
+
+class Signals:
+    """Signals aggregated by code: one entry per code with a count and the first few examples."""
+
+    def __init__(self):
+        self._by_code: Dict[str, Dict] = {}
+
+    def add(self, category: str, level: str, code: str, message: str, example=None):
+        entry = self._by_code.get(code)
+        if entry is None:
+            entry = self._by_code[code] = {'category': category, 'level': level, 'code': code,
+                                           'message': message, 'count': 0, 'examples': []}
+        entry['count'] += 1
+        if example is not None and len(entry['examples']) < MAX_EXAMPLES:
+            entry['examples'].append(example)
+
+    def has_errors(self) -> bool:
+        return any(e['level'] == 'error' for e in self._by_code.values())
+
+    def as_list(self) -> List[Dict]:
+        order = {'error': 0, 'warning': 1, 'info': 2}
+        return sorted(self._by_code.values(), key=lambda e: (order[e['level']], e['category'], e['code']))
+
+
+class _HashingReader:
+    """Text reader over a binary file that hashes the raw bytes as they are consumed."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+
+    def read(self, n: int = -1) -> str:
+        data = self.raw.read(n)
+        self.sha256.update(data)
+        return self.decoder.decode(data, final=not data)
+
+    def drain(self, chunk_size: int = 1 << 16):
+        """Hash the rest of the file without decoding it (it may not even be UTF-8)."""
+        data = self.raw.read(chunk_size)
+        while data:
+            self.sha256.update(data)
+            data = self.raw.read(chunk_size)
+
+
+def ingest_validated(path: str, expect_sha256: Optional[str] = None,
+                     low_confidence: int = LOW_CONFIDENCE) -> Tuple[List[Patch], List[Dict], str]:
+    """Read, validate and map `path` in one pass.
+
+    Returns (patches, signals, sha256 of the artifact). Invalid findings are reported and not
+    mapped; check for `error`-level signals before scheduling.
+    """
+    _, finding_validator = compiled_validators()
+    _, finding_ok = fast_checks()
+    signals = Signals()
+    patches: List[Patch] = []
+    seen_ids = set()
+    classes: Dict[str, int] = {}
+    layout: Dict = {}
+    index = -1
+
+    with open(path, 'rb') as raw:
+        reader = _HashingReader(raw)
+        try:
+            for index, finding in enumerate(iter_findings_from(reader, path.endswith(NDJSON_EXTENSIONS), layout=layout)):
+                where = f"findings.{index}" if layout.get('shape') == 'wrapped' else str(index)
+                valid = finding_ok(finding) if finding_ok is not None else finding_validator.is_valid(finding)
+                if not valid:
+                    for e in finding_validator.iter_errors(finding):
+                        loc = '.'.join([where] + [str(p) for p in e.path])
+                        signals.add('structural', 'error', 'schema_violation', 'Finding does not match parser-output schema',
+                                    f'{loc}: {e.message}')
+                    continue
+
+                legacy = [k for k in LEGACY_FIELDS if k in finding]
+                if legacy:
+                    for k in legacy:
+                        signals.add('structural', 'warning', f'legacy_field:{k}',
+                                    f"Deprecated field '{k}' normalized", where)
+
+                patch = map_finding_to_patch(finding)
+                if not (finding.get('id') or finding.get('finding_id') or finding.get('name')):
+                    signals.add('semantic', 'info', 'auto_id', 'Finding without id; generated one', f'{where} -> {patch.id}')
+                if not any(finding.get(k) for k in ('affects', 'creates', 'affected', 'affected_objects')) and patch.affects:
+                    signals.add('semantic', 'info', 'inferred_affects', 'Affected object inferred from object_name/name', where)
+                if patch.id in seen_ids:
+                    signals.add('structural', 'warning', 'duplicate_id', 'Duplicate finding id (last one wins)', patch.id)
+                seen_ids.add(patch.id)
+                if patch.confidence < low_confidence:
+                    signals.add('semantic', 'warning', 'low_confidence', f'Confidence below {low_confidence}; review manually',
+                                patch.id)
+                classes[patch.classification] = classes.get(patch.classification, 0) + 1
+                patches.append(patch)
+        except ValueError as e:  # includes UnicodeDecodeError
+            signals.add('integrity', 'error', 'corrupted_artifact', 'Artifact is malformed or truncated', str(e))
+        # the checksum covers trailing bytes too, even after a parse error
+        reader.drain()
+
+    digest = reader.sha256.hexdigest()
+    if expect_sha256 and expect_sha256.lower() != digest:
+        signals.add('integrity', 'error', 'checksum_mismatch', 'Artifact checksum does not match the expected value',
+                    f'expected {expect_sha256}, got {digest}')
+    if index < 0 and not signals.has_errors():
+        signals.add('integrity', 'warning', 'empty_artifact', 'Artifact contains no findings (partial upload?)')
+    if layout.get('shape'):
+        signals.add('structural', 'info', f"shape:{layout['shape']}", f"Artifact layout: {layout['shape']}")
+    if classes:
+        summary = ', '.join(f'{name}={count}' for name, count in sorted(classes.items()))
+        signals.add('semantic', 'info', 'classification_mix', f'Classifications: {summary}')
+    return patches, signals.as_list(), digest
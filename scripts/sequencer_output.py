@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Machine-readable plan output
+
+main() used to print every patch and pprint the whole schedule_patches() result, which at 100k
+patches takes longer than scheduling itself. The writers here emit an already-built result in
+compact formats; they encode and write it one layer/record at a time, so the serialized text is
+never held in memory as a whole (the result itself still is). Unmatched dependencies are written
+as {"id", "schema", "name", "kind"} records everywhere, including inside "execution_plan":
+
+- write_plan_json:   one JSON document ({"status", "layers", "phases", "unmatched", ...})
+- write_plan_ndjson: one record per line ("plan" header, then "layer", "phase", "cycle",
+                     "held", "feedback_patches", "feedback_edge", "unmatched", "signal" and
+                     "execution_plan" records)
+- write_plan_file:   a columnar binary plan (read it back with read_plan_file)
+
+Plan file layout (integers little-endian):
+
+    b'SEQPLAN1'
+    id blob        utf-8 patch ids, concatenated in layer order (written layer by layer)
+    footer         u64 meta length, meta JSON (status, counts, phase names, cycles, unmatched and,
+                   for partial plans, held / feedback_edges / feedback_patches),
+                   then the columns: layer_offsets (n_layers + 1 x i64, CSR into the id order),
+                   id_offsets (n_patches + 1 x i64 byte offsets into the blob), phase codes
+                   (n_patches x i8, index into the phase names)
+    trailer        u64 offset of the footer
+"""
+import json
+import os
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import Dependency, intern_dependency  # noqa: E402
+
+
+PLAN_MAGIC = b'SEQPLAN1'
+PHASE_NAMES = ('Additive', 'Corrective', 'Destructive')
+# extra keys of a schedule_patches(blocking=False) result that stalled on cycles
+PARTIAL_KEYS = ('held', 'feedback_edges', 'feedback_patches')
+
+
+def _json_default(o):
+    if isinstance(o, Dependency):
+        return {'schema': o.schema, 'name': o.name, 'kind': o.kind}
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, separators=(',', ':'), default=_json_default)
+
+
+def _unmatched_records(result: Dict) -> Iterable[Dict]:
+    for pid, d in result['unmatched']:
+        yield {'id': pid, 'schema': d.schema, 'name': d.name, 'kind': d.kind}
+
+
+def _execution_plan_record(plan: Dict) -> Dict:
+    return dict(plan, unmatched=list(_unmatched_records(plan)))
+
+
+def plan_summary(result: Dict) -> str:
+    """One-line summary of a schedule_patches() result (used by --quiet)."""
+    if 'layers' not in result:
+        return f"status={result['status']} cycles={len(result['cycles'])} unmatched={len(result['unmatched'])}"
+    counts = ' '.join(f'{name}={len(ids)}' for name, ids in result['phases'])
+    patches = sum(len(layer) for layer in result['layers'])
+    line = (f"status={result['status']} patches={patches} layers={len(result['layers'])} {counts} "
+            f"unmatched={len(result['unmatched'])}")
+    if 'held' in result:
+        line += (f" cycles={len(result['cycles'])} held={len(result['held'])} "
+                 f"feedback_edges={len(result['feedback_edges'])} feedback_patches={len(result['feedback_patches'])}")
+    return line
+
+
+# --- JSON / NDJSON ----------------------------------------------------------------------------
+
+def _write_array(fh, key: str, items: Iterable):
+    fh.write(f',\n{json.dumps(key)}: [')
+    sep = '\n'
+    for item in items:
+        fh.write(sep)
+        fh.write(_dumps(item))
+        sep = ',\n'
+    fh.write('\n]')
+
+
+def write_plan_json(result: Dict, fh, signals: Optional[List[Dict]] = None,
+                    execution_plan: Optional[Dict] = None):
+    """Write `result` as a single JSON document, one layer/phase/record per line."""
+    fh.write(f'{{"status": {json.dumps(result["status"])}')
+    if 'cycles' in result:
+        _write_array(fh, 'cycles', result['cycles'])
+    if 'layers' in result:
+        _write_array(fh, 'layers', result['layers'])
+        fh.write(',\n"phases": {')
+        sep = '\n'
+        for name, ids in result['phases']:
+            fh.write(f'{sep}{json.dumps(name)}: {_dumps(ids)}')
+            sep = ',\n'
+        fh.write('\n}')
+    for key in PARTIAL_KEYS:
+        if key in result:
+            _write_array(fh, key, result[key])
+    _write_array(fh, 'unmatched', _unmatched_records(result))
+    if signals is not None:
+        _write_array(fh, 'signals', signals)
+    if execution_plan is not None:
+        fh.write(f',\n"execution_plan": {_dumps(_execution_plan_record(execution_plan))}')
+    fh.write('}\n')
+
+
+def write_plan_ndjson(result: Dict, fh, signals: Optional[List[Dict]] = None,
+                      execution_plan: Optional[Dict] = None):
+    """Write `result` as NDJSON records; the first line is a "plan" header with the counts."""
+    header = {'type': 'plan', 'status': result['status'], 'unmatched': len(result['unmatched'])}
+    if 'layers' in result:
+        header['layers'] = len(result['layers'])
+        header['patches'] = sum(len(layer) for layer in result['layers'])
+    if 'cycles' in result:
+        header['cycles'] = len(result['cycles'])
+    if 'held' in result:
+        header['held'] = len(result['held'])
+        header['feedback_edges'] = len(result['feedback_edges'])
+    fh.write(_dumps(header) + '\n')
+    for sig in signals or ():
+        fh.write(_dumps(dict(sig, type='signal')) + '\n')
+    for ids in result.get('cycles', ()):
+        fh.write(f'{{"type":"cycle","ids":{_dumps(ids)}}}\n')
+    if 'held' in result:
+        fh.write(f'{{"type":"held","ids":{_dumps(result["held"])}}}\n')
+        fh.write(f'{{"type":"feedback_patches","ids":{_dumps(result["feedback_patches"])}}}\n')
+    for edge in result.get('feedback_edges', ()):
+        fh.write(_dumps({'type': 'feedback_edge', **edge}) + '\n')
+    for k, layer in enumerate(result.get('layers', ())):
+        fh.write(f'{{"type":"layer","layer":{k},"ids":{_dumps(layer)}}}\n')
+    for name, ids in result.get('phases', ()):
+        fh.write(f'{{"type":"phase","phase":{json.dumps(name)},"ids":{_dumps(ids)}}}\n')
+    for record in _unmatched_records(result):
+        fh.write(_dumps(dict(record, type='unmatched')) + '\n')
+    if execution_plan is not None:
+        fh.write(_dumps(dict(_execution_plan_record(execution_plan), type='execution_plan')) + '\n')
+
+
+# --- columnar plan file -----------------------------------------------------------------------
+
+def _column_bytes(values: array) -> bytes:
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _column(data: bytes, typecode: str) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def write_plan_file(result: Dict, path: str):
+    """Write `result` as a columnar binary plan file (see module docstring)."""
+    phase_code = {}
+    for code, (name, ids) in enumerate(result.get('phases', ())):
+        for pid in ids:
+            phase_code[pid] = code
+    layer_offsets = array('q', [0])
+    id_offsets = array('q', [0])
+    phases = array('b')
+    pos = 0
+    with open(path, 'wb') as fh:
+        fh.write(PLAN_MAGIC)
+        for layer in result.get('layers', ()):
+            encoded = [pid.encode('utf-8') for pid in layer]
+            fh.write(b''.join(encoded))
+            for b in encoded:
+                pos += len(b)
+                id_offsets.append(pos)
+            phases.extend(phase_code[pid] for pid in layer)
+            layer_offsets.append(len(id_offsets) - 1)
+        footer = fh.tell()
+        meta = {
+            'status': result['status'],
+            'patches': len(phases),
+            'layers': len(layer_offsets) - 1,
+            'phases': [name for name, _ in result.get('phases', ())] or list(PHASE_NAMES),
+            'cycles': result.get('cycles'),
+            'unmatched': [[pid, d.schema, d.name, d.kind] for pid, d in result['unmatched']],
+        }
+        meta.update((key, result[key]) for key in PARTIAL_KEYS if key in result)
+        meta_bytes = _dumps(meta).encode('utf-8')
+        fh.write(struct.pack('<Q', len(meta_bytes)))
+        fh.write(meta_bytes)
+        fh.write(_column_bytes(layer_offsets))
+        fh.write(_column_bytes(id_offsets))
+        fh.write(_column_bytes(phases))
+        fh.write(struct.pack('<Q', footer))
+
+
+def read_plan_file(path: str) -> Dict:
+    """Read a plan file back into the schedule_patches() result format."""
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    if not data.startswith(PLAN_MAGIC) or len(data) < len(PLAN_MAGIC) + 16:
+        raise ValueError(f'{path} is not a sequencer plan file')
+    (footer,) = struct.unpack_from('<Q', data, len(data) - 8)
+    (meta_len,) = struct.unpack_from('<Q', data, footer)
+    pos = footer + 8
+    meta = json.loads(data[pos:pos + meta_len].decode('utf-8'))
+    pos += meta_len
+    n_layers, n = meta['layers'], meta['patches']
+    layer_offsets = _column(data[pos:pos + 8 * (n_layers + 1)], 'q')
+    pos += 8 * (n_layers + 1)
+    id_offsets = _column(data[pos:pos + 8 * (n + 1)], 'q')
+    pos += 8 * (n + 1)
+    phases = _column(data[pos:pos + n], 'b')
+
+    blob = memoryview(data)[len(PLAN_MAGIC):footer]
+    ids = [str(blob[id_offsets[i]:id_offsets[i + 1]], 'utf-8') for i in range(n)]
+    result = {'status': meta['status']}
+    if meta['cycles'] is not None:
+        result['cycles'] = meta['cycles']
+    if meta['status'] in ('ok', 'partial'):
+        result['layers'] = [ids[layer_offsets[k]:layer_offsets[k + 1]] for k in range(n_layers)]
+        by_phase: List[List[str]] = [[] for _ in meta['phases']]
+        for i, pid in enumerate(ids):
+            by_phase[phases[i]].append(pid)
+        result['phases'] = list(zip(meta['phases'], by_phase))
+    result['unmatched'] = [(pid, intern_dependency(schema, name, kind)) for pid, schema, name, kind in meta['unmatched']]
+    result.update((key, meta[key]) for key in PARTIAL_KEYS if key in meta)
+    return result
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Parallel execution planner
+
+schedule_patches() says which patches are independent (layers) but not how to run them on a
+fixed number of workers. plan_parallel_execution() turns the dependency DAG into a concrete,
+concurrency-bounded schedule using critical-path list scheduling:
+
+- Phases run in Additive -> Corrective -> Destructive order with a barrier between them. A patch
+  that depends on a patch of a later phase (e.g. an Additive patch needing a Corrective one) is
+  deferred into that later phase and reported in `deferred`, so dependencies and phase order are
+  both honored.
+- Inside a phase, whenever a worker is free the ready patch with the longest remaining path
+  (its own cost plus the costliest chain of in-phase dependents, the "bottom level") starts
+  first; ties fall back to the normal priority_key order.
+
+Costs are per-patch estimates in any unit (seconds, minutes); patches without one cost
+`default_cost`. The result predicts each patch's worker/start/finish, the makespan, and the
+lower bounds (critical path, total work / workers) it can be compared against.
+"""
+import heapq
+import os
+import sys
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import (  # noqa: E402
+    Patch,
+    build_compact_graph,
+    detect_cycles_compact,
+    priority_key,
+)
+
+
+PHASE_ORDER = ('Additive', 'Corrective', 'Destructive')
+
+
+def _topological_order(graph) -> List[int]:
+    indegree = list(graph.indegree)
+    order = [i for i, deg in enumerate(indegree) if deg == 0]
+    offsets, targets = graph.offsets, graph.targets
+    for i in order:
+        for k in range(offsets[i], offsets[i + 1]):
+            m = targets[k]
+            indegree[m] -= 1
+            if indegree[m] == 0:
+                order.append(m)
+    return order
+
+
+def plan_parallel_execution(patches: List[Patch], workers: int, costs: Optional[Dict[str, float]] = None,
+                            default_cost: float = 1.0) -> Dict:
+    """Plan execution of `patches` on `workers` parallel workers (see module docstring)."""
+    if workers < 1:
+        raise ValueError('workers must be >= 1')
+    graph = build_compact_graph(patches)
+    cycles = detect_cycles_compact(graph)
+    if cycles:
+        return {'status': 'blocked', 'cycles': cycles, 'unmatched': graph.unmatched}
+
+    ids, nodes = graph.ids, graph.patches
+    offsets, targets = graph.offsets, graph.targets
+    n = len(ids)
+    costs = costs or {}
+    cost = [float(costs.get(pid, default_cost)) for pid in ids]
+    if any(c < 0 for c in cost):
+        raise ValueError('patch costs must be non-negative')
+
+    order = _topological_order(graph)
+    phase_index = {name: k for k, name in enumerate(PHASE_ORDER)}
+    rank = [phase_index[p.classification] for p in nodes]
+    deferred = {}
+    for i in order:
+        for k in range(offsets[i], offsets[i + 1]):
+            m = targets[k]
+            if rank[i] > rank[m]:
+                rank[m] = rank[i]
+    for i in range(n):
+        if rank[i] != phase_index[nodes[i].classification]:
+            deferred[ids[i]] = PHASE_ORDER[rank[i]]
+
+    # bottom level inside each phase (edges into a later phase are covered by the barrier)
+    blevel = cost[:]
+    for i in reversed(order):
+        best = 0.0
+        for k in range(offsets[i], offsets[i + 1]):
+            m = targets[k]
+            if rank[m] == rank[i] and blevel[m] > best:
+                best = blevel[m]
+        blevel[i] = cost[i] + best
+
+    keys = [priority_key(p) for p in nodes]
+    members: List[List[int]] = [[] for _ in PHASE_ORDER]
+    for i in order:
+        members[rank[i]].append(i)
+
+    clock = 0.0
+    critical_path = 0.0
+    phases = []
+    for r, name in enumerate(PHASE_ORDER):
+        start = clock
+        remaining = {}
+        for i in members[r]:
+            remaining[i] = 0
+        for i in members[r]:
+            for k in range(offsets[i], offsets[i + 1]):
+                m = targets[k]
+                if m in remaining:
+                    remaining[m] += 1
+        ready = [(-blevel[i], keys[i], i) for i, deg in remaining.items() if deg == 0]
+        heapq.heapify(ready)
+        free = list(range(workers))
+        running = []
+        assignments = []
+        while ready or running:
+            while ready and free:
+                _, _, i = heapq.heappop(ready)
+                w = heapq.heappop(free)
+                heapq.heappush(running, (clock + cost[i], w, i))
+                assignments.append({'id': ids[i], 'worker': w, 'start': round(clock, 6), 'finish': round(clock + cost[i], 6)})
+            clock, w, i = heapq.heappop(running)
+            finished = [(w, i)]
+            while running and running[0][0] == clock:
+                _, w2, i2 = heapq.heappop(running)
+                finished.append((w2, i2))
+            for w, i in finished:
+                heapq.heappush(free, w)
+                for k in range(offsets[i], offsets[i + 1]):
+                    m = targets[k]
+                    if m in remaining:
+                        remaining[m] -= 1
+                        if remaining[m] == 0:
+                            heapq.heappush(ready, (-blevel[m], keys[m], m))
+        # batches: patches that start together (never more than `workers` at once)
+        batches = []
+        last = None
+        for a in assignments:
+            if a['start'] != last:
+                batches.append([])
+                last = a['start']
+            batches[-1].append(a['id'])
+        critical_path += max((blevel[i] for i in members[r]), default=0.0)
+        phases.append({'phase': name, 'start': round(start, 6), 'finish': round(clock, 6),
+                       'batches': batches, 'assignments': assignments})
+
+    total_work = sum(cost)
+    return {
+        'status': 'ok',
+        'workers': workers,
+        'makespan': round(clock, 6),
+        'critical_path': round(critical_path, 6),
+        'total_work': round(total_work, 6),
+        'lower_bound': round(max(critical_path, total_work / workers), 6),
+        'phases': phases,
+        'deferred': deferred,
+        'unmatched': graph.unmatched,
+    }
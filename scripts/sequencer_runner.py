@@ -12,10 +12,15 @@ This script is a language-agnostic reference for:
 
 This is intentionally self-contained and uses simple sample datasets.
 """
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
 from dataclasses import dataclass, field
 from typing import List, Dict, Set, Optional, Tuple
 import heapq
 import pprint
+import time
+import hashlib
 import json
 import argparse
 import os
@@ -26,14 +31,42 @@ CLASS_PRIORITY = {"Additive": 3, "Corrective": 2, "Destructive": 1}
 IMPACT_PRIORITY = {"low": 3, "medium": 2, "high": 1}
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Dependency:
     schema: str
     name: str
     kind: str  # e.g., 'type','table','function'
 
 
-@dataclass
+# Parsed dependencies repeat massively (the same hot objects, 'public', 'table'), so the parsers
+# hand out one shared, immutable Dependency per (schema, name, kind) with interned strings.
+_DEPENDENCY_INTERN: Dict[Tuple[str, str, str], Dependency] = {}
+
+
+def _intern_str(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+def intern_dependency(schema: str, name: str, kind: str) -> Dependency:
+    # Schema-valid input may carry non-string parts (e.g. "name": 5); those are kept as they are,
+    # so the table key always equals the stored values. Unhashable parts are not shared at all.
+    key = (schema, name, kind)
+    try:
+        dep = _DEPENDENCY_INTERN.get(key)
+    except TypeError:
+        return Dependency(schema, name, kind)
+    if dep is None:
+        dep = Dependency(_intern_str(schema), _intern_str(name), _intern_str(kind))
+        _DEPENDENCY_INTERN[key] = dep
+    return dep
+
+
+def clear_dependency_cache():
+    """Drop the shared Dependency instances (for long-lived processes between unrelated runs)."""
+    _DEPENDENCY_INTERN.clear()
+
+
+@dataclass(slots=True)
 class Patch:
     id: str
     classification: str  # Additive|Corrective|Destructive
@@ -44,6 +77,96 @@ class Patch:
     fanout: int = 0  # number of other patches depending on it (computed)
 
 
+# Run profiling
+#
+# RunProfile collects what a slow run needs to be explained: wall time per pipeline stage (nested
+# stages are reported as 'parent/child'), counters (patches, edges, unmatched dependencies, SCC
+# sizes, layer widths) and, when asked, tracemalloc peaks per stage and the top cProfile entries.
+# Pipeline functions take an optional `profile`; without one they only pay a nullcontext per stage.
+class RunProfile:
+    def __init__(self, cpu: bool = False, memory: bool = False):
+        self.cpu = cpu
+        self.memory = memory
+        self.stages: List[Dict] = []
+        self.counters: Dict = {}
+        self._stack: List[str] = []
+        self._peaks: List[int] = []
+        self._profiler = None
+        if cpu:
+            import cProfile
+            self._profiler = cProfile.Profile()
+
+    @contextmanager
+    def stage(self, name: str):
+        import tracemalloc
+
+        self._stack.append(name)
+        path = '/'.join(self._stack)
+        tracing = self.memory and tracemalloc.is_tracing()
+        if self.memory and not tracing:
+            tracemalloc.start()
+        if self.memory:
+            if self._peaks:
+                self._peaks[-1] = max(self._peaks[-1], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            start_bytes = tracemalloc.get_traced_memory()[0]
+            self._peaks.append(0)
+        if self._profiler is not None and len(self._stack) == 1:
+            self._profiler.enable()
+        t0 = time.perf_counter()
+        try:
+            yield self
+        finally:
+            seconds = time.perf_counter() - t0
+            if self._profiler is not None and len(self._stack) == 1:
+                self._profiler.disable()
+            row = {'stage': path, 'seconds': round(seconds, 6)}
+            if self.memory:
+                peak = max(self._peaks.pop(), tracemalloc.get_traced_memory()[1])
+                row['peak_bytes'] = max(peak - start_bytes, 0)
+                if self._peaks:
+                    self._peaks[-1] = max(self._peaks[-1], peak)
+                if not tracing:
+                    tracemalloc.stop()
+            self.stages.append(row)
+            self._stack.pop()
+
+    def count(self, **counters):
+        self.counters.update(counters)
+
+    def report(self, top: int = 25) -> Dict:
+        """Structured report: stages in completion order, counters and (with cpu=True) hotspots."""
+        out = {
+            'stages': self.stages,
+            'total_seconds': round(sum(r['seconds'] for r in self.stages if '/' not in r['stage']), 6),
+            'counters': self.counters,
+        }
+        if self._profiler is not None:
+            import pstats
+
+            stats = pstats.Stats(self._profiler)
+            rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]
+            out['hotspots'] = [
+                {'function': f'{filename}:{line}({func})', 'calls': nc, 'tottime': round(tt, 6), 'cumtime': round(ct, 6)}
+                for (filename, line, func), (cc, nc, tt, ct, _) in rows
+            ]
+        return out
+
+
+def _stage(profile: Optional[RunProfile], name: str):
+    return profile.stage(name) if profile is not None else nullcontext()
+
+
+def width_summary(values: List[int]) -> Dict:
+    """count/min/max/mean/p50/p90 of a list of sizes (layer widths, SCC sizes)."""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+    n = len(ordered)
+    return {'count': n, 'min': ordered[0], 'max': ordered[-1], 'mean': round(sum(ordered) / n, 3),
+            'p50': ordered[(n - 1) // 2], 'p90': ordered[(n - 1) * 9 // 10]}
+
+
 # Utility: find patch that affects a dependency (simple match)
 def find_patch_affecting(dep: Dependency, patches_by_id: Dict[str, Patch]) -> Optional[str]:
     for pid, p in patches_by_id.items():
@@ -53,73 +176,195 @@ def find_patch_affecting(dep: Dependency, patches_by_id: Dict[str, Patch]) -> Op
     return None
 
 
+def object_key(dep: Dependency) -> Tuple[str, str, str]:
+    return (dep.schema, dep.name, dep.kind)
+
+
+# Index (schema, name, kind) -> ids of every patch that affects that object.
+# Built once per run so dependency resolution is a dict lookup instead of a scan over all patches.
+def build_affects_index(patches: List[Patch]) -> Dict[Tuple[str, str, str], List[str]]:
+    index: Dict[Tuple[str, str, str], List[str]] = {}
+    for p in patches:
+        for a in p.affects:
+            producers = index.setdefault(object_key(a), [])
+            # a patch listing the same object twice is still one producer
+            if not producers or producers[-1] != p.id:
+                producers.append(p.id)
+    return index
+
+
+class CompactGraph:
+    """Integer-coded dependency graph with array-backed (CSR) edge storage.
+
+    Patches are numbered 0..n-1 in first-seen id order; the successors of node i are
+    targets[offsets[i]:offsets[i + 1]] (ascending). Indexing the graph (graph[i]) yields those
+    successors, so it can be passed straight to tarjan_scc_int.
+    """
+
+    __slots__ = ('ids', 'patches', 'pos', 'offsets', 'targets', 'indegree', 'unmatched')
+
+    def __init__(self, ids, patches, pos, offsets, targets, indegree, unmatched):
+        self.ids: List[str] = ids
+        self.patches: List[Patch] = patches
+        self.pos: Dict[str, int] = pos
+        self.offsets = offsets
+        self.targets = targets
+        self.indegree = indegree
+        self.unmatched: List[Tuple[str, Dependency]] = unmatched
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i: int):
+        return self.targets[self.offsets[i]:self.offsets[i + 1]]
+
+
 # Build graph edges (Q -> P where P depends on Q)
-def build_graph(patches: List[Patch]):
-    nodes = {p.id: p for p in patches}
-    edges: Dict[str, Set[str]] = {p.id: set() for p in patches}
-    indegree: Dict[str, int] = {p.id: 0 for p in patches}
+#
+# Multi-producer policy: when several patches affect the object P depends on, every one of them
+# (other than P itself) becomes an edge Q -> P, so P is scheduled after all of its producers.
+# A dependency only P itself produces is satisfied (no edge, not unmatched).
+def build_compact_graph(patches: List[Patch]) -> CompactGraph:
+    pos: Dict[str, int] = {}
+    nodes: List[Patch] = []
+    for p in patches:
+        i = pos.get(p.id)
+        if i is None:
+            pos[p.id] = len(nodes)
+            nodes.append(p)
+        else:
+            nodes[i] = p  # same last-wins rule as {p.id: p for p in patches}
+    n = len(nodes)
+    index = build_affects_index(patches)
     unmatched = []
 
+    # incoming producer lists per node, deduplicated below
+    incoming: List[Optional[List[int]]] = [None] * n
     for p in patches:
+        i = pos[p.id]
+        srcs = incoming[i]
         for d in p.dependencies:
-            qid = find_patch_affecting(d, nodes)
-            if qid:
-                if qid != p.id and p.id not in edges[qid]:
-                    edges[qid].add(p.id)
-                    indegree[p.id] += 1
+            producers = index.get(object_key(d))
+            if producers:
+                for qid in producers:
+                    q = pos[qid]
+                    if q != i:
+                        if srcs is None:
+                            srcs = incoming[i] = []
+                        srcs.append(q)
             else:
                 unmatched.append((p.id, d))
-    # compute fanout
-    for pid in edges:
-        nodes[pid].fanout = len(edges[pid])
-    return nodes, edges, indegree, unmatched
+
+    indegree = array('i', [0]) * n
+    outdeg = [0] * n
+    for i in range(n):
+        srcs = incoming[i]
+        if srcs:
+            if len(srcs) > 1:
+                srcs = incoming[i] = list(dict.fromkeys(srcs))
+            indegree[i] = len(srcs)
+            for q in srcs:
+                outdeg[q] += 1
+
+    offsets = array('i', [0]) * (n + 1)
+    total = 0
+    for i in range(n):
+        offsets[i] = total
+        total += outdeg[i]
+        nodes[i].fanout = outdeg[i]
+    offsets[n] = total
+    targets = array('i', [0]) * total
+    fill = offsets[:n]
+    for i in range(n):
+        srcs = incoming[i]
+        if srcs:
+            for q in srcs:
+                targets[fill[q]] = i
+                fill[q] += 1
+    return CompactGraph([p.id for p in nodes], nodes, pos, offsets, targets, indegree, unmatched)
+
+
+# Dict-of-sets view of the same graph, for callers that want string ids
+def build_graph(patches: List[Patch]):
+    graph = build_compact_graph(patches)
+    ids = graph.ids
+    nodes = {pid: p for pid, p in zip(ids, graph.patches)}
+    edges: Dict[str, Set[str]] = {pid: {ids[j] for j in graph[i]} for i, pid in enumerate(ids)}
+    indegree: Dict[str, int] = dict(zip(ids, graph.indegree))
+    return nodes, edges, indegree, graph.unmatched
 
 
 # Tarjan's SCC to detect cycles
+#
+# Iterative formulation: nodes are numbered 0..n-1 in insertion order, index/lowlink live in flat
+# lists and an explicit work stack of (node, neighbour iterator) replaces recursion, so a chain of
+# any length is bounded by memory rather than the interpreter recursion limit. SCCs (size > 1) are
+# reported in the same order, with members in the same order, as the classic recursive version.
 class TarjanSCC:
     def __init__(self, nodes: Dict[str, Patch], edges: Dict[str, Set[str]]):
         self.nodes = list(nodes.keys())
         self.edges = edges
-        self.index = 0
-        self.stack = []
-        self.onstack = set()
-        self.indexes = {}
-        self.lowlink = {}
         self.sccs = []
 
     def run(self):
-        for v in self.nodes:
-            if v not in self.indexes:
-                self.strongconnect(v)
+        ids = self.nodes
+        pos = {pid: i for i, pid in enumerate(ids)}
+        adj = [[pos[w] for w in self.edges.get(pid, ()) if w in pos] for pid in ids]
+        self.sccs = [[ids[i] for i in scc] for scc in tarjan_scc_int(adj)]
         return self.sccs
 
-    def strongconnect(self, v):
-        self.indexes[v] = self.index
-        self.lowlink[v] = self.index
-        self.index += 1
-        self.stack.append(v)
-        self.onstack.add(v)
-
-        for w in self.edges.get(v, []):
-            if w not in self.indexes:
-                self.strongconnect(w)
-                self.lowlink[v] = min(self.lowlink[v], self.lowlink[w])
-            elif w in self.onstack:
-                self.lowlink[v] = min(self.lowlink[v], self.indexes[w])
-
-        if self.lowlink[v] == self.indexes[v]:
-            scc = []
-            while True:
-                w = self.stack.pop()
-                self.onstack.remove(w)
-                scc.append(w)
-                if w == v:
+
+def tarjan_scc_int(adj: List[List[int]]) -> List[List[int]]:
+    """Return the non-trivial SCCs (size > 1) of an integer adjacency list."""
+    n = len(adj)
+    index = [-1] * n
+    lowlink = [0] * n
+    onstack = bytearray(n)
+    stack: List[int] = []
+    sccs: List[List[int]] = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        onstack[root] = 1
+        work = [(root, iter(adj[root]))]
+        while work:
+            v, it = work[-1]
+            for w in it:
+                if index[w] == -1:
+                    index[w] = lowlink[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    onstack[w] = 1
+                    work.append((w, iter(adj[w])))
                     break
-            if len(scc) > 1:
-                self.sccs.append(scc)
+                if onstack[w] and index[w] < lowlink[v]:
+                    lowlink[v] = index[w]
+            else:
+                # all neighbours of v explored: propagate lowlink to the parent, maybe emit an SCC
+                work.pop()
+                if work:
+                    u = work[-1][0]
+                    if lowlink[v] < lowlink[u]:
+                        lowlink[u] = lowlink[v]
+                if lowlink[v] == index[v]:
+                    scc = []
+                    while True:
+                        w = stack.pop()
+                        onstack[w] = 0
+                        scc.append(w)
+                        if w == v:
+                            break
+                    if len(scc) > 1:
+                        sccs.append(scc)
+    return sccs
 
 
-# Priority key for heapq (min-heap) -> we want higher priority first, so negate values appropriately
+# Priority key (ascending sort / min-heap order) -> we want higher priority first, so negate values appropriately
 def priority_key(patch: Patch) -> Tuple[int, int, int, int, str]:
     # higher classification priority first -> negate
     cp = -CLASS_PRIORITY.get(patch.classification, 0)
@@ -133,58 +378,284 @@ def priority_key(patch: Patch) -> Tuple[int, int, int, int, str]:
     return (cp, conf, ip, fo, patch.id)
 
 
+def rank_by_priority(nodes: List[Patch]) -> List[int]:
+    """Return node indices sorted by priority_key.
+
+    The four numeric components are packed into one int per patch (mixed radix, each component
+    offset by its minimum), and a stable sort by id runs first to break ties. Sorting plain ints
+    is several times faster than comparing 5-tuples. Non-integer values fall back to tuple keys.
+    """
+    n = len(nodes)
+    cls = [-CLASS_PRIORITY.get(p.classification, 0) for p in nodes]
+    conf = [-p.confidence for p in nodes]
+    imp = [-IMPACT_PRIORITY.get(p.impact, 0) for p in nodes]
+    fan = [-p.fanout for p in nodes]
+    if not n or not all(set(map(type, comp)) <= {int} for comp in (cls, conf, imp, fan)):
+        keys = [priority_key(p) for p in nodes]
+        return sorted(range(n), key=keys.__getitem__)
+
+    lo = [min(comp) for comp in (cls, conf, imp, fan)]
+    s1, s2, s3 = (max(comp) - low + 1 for comp, low in zip((conf, imp, fan), lo[1:]))
+    packed = [
+        (((a - lo[0]) * s1 + (b - lo[1])) * s2 + (c - lo[2])) * s3 + (d - lo[3])
+        for a, b, c, d in zip(cls, conf, imp, fan)
+    ]
+    ids = [p.id for p in nodes]
+    order = sorted(range(n), key=ids.__getitem__)
+    order.sort(key=packed.__getitem__)
+    return order
+
+
 def detect_cycles(nodes, edges):
     tarjan = TarjanSCC(nodes, edges)
     cycles = tarjan.run()
     return cycles if cycles else None
 
 
-# Kahn's algorithm with priority queue
-def schedule_patches(patches: List[Patch]):
-    nodes, edges, indegree, unmatched = build_graph(patches)
-    cycles = detect_cycles(nodes, edges)
-    if cycles:
-        return {'status': 'blocked', 'cycles': cycles, 'unmatched': unmatched}
+def detect_cycles_compact(graph: CompactGraph):
+    ids = graph.ids
+    cycles = [[ids[i] for i in scc] for scc in tarjan_scc_int(graph)]
+    return cycles if cycles else None
+
+
+# Feedback arc set, per SCC (Eades-Lin-Smyth greedy heuristic)
+#
+# Builds a vertex sequence by repeatedly peeling sinks onto its right end, sources onto its left
+# end and, when neither exists, the vertex with the largest outdegree - indegree onto the left.
+# The edges pointing backwards in that sequence break every cycle, and there are at most
+# |E|/2 - |V|/6 of them. Vertices wait in buckets keyed by that delta, so the pass is O(V + E) per
+# SCC. A second pass puts back each arc that closes no cycle among the kept edges (a DFS from its
+# head), shrinking the set towards a minimal one. Done exactly that is O(F * (V + E)) for F arcs,
+# so it stops after minimize_work * (V + E) edge visits per SCC and keeps the arcs it did not get
+# to; the whole computation stays linear in the size of the cyclic part of the graph.
+FAS_MINIMIZE_WORK = 8
+
 
-    # priority queue seeded with indegree == 0
-    heap = []
-    for pid, deg in indegree.items():
-        if deg == 0:
-            heapq.heappush(heap, (priority_key(nodes[pid]), pid))
+def greedy_feedback_arcs(graph, members: List[int],
+                         minimize_work: int = FAS_MINIMIZE_WORK) -> List[Tuple[int, int]]:
+    """Return (producer, dependent) edges whose removal makes the SCC `members` of `graph` acyclic."""
+    n = len(members)
+    local = {v: k for k, v in enumerate(members)}
+    succ = [[local[w] for w in graph[v] if w in local] for v in members]
+    pred: List[List[int]] = [[] for _ in range(n)]
+    for u in range(n):
+        for w in succ[u]:
+            pred[w].append(u)
+    outd = [len(s) for s in succ]
+    ind = [len(p) for p in pred]
+    delta = [o - i for o, i in zip(outd, ind)]
+    buckets: Dict[int, Set[int]] = {}
+    for v in range(n):
+        buckets.setdefault(delta[v], set()).add(v)
+    top = max(delta, default=0)
+    where = bytearray(n)  # 0: in a bucket, 1: queued as sink/source, 2: placed
+    sinks: List[int] = []
+    sources: List[int] = []
+    left: List[int] = []
+    right: List[int] = []
 
-    layers = []
+    for _ in range(n):
+        if sinks:
+            v = sinks.pop()
+            right.append(v)
+        elif sources:
+            v = sources.pop()
+            left.append(v)
+        else:
+            while not buckets.get(top):
+                top -= 1
+            v = buckets[top].pop()
+            left.append(v)
+        where[v] = 2
+        for w in succ[v]:
+            if where[w] != 2:
+                ind[w] -= 1
+                if where[w] == 0:
+                    buckets[delta[w]].discard(w)
+                    if ind[w] == 0:
+                        where[w] = 1
+                        sources.append(w)
+                    else:
+                        delta[w] += 1
+                        buckets.setdefault(delta[w], set()).add(w)
+                        if delta[w] > top:
+                            top = delta[w]
+        for u in pred[v]:
+            if where[u] != 2:
+                outd[u] -= 1
+                if where[u] == 0:
+                    buckets[delta[u]].discard(u)
+                    if outd[u] == 0:
+                        where[u] = 1
+                        sinks.append(u)
+                    else:
+                        delta[u] -= 1
+                        buckets.setdefault(delta[u], set()).add(u)
 
+    position = [0] * n
+    for k, v in enumerate(left + right[::-1]):
+        position[v] = k
+    arcs = [(u, w) for u in range(n) for w in succ[u] if position[u] > position[w]]
+
+    budget = minimize_work * (n + sum(map(len, succ)))
+    kept = [[w for w in succ[u] if position[u] < position[w]] for u in range(n)]
+    seen = [0] * n
+    needed = []
+    for stamp, (u, w) in enumerate(arcs, 1):
+        if budget <= 0:
+            needed.append((u, w))
+            continue
+        # does w already reach u through the kept edges?
+        seen[w] = stamp
+        stack = [w]
+        while stack and seen[u] != stamp:
+            out = kept[stack.pop()]
+            budget -= len(out)
+            for x in out:
+                if seen[x] != stamp:
+                    seen[x] = stamp
+                    stack.append(x)
+        if seen[u] == stamp or budget <= 0:
+            needed.append((u, w))
+        else:
+            kept[u].append(w)
+    arcs = needed
+    return [(members[u], members[w]) for u, w in arcs]
+
+
+def feedback_patch_cover(arcs: List[Tuple[int, int]]) -> List[int]:
+    """Greedy vertex cover of feedback arcs: patches whose removal also breaks every cycle."""
+    incident: Dict[int, List[int]] = {}
+    for k, (u, w) in enumerate(arcs):
+        incident.setdefault(u, []).append(k)
+        incident.setdefault(w, []).append(k)
+    degree = {v: len(ks) for v, ks in incident.items()}
+    heap = [(-d, v) for v, d in degree.items()]
+    heapq.heapify(heap)
+    covered = bytearray(len(arcs))
+    cover = []
     while heap:
-        # snapshot current heap into current layer
-        layer = []
-        # we pop everything currently in heap to form the layer (deterministic order)
-        current = []
-        while heap:
-            key, pid = heapq.heappop(heap)
-            current.append(pid)
-        # store current layer
-        layers.append(current)
-        # remove nodes in current layer and decrease indegree
-        for pid in current:
-            for m in edges.get(pid, []):
+        d, v = heapq.heappop(heap)
+        if -d != degree[v]:
+            if degree[v]:
+                heapq.heappush(heap, (-degree[v], v))
+            continue
+        if not d:
+            break
+        cover.append(v)
+        for k in incident[v]:
+            if not covered[k]:
+                covered[k] = 1
+                u, w = arcs[k]
+                degree[w if u == v else u] -= 1
+        degree[v] = 0
+    return cover
+
+
+def feedback_edge_records(graph: CompactGraph, arcs: List[Tuple[int, int]]) -> List[Dict]:
+    """Describe feedback arcs as {'from', 'to', 'objects'}: `to` depends on `objects` produced by `from`."""
+    records = []
+    for u, w in arcs:
+        produced = {object_key(a) for a in graph.patches[u].affects}
+        objects = [{'schema': d.schema, 'name': d.name, 'kind': d.kind}
+                   for d in graph.patches[w].dependencies if object_key(d) in produced]
+        records.append({'from': graph.ids[u], 'to': graph.ids[w], 'objects': objects})
+    return records
+
+
+# Kahn's algorithm, single sweep
+#
+# One Kahn pass over the CSR arrays computes each patch's layer (its longest-path depth: a patch
+# becomes free in the round after its last producer) and doubles as the cycle check; Tarjan only
+# runs when that pass cannot consume every node. Priority keys are packed once per patch and
+# turned into a global rank by one sort (rank_by_priority); bucketing patches into layers in rank order leaves every
+# layer already sorted, and phases are filled while the layers are emitted. The result is the
+# same as popping each round from a priority_key min-heap.
+#
+# blocking=False keeps going when the sweep stalls: the patches it did consume (everything not in
+# or downstream of a cycle) are layered as usual, the rest are reported as `held`, and each SCC gets
+# a feedback arc set (greedy_feedback_arcs) plus a patch cover of those arcs as break suggestions.
+def schedule_patches(patches: List[Patch], profile: Optional[RunProfile] = None, blocking: bool = True):
+    with _stage(profile, 'build_graph'):
+        graph = build_compact_graph(patches)
+    unmatched = graph.unmatched
+    ids, nodes = graph.ids, graph.patches
+    offsets, targets = graph.offsets, graph.targets
+    n = len(ids)
+    if profile is not None:
+        profile.count(patches=n, edges=len(targets), unmatched_dependencies=len(unmatched))
+
+    with _stage(profile, 'layering'):
+        indegree = array('i', graph.indegree)
+        depth = [0] * n
+        order = [i for i in range(n) if indegree[i] == 0]
+        for i in order:
+            d = depth[i] + 1
+            for k in range(offsets[i], offsets[i + 1]):
+                m = targets[k]
+                if depth[m] < d:
+                    depth[m] = d
                 indegree[m] -= 1
                 if indegree[m] == 0:
-                    heapq.heappush(heap, (priority_key(nodes[m]), m))
+                    order.append(m)
+    partial = None
+    if len(order) < n:
+        with _stage(profile, 'detect_cycles'):
+            sccs = tarjan_scc_int(graph)
+        cycles = [[ids[i] for i in scc] for scc in sccs]
+        if profile is not None:
+            profile.count(scc_sizes=width_summary([len(c) for c in cycles]))
+        if blocking:
+            return {'status': 'blocked', 'cycles': cycles, 'unmatched': unmatched}
+        with _stage(profile, 'feedback_arcs'):
+            arcs = [arc for scc in sccs for arc in greedy_feedback_arcs(graph, scc)]
+            cover = feedback_patch_cover(arcs)
+        scheduled = bytearray(n)
+        for i in order:
+            scheduled[i] = 1
+        partial = {
+            'cycles': cycles,
+            'held': [ids[i] for i in range(n) if not scheduled[i]],
+            'feedback_edges': feedback_edge_records(graph, arcs),
+            'feedback_patches': [ids[i] for i in cover],
+        }
+        if profile is not None:
+            profile.count(held_patches=len(partial['held']), feedback_edges=len(arcs))
+
+    with _stage(profile, 'rank'):
+        ranked = rank_by_priority(nodes)
+        if partial is not None:
+            ranked = [i for i in ranked if scheduled[i]]
 
-    # Convert layers into phases grouped by classification order
-    phases = []
-    # Flatten layers, then group by classification priority batches
-    # Simpler: keep layers as-is and also present phase hints
-    phase_map = { 'Additive': [], 'Corrective': [], 'Destructive': [] }
-    for layer in layers:
-        for pid in layer:
-            phase_map[nodes[pid].classification].append(pid)
+    with _stage(profile, 'emit_layers'):
+        top = max(depth, default=-1) if partial is None else max((depth[i] for i in order), default=-1)
+        buckets: List[List[int]] = [[] for _ in range(top + 1)]
+        for i in ranked:
+            buckets[depth[i]].append(i)
+
+        layers = []
+        phase_map = {'Additive': [], 'Corrective': [], 'Destructive': []}
+        for bucket in buckets:
+            layer = []
+            for i in bucket:
+                pid = ids[i]
+                layer.append(pid)
+                phase_map[nodes[i].classification].append(pid)
+            layers.append(layer)
+    if profile is not None:
+        if partial is None:
+            profile.count(scc_sizes=width_summary([]))
+        profile.count(layer_widths=width_summary([len(layer) for layer in layers]))
 
     # produce ordered phases
-    phases.append(('Additive', phase_map['Additive']))
-    phases.append(('Corrective', phase_map['Corrective']))
-    phases.append(('Destructive', phase_map['Destructive']))
+    phases = [
+        ('Additive', phase_map['Additive']),
+        ('Corrective', phase_map['Corrective']),
+        ('Destructive', phase_map['Destructive']),
+    ]
 
+    if partial is not None:
+        return {'status': 'partial', 'layers': layers, 'phases': phases, 'unmatched': unmatched, **partial}
     return {'status': 'ok', 'layers': layers, 'phases': phases, 'unmatched': unmatched}
 
 
@@ -246,19 +717,32 @@ def parse_dependency(obj):
             else:
                 name = rest
                 kind = 'table'
-            return Dependency(schema, name, kind)
+            return intern_dependency(schema, name, kind)
         # fallback: treat as name in public
-        return Dependency('public', obj, 'table')
+        return intern_dependency('public', obj, 'table')
 
     if isinstance(obj, dict):
         schema = obj.get('schema') or obj.get('object_schema') or obj.get('schema_name') or 'public'
         name = obj.get('name') or obj.get('object_name') or obj.get('object_id') or obj.get('object') or ''
         kind = obj.get('kind') or obj.get('object_type') or obj.get('type') or 'table'
-        return Dependency(schema, name, kind)
+        return intern_dependency(schema, name, kind)
 
     return None
 
 
+_CANONICAL_JSON = json.JSONEncoder(sort_keys=True, separators=(',', ':'), default=str)
+
+
+def auto_finding_id(finding: Dict) -> str:
+    """Deterministic id for a finding without one: a digest of its canonical JSON.
+
+    Unlike the builtin hash() this is stable across processes (PYTHONHASHSEED) and independent of
+    key order, so reruns and bundle workers agree on the generated ids.
+    """
+    canonical = _CANONICAL_JSON.encode(finding)
+    return 'auto_' + hashlib.blake2b(canonical.encode('utf-8'), digest_size=8).hexdigest()
+
+
 def map_finding_to_patch(finding: Dict) -> Patch:
     """Map a parser finding JSON object to a Patch instance.
 
@@ -266,8 +750,7 @@ def map_finding_to_patch(finding: Dict) -> Patch:
     """
     fid = finding.get('id') or finding.get('finding_id') or finding.get('name')
     if not fid:
-        # generate a deterministic id if missing
-        fid = f"auto_{abs(hash(json.dumps(finding))) % (10**8)}"
+        fid = auto_finding_id(finding)
 
     classification = finding.get('classification') or finding.get('class') or 'Corrective'
     classification = classification.capitalize()
@@ -281,7 +764,6 @@ def map_finding_to_patch(finding: Dict) -> Patch:
         confidence = 50
 
     # Support legacy field 'estimated_impact' as well as 'impact' and 'severity'
-    # TODO: normalization layer extension point - add severity normalization and canonicalization here as the parser evolves
     impact = finding.get('impact') or finding.get('severity') or finding.get('estimated_impact') or 'medium'
 
     # Dependencies (things this patch depends on)
@@ -304,21 +786,174 @@ def map_finding_to_patch(finding: Dict) -> Patch:
     if not affects:
         obj_name = finding.get('object_name') or finding.get('name')
         if obj_name:
-            affects.append(Dependency(finding.get('schema', 'public'), obj_name, finding.get('object_type') or finding.get('kind') or 'table'))
+            affects.append(intern_dependency(finding.get('schema', 'public'), obj_name, finding.get('object_type') or finding.get('kind') or 'table'))
+
+    impact_norm = sys.intern(impact.lower()) if isinstance(impact, str) else 'medium'
+
+    return Patch(id=fid, classification=sys.intern(classification), confidence=confidence, impact=impact_norm, dependencies=deps, affects=affects)
+
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+
+
+class _JsonStream:
+    """Incremental reader over a text file: decodes one JSON value at a time with
+    json.JSONDecoder.raw_decode, so only the value being decoded is ever buffered."""
+
+    def __init__(self, fh, chunk_size: int = 1 << 16):
+        self.fh = fh
+        self.chunk_size = chunk_size
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, want: int = 0) -> bool:
+        if self.eof:
+            return False
+        if self.pos:
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+        data = self.fh.read(max(self.chunk_size, want))
+        if not data:
+            self.eof = True
+            return False
+        self.buf += data
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at end of input)."""
+        while True:
+            buf, pos, n = self.buf, self.pos, len(self.buf)
+            while pos < n and buf[pos] in ' \t\r\n':
+                pos += 1
+            self.pos = pos
+            if pos < n:
+                return buf[pos]
+            if not self._fill():
+                return ''
+
+    def take(self, expected: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in expected:
+            raise ValueError(f"Malformed findings JSON: expected one of {expected!r}, got {ch or 'end of input'!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                # value continues past the buffered text: read more (doubling) and retry
+                if not self._fill(len(self.buf)):
+                    raise
+                continue
+            # a number/literal ending exactly at the buffer edge may be truncated
+            if end == len(self.buf) and self._fill(len(self.buf)):
+                continue
+            self.pos = end
+            return obj
+
+
+def _iter_stream_array(stream: _JsonStream):
+    stream.take('[')
+    if stream.peek() == ']':
+        stream.pos += 1
+        return
+    while True:
+        yield stream.value()
+        if stream.take(',]') == ']':
+            return
+
+
+def _iter_stream_values(stream: _JsonStream):
+    while stream.peek():
+        yield stream.value()
+
+
+def _expect_end(stream: _JsonStream):
+    # json.load rejects anything after the top-level value ("Extra data"); so does the stream
+    if stream.peek():
+        raise ValueError('Malformed findings JSON: extra data after the top-level value')
+
+
+def _iter_stream_object(stream: _JsonStream, layout: Dict):
+    # Walk the top-level object key by key: stream 'findings', decode and drop sibling values.
+    stream.take('{')
+    found = False
+    if stream.peek() == '}':
+        stream.pos += 1
+    else:
+        while True:
+            key = stream.value()
+            stream.take(':')
+            if key == 'findings' and stream.peek() == '[':
+                found = True
+                layout['shape'] = 'wrapped'
+                yield from _iter_stream_array(stream)
+            else:
+                stream.value()
+            if stream.take(',}') == '}':
+                break
+    if found:
+        _expect_end(stream)
+        return
+    # NDJSON is chosen by extension only: several top-level objects in a .json file are rejected,
+    # as json.load rejects them in full mode
+    _expect_end(stream)
+    raise ValueError('Unsupported JSON schema: top-level list or {"findings": [...]} expected')
+
+
+def iter_findings(path: str, chunk_size: int = 1 << 16, layout: Optional[Dict] = None):
+    """Yield raw finding dicts from `path` without loading the whole document.
+
+    Accepts a top-level list, a {"findings": [...]} wrapper, or NDJSON (one finding per line) when
+    the file has a .ndjson/.jsonl extension. As with json.load, anything after the top-level value
+    of any other file is an error, even another JSON document. If `layout` is given,
+    layout['shape'] is set to 'list', 'wrapped' or 'ndjson' before the first finding is yielded.
+    """
+    with open(path, 'r', encoding='utf-8') as fh:
+        yield from iter_findings_from(fh, path.endswith(NDJSON_EXTENSIONS), chunk_size, layout)
+
+
+def iter_findings_from(fh, ndjson: bool = False, chunk_size: int = 1 << 16, layout: Optional[Dict] = None):
+    """iter_findings over an already-open text stream (anything with read(n) -> str)."""
+    layout = {} if layout is None else layout
+    stream = _JsonStream(fh, chunk_size)
+    first = stream.peek()
+    if ndjson:
+        layout['shape'] = 'ndjson'
+        yield from _iter_stream_values(stream)
+    elif first == '[':
+        layout['shape'] = 'list'
+        yield from _iter_stream_array(stream)
+        _expect_end(stream)
+    elif first == '{':
+        yield from _iter_stream_object(stream, layout)
+    else:
+        raise ValueError('Unsupported JSON schema: top-level list or {"findings": [...]} expected')
 
-    impact_norm = impact.lower() if isinstance(impact, str) else 'medium'
 
-    return Patch(id=fid, classification=classification, confidence=confidence, impact=impact_norm, dependencies=deps, affects=affects)
+def iter_patches(path: str, chunk_size: int = 1 << 16):
+    """Streaming counterpart of parse_json_findings: map each finding to a Patch as it is read."""
+    for f in iter_findings(path, chunk_size):
+        yield map_finding_to_patch(f)
 
 
-def parse_json_findings(path: str) -> List[Patch]:
+def parse_json_findings(path: str, stream: bool = False, profile: Optional[RunProfile] = None) -> List[Patch]:
     if not os.path.exists(path):
         print(f"Input file not found: {path}", file=sys.stderr)
         sys.exit(2)
-    with open(path, 'r', encoding='utf-8') as fh:
-        data = json.load(fh)
-    # TODO: In future, support bundles or multi-file introspection outputs (schema.json, tables.json, indexes.json)
-    # and implement cross-file dependency resolution prior to mapping to Patch objects.
+    if stream or path.endswith(NDJSON_EXTENSIONS):
+        # parsing and mapping are interleaved: one stage covers both
+        with _stage(profile, 'stream'):
+            return list(iter_patches(path))
+    with _stage(profile, 'parse'):
+        with open(path, 'r', encoding='utf-8') as fh:
+            data = json.load(fh)
+    # Multi-file introspection outputs (schema.json, tables.json, indexes.json) go through load_bundle.
     # support either top-level list or {'findings': [...]}
     if isinstance(data, dict) and 'findings' in data:
         arr = data['findings']
@@ -327,7 +962,66 @@ def parse_json_findings(path: str) -> List[Patch]:
     else:
         raise ValueError('Unsupported JSON schema: top-level list or {"findings": [...]} expected')
 
-    patches = [map_finding_to_patch(f) for f in arr]
+    with _stage(profile, 'map'):
+        patches = [map_finding_to_patch(f) for f in arr]
+    return patches
+
+
+# Well-known bundle members come first (in this order); any other findings files follow sorted by name.
+BUNDLE_MEMBERS = ('schema.json', 'tables.json', 'indexes.json')
+BUNDLE_EXTENSIONS = ('.json',) + NDJSON_EXTENSIONS
+
+
+def bundle_members(path: str) -> List[str]:
+    """List the findings files of a bundle directory in deterministic load order."""
+    names = [n for n in os.listdir(path) if n.endswith(BUNDLE_EXTENSIONS) and os.path.isfile(os.path.join(path, n))]
+    rank = {n: i for i, n in enumerate(BUNDLE_MEMBERS)}
+    names.sort(key=lambda n: (rank.get(n, len(BUNDLE_MEMBERS)), n))
+    return [os.path.join(path, n) for n in names]
+
+
+def _load_bundle_member(path: str, stream: bool) -> List[Patch]:
+    return parse_json_findings(path, stream=stream)
+
+
+def load_bundle(paths, workers: Optional[int] = None, stream: bool = False,
+                profile: Optional[RunProfile] = None) -> List[Patch]:
+    """Load a multi-file introspection bundle into one patch list.
+
+    `paths` is a bundle directory or a list of findings files. Members are parsed concurrently in a
+    process pool (`workers` processes, default one per member up to the CPU count; 1 parses
+    serially), so load time is bounded by the largest member. Patches are concatenated in member
+    order regardless of completion order, and their dependencies are re-interned in this process so
+    cross-file references share one object index when the graph is built. With a `profile`, a
+    single file is timed as parse/map stages; pooled members only as one 'members' stage.
+    """
+    if isinstance(paths, str):
+        if not os.path.isdir(paths):
+            return parse_json_findings(paths, stream=stream, profile=profile)
+        paths = bundle_members(paths)
+    paths = list(paths)
+    for path in paths:
+        if not os.path.exists(path):
+            print(f"Input file not found: {path}", file=sys.stderr)
+            sys.exit(2)
+    if workers is None:
+        workers = min(len(paths), os.cpu_count() or 1)
+    if profile is not None:
+        profile.count(bundle_members=len(paths))
+    if workers <= 1 or len(paths) <= 1:
+        with _stage(profile, 'members'):
+            return [p for path in paths for p in _load_bundle_member(path, stream)]
+
+    with _stage(profile, 'members'):
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_load_bundle_member, paths, [stream] * len(paths)))
+    patches = []
+    with _stage(profile, 'reintern'):
+        for part in parts:
+            for p in part:
+                p.dependencies = [intern_dependency(d.schema, d.name, d.kind) for d in p.dependencies]
+                p.affects = [intern_dependency(a.schema, a.name, a.kind) for a in p.affects]
+                patches.append(p)
     return patches
 
 
@@ -345,16 +1039,132 @@ def run_demo():
 
 def main():
     parser = argparse.ArgumentParser(description='Sequencer runner - accepts optional parser-output JSON via --input')
-    parser.add_argument('--input', '-i', help='Path to parser-output JSON file (list or {"findings":[...]})')
+    parser.add_argument('--input', '-i', help='Path to parser-output JSON file (list, {"findings":[...]} or NDJSON) or a bundle directory')
+    parser.add_argument('--stream', action='store_true', help='Read findings incrementally instead of loading the whole file')
+    parser.add_argument('--workers', type=int, help='Processes used to parse bundle members (default: one per member, up to CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Always recompute the plan instead of using the result cache')
+    parser.add_argument('--cache-dir', help='Result cache directory (default: $SEQUENCER_CACHE_DIR or ~/.cache/ai-mall-sequencer)')
+    parser.add_argument('--cache-max-mb', type=int, default=256, help='Evict least recently used cache entries beyond this size (default 256)')
+    parser.add_argument('--validate', action='store_true', help='Validate, normalize and collect signals while reading the input (single pass); refuse to schedule on errors')
+    parser.add_argument('--expect-sha256', help='With --validate: expected SHA-256 of the input artifact')
+    parser.add_argument('--break-cycles', action='store_true',
+                        help='Do not stop at cycles: schedule the acyclic remainder and suggest edges/patches that break each cycle')
+    parser.add_argument('--shard-workers', type=int,
+                        help='Schedule independent schemas/components in this many processes (same result as serial)')
+    parser.add_argument('--catalog', help='Introspection catalog snapshot; unmatched dependencies that already exist in it are dropped')
+    parser.add_argument('--plan-workers', type=int, help='Also emit a parallel execution plan for this many migration workers')
+    parser.add_argument('--costs', help='JSON file mapping patch id -> estimated cost, used with --plan-workers')
+    parser.add_argument('--format', choices=('text', 'json', 'ndjson'), default='text',
+                        help='Plan output format: text (default, human-readable), json or ndjson (streamed layer by layer)')
+    parser.add_argument('--output', '-o', help='Write the json/ndjson plan to this file instead of stdout')
+    parser.add_argument('--plan-file', help='Also write the plan as a columnar binary file (see sequencer_output.read_plan_file)')
+    parser.add_argument('--quiet', '-q', action='store_true', help='Skip the per-patch listing; text format prints a one-line summary instead of the full result')
+    parser.add_argument('--profile-report', help='Write a JSON report of per-stage timings and counters to this file')
+    parser.add_argument('--profile-cpu', action='store_true', help='With --profile-report: add the top cProfile entries (by cumulative time)')
+    parser.add_argument('--profile-memory', action='store_true', help='With --profile-report: add tracemalloc peak memory per stage')
     args = parser.parse_args()
+    if args.output and args.format == 'text':
+        parser.error('--output requires --format json or ndjson')
+    if (args.profile_cpu or args.profile_memory) and not args.profile_report:
+        parser.error('--profile-cpu/--profile-memory require --profile-report')
 
     if args.input:
-        patches = parse_json_findings(args.input)
-        print(f"Loaded {len(patches)} patches from {args.input}")
-        for p in patches:
-            print(f"- {p.id} | {p.classification} | conf={p.confidence} | impact={p.impact} | deps={len(p.dependencies)} | affects={len(p.affects)}")
-        result = schedule_patches(patches)
-        pprint.pprint(result)
+        from sequencer_cache import SequencerCache, schedule_patches_cached
+        from sequencer_output import plan_summary, write_plan_file, write_plan_json, write_plan_ndjson
+
+        # machine-readable formats keep stdout clean: progress and signals go to stderr
+        machine = args.format != 'text'
+        info = sys.stderr if machine else sys.stdout
+        signals = None
+        profile = RunProfile(cpu=args.profile_cpu, memory=args.profile_memory) if args.profile_report else None
+
+        if args.validate:
+            from sequencer_ingest import ingest_validated
+
+            if os.path.isdir(args.input):
+                parser.error('--validate expects a single findings file')
+            if not os.path.exists(args.input):
+                print(f"Input file not found: {args.input}", file=sys.stderr)
+                sys.exit(2)
+            with _stage(profile, 'ingest'):
+                patches, signals, digest = ingest_validated(args.input, expect_sha256=args.expect_sha256)
+            print(f"Artifact sha256: {digest}", file=info)
+            for sig in signals:
+                examples = f" e.g. {sig['examples'][0]}" if sig['examples'] else ''
+                print(f"[{sig['level']}] {sig['category']}/{sig['code']}: {sig['message']} (x{sig['count']}){examples}", file=info)
+            if any(sig['level'] == 'error' for sig in signals):
+                print("Hard failure: artifact rejected, no plan emitted", file=sys.stderr)
+                sys.exit(1)
+        else:
+            with _stage(profile, 'ingest'):
+                patches = load_bundle(args.input, workers=args.workers, stream=args.stream, profile=profile)
+        print(f"Loaded {len(patches)} patches from {args.input}", file=info)
+        if not (args.quiet or machine):
+            for p in patches:
+                print(f"- {p.id} | {p.classification} | conf={p.confidence} | impact={p.impact} | deps={len(p.dependencies)} | affects={len(p.affects)}")
+        cache = None if args.no_cache else SequencerCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+        with _stage(profile, 'schedule'):
+            result = schedule_patches_cached(patches, cache, profile=profile, blocking=not args.break_cycles,
+                                             workers=args.shard_workers)
+        if result['status'] == 'partial':
+            print(f"{len(result['cycles'])} cycles: {len(result['held'])} patches held back; breaking "
+                  f"{len(result['feedback_edges'])} dependency edges (or removing {len(result['feedback_patches'])} "
+                  f"patches) would unblock them", file=info)
+        if cache is not None and cache.hits:
+            print(f"Plan served from cache ({cache.directory})", file=sys.stderr)
+        catalog = None
+        if args.catalog:
+            from sequencer_catalog import load_catalog
+
+            with _stage(profile, 'catalog'):
+                catalog = load_catalog(args.catalog)
+                before = len(result['unmatched'])
+                result = dict(result, unmatched=catalog.missing(result['unmatched']))
+            resolved = before - len(result['unmatched'])
+            print(f"Catalog {args.catalog}: {len(catalog)} objects; {resolved} of {before} unmatched dependencies already exist",
+                  file=info)
+            if profile is not None:
+                profile.count(catalog_objects=len(catalog), catalog_resolved=resolved)
+        execution_plan = None
+        if args.plan_workers:
+            from sequencer_planner import plan_parallel_execution
+
+            costs = None
+            if args.costs:
+                with open(args.costs, 'r', encoding='utf-8') as fh:
+                    costs = json.load(fh)
+            with _stage(profile, 'plan_parallel'):
+                execution_plan = plan_parallel_execution(patches, args.plan_workers, costs)
+            if catalog is not None:
+                execution_plan['unmatched'] = catalog.missing(execution_plan['unmatched'])
+        if args.plan_file:
+            with _stage(profile, 'plan_file'):
+                write_plan_file(result, args.plan_file)
+            print(f"Plan file written to {args.plan_file}", file=info)
+
+        with _stage(profile, 'emit'):
+            if machine:
+                writer = write_plan_json if args.format == 'json' else write_plan_ndjson
+                if args.output:
+                    with open(args.output, 'w', encoding='utf-8') as fh:
+                        writer(result, fh, signals=signals, execution_plan=execution_plan)
+                else:
+                    writer(result, sys.stdout, signals=signals, execution_plan=execution_plan)
+            elif args.quiet:
+                print(plan_summary(result))
+                if execution_plan is not None and execution_plan['status'] == 'ok':
+                    print(f"execution plan: workers={execution_plan['workers']} makespan={execution_plan['makespan']} "
+                          f"lower_bound={execution_plan['lower_bound']}")
+            else:
+                pprint.pprint(result)
+                if execution_plan is not None:
+                    pprint.pprint(execution_plan)
+
+        if profile is not None:
+            profile.count(status=result['status'])
+            with open(args.profile_report, 'w', encoding='utf-8') as fh:
+                json.dump(profile.report(), fh, indent=2)
+            print(f"Profile report written to {args.profile_report}", file=sys.stderr)
     else:
         run_demo()
 
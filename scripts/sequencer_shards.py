@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Sharded sequencing
+
+Patches from different schemas rarely depend on each other, so the dependency graph usually falls
+apart into independent pieces. schedule_patches_sharded() schedules such pieces in a process pool
+and merges the results so they are identical to schedule_patches() on the whole input.
+
+Sharding:
+
+- Patches are grouped by schema (of the first object they affect, else of their first
+  dependency), and the groups are packed largest first into one shard per worker. This is a
+  single cheap pass in the parent.
+- Each worker builds and schedules only its shard, and checks whether any of its dependencies is
+  produced in another shard. Shards joined by such an edge are merged and scheduled again, so the
+  final shards are always closed under dependencies.
+- When schemas do not split the input (one schema holds more than half of the patches), the
+  parent computes weakly connected components instead (union-find over produced objects). That
+  costs one pass over every dependency in the parent, so it is only used when needed.
+
+Merging:
+
+- layers:    a patch's layer (its longest-path depth) only depends on its own shard, so layer k is
+             the union of every shard's layer k. Workers return each patch as a bytes key (the
+             priority_key components, fixed-width, followed by the id) so the parent merges layers
+             with plain sorted() calls; non-integer priorities fall back to priority_key tuples
+- phases:    refilled from the merged layers, exactly as the serial emit does
+- unmatched: in input order (workers report the input position of each entry)
+- cycles:    SCCs are ordered by the root of the Tarjan DFS tree that found them (the first
+             patch, in input order, from which the SCC is reachable), then by shard order
+- non-blocking results: `held` in input order, feedback edges in cycle order, and the feedback
+             patch cover recomputed over the merged edges
+
+Workers get the input through the pool initializer: free with the fork start method, pickled
+once per worker otherwise. Like a cache hit, a sharded run does not update Patch.fanout on the
+inputs. With one shard (or one worker) it simply calls schedule_patches().
+"""
+import gc
+import heapq
+import multiprocessing
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import (  # noqa: E402
+    CLASS_PRIORITY,
+    IMPACT_PRIORITY,
+    Patch,
+    RunProfile,
+    _stage,
+    build_compact_graph,
+    feedback_patch_cover,
+    object_key,
+    priority_key,
+    schedule_patches,
+)
+
+
+# a schema group larger than this share of the patches makes schema sharding pointless
+MAX_SCHEMA_SHARE = 0.5
+_KEY = struct.Struct('>4Q')
+_BIAS = 1 << 63
+
+
+def shard_schema(patch: Patch) -> str:
+    if patch.affects:
+        return patch.affects[0].schema
+    return patch.dependencies[0].schema if patch.dependencies else ''
+
+
+def partition_patches(patches: List[Patch]) -> Tuple[List[List[int]], Dict[str, int]]:
+    """Weakly connected components: (lists of node indices, id -> node index in first-seen order)."""
+    pos: Dict[str, int] = {}
+    producer: Dict[Tuple[str, str, str], int] = {}
+    for p in patches:
+        i = pos.get(p.id)
+        if i is None:
+            i = pos[p.id] = len(pos)
+        for a in p.affects:
+            producer.setdefault(object_key(a), i)
+
+    parent = list(range(len(pos)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for p in patches:
+        root = find(pos[p.id])
+        for key in chain(map(object_key, p.affects), map(object_key, p.dependencies)):
+            q = producer.get(key)
+            if q is not None:
+                q = find(q)
+                if q != root:
+                    parent[q] = root
+
+    component: Dict[int, List[int]] = {}
+    for i in range(len(parent)):
+        component.setdefault(find(i), []).append(i)
+    return list(component.values()), pos
+
+
+def _schema_groups(patches: List[Patch]):
+    """Group nodes by shard_schema(); groups sharing a produced object are joined.
+
+    Returns (groups of node indices, id -> node index, object key -> first producing node).
+    """
+    pos: Dict[str, int] = {}
+    group_of: List[int] = []
+    group_ids: Dict[str, int] = {}
+    producer: Dict[Tuple[str, str, str], int] = {}
+    shared = []
+    for p in patches:
+        i = pos.get(p.id)
+        if i is None:
+            i = pos[p.id] = len(pos)
+            group_of.append(group_ids.setdefault(shard_schema(p), len(group_ids)))
+        for a in p.affects:
+            q = producer.setdefault((a.schema, a.name, a.kind), i)
+            if q != i:
+                shared.append((q, i))
+
+    parent = list(range(len(group_ids)))
+
+    def find(x: int) -> int:
+        while parent[x] != x:
+            x = parent[x]
+        return x
+
+    for q, i in shared:
+        a, b = find(group_of[q]), find(group_of[i])
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+    groups: Dict[int, List[int]] = {}
+    for i, g in enumerate(group_of):
+        groups.setdefault(find(g), []).append(i)
+    return list(groups.values()), pos, producer
+
+
+def _pack(groups: List[List[int]], shards: int) -> List[List[int]]:
+    """Greedy largest-first packing of node groups into at most `shards` bins."""
+    bins: List[Tuple[int, int, List[int]]] = [(0, k, []) for k in range(shards)]
+    for group in sorted(groups, key=len, reverse=True):
+        size, k, members = heapq.heappop(bins)
+        members.extend(group)
+        heapq.heappush(bins, (size + len(group), k, members))
+    return [members for _, k, members in sorted(bins, key=lambda b: b[1]) if members]
+
+
+# --- worker side --------------------------------------------------------------------------------
+
+_STATE = None
+
+
+def _init_worker(state):
+    global _STATE
+    _STATE = state
+
+
+def _dfs_roots(graph) -> List[int]:
+    """root[v]: first node (in index order) whose depth-first search reaches v, as in tarjan_scc_int."""
+    root = [-1] * len(graph)
+    for r in range(len(graph)):
+        if root[r] != -1:
+            continue
+        root[r] = r
+        stack = [r]
+        while stack:
+            for w in graph[stack.pop()]:
+                if root[w] == -1:
+                    root[w] = r
+                    stack.append(w)
+    return root
+
+
+def _layer_keys(layers: List[List[str]], nodes: Dict[str, Patch]):
+    """Sortable keys for the merge: bytes when every priority component is an int, else tuples."""
+    try:
+        return [[_KEY.pack(-CLASS_PRIORITY.get(p.classification, 0) + _BIAS, -p.confidence + _BIAS,
+                           -IMPACT_PRIORITY.get(p.impact, 0) + _BIAS, -p.fanout + _BIAS) + pid.encode('utf-8')
+                 for pid in layer for p in (nodes[pid],)]
+                for layer in layers]
+    except struct.error:
+        return [[priority_key(nodes[pid]) for pid in layer] for layer in layers]
+
+
+def _schedule_shard(shard: int, entries: List[int], verify: bool) -> Dict:
+    """Schedule the patches at `entries`; returns the shard result plus what the merge needs."""
+    patches, pos, producer, shard_of, blocking = _STATE
+    mine = [patches[e] for e in entries]
+    result = schedule_patches(mine, blocking=blocking)
+
+    # the shard's unmatched dependencies are either produced in another shard (a conflict) or
+    # unmatched globally; they come in entry order, which recovers their input positions
+    missing = result['unmatched']
+    with_missing = {pid for pid, _ in missing}
+    conflicts = set()
+    unmatched = []
+    k = 0
+    for e, p in zip(entries, mine):
+        if p.id not in with_missing:
+            continue
+        for d in p.dependencies:
+            if k < len(missing) and missing[k][0] == p.id and missing[k][1] == d:
+                k += 1
+                q = producer.get((d.schema, d.name, d.kind)) if verify else None
+                if q is None:
+                    unmatched.append((e, p.id, d))
+                else:
+                    conflicts.add(shard_of[q])
+    out = {'conflicts': conflicts, 'unmatched': unmatched}
+    if conflicts:
+        return out
+
+    out['status'] = result['status']
+    if 'layers' in result:
+        out['layers'] = _layer_keys(result['layers'], {p.id: p for p in mine})
+    if result['status'] != 'ok':
+        graph = build_compact_graph(mine)
+        root = _dfs_roots(graph)
+        out['cycles'] = result['cycles']
+        out['roots'] = [pos[graph.ids[root[graph.pos[scc[0]]]]] for scc in result['cycles']]
+        for key in ('held', 'feedback_edges'):
+            if key in result:
+                out[key] = result[key]
+    return out
+
+
+# --- parent side --------------------------------------------------------------------------------
+
+def _key_id(key) -> str:
+    return key[32:].decode('utf-8') if isinstance(key, bytes) else key[-1]
+
+
+def _as_tuple(key):
+    if isinstance(key, bytes):
+        return tuple(v - _BIAS for v in _KEY.unpack(key[:32])) + (key[32:].decode('utf-8'),)
+    return key
+
+
+def _merge(patches: List[Patch], pos: Dict[str, int], parts: List[Dict], blocking: bool) -> Dict:
+    unmatched = [(pid, d) for _, pid, d in sorted(chain.from_iterable(part['unmatched'] for part in parts),
+                                                  key=lambda u: u[0])]
+    cycles = sorted(((root, k, scc) for part in parts
+                     for k, (root, scc) in enumerate(zip(part.get('roots', ()), part.get('cycles', ())))),
+                    key=lambda c: c[:2])
+    cycles = [scc for _, _, scc in cycles]
+    if cycles and blocking:
+        return {'status': 'blocked', 'cycles': cycles, 'unmatched': unmatched}
+
+    mixed = len({type(key) for part in parts for layer in part['layers'] for key in layer[:1]}) > 1
+    nodes = {p.id: p for p in patches}
+    layers = []
+    phase_map = {'Additive': [], 'Corrective': [], 'Destructive': []}
+    for k in range(max(len(part['layers']) for part in parts)):
+        keys = chain.from_iterable(part['layers'][k] for part in parts if k < len(part['layers']))
+        layer = [_key_id(key) for key in sorted(map(_as_tuple, keys) if mixed else keys)]
+        for pid in layer:
+            phase_map[nodes[pid].classification].append(pid)
+        layers.append(layer)
+    phases = [(name, phase_map[name]) for name in ('Additive', 'Corrective', 'Destructive')]
+    if not cycles:
+        return {'status': 'ok', 'layers': layers, 'phases': phases, 'unmatched': unmatched}
+
+    scc_of = {pid: k for k, scc in enumerate(cycles) for pid in scc}
+    edges = sorted(chain.from_iterable(part.get('feedback_edges', ()) for part in parts),
+                   key=lambda e: scc_of[e['from']])
+    ids = list(pos)
+    cover = feedback_patch_cover([(pos[e['from']], pos[e['to']]) for e in edges])
+    held = sorted(chain.from_iterable(part.get('held', ()) for part in parts), key=pos.__getitem__)
+    return {'status': 'partial', 'layers': layers, 'phases': phases, 'unmatched': unmatched,
+            'cycles': cycles, 'held': held, 'feedback_edges': edges, 'feedback_patches': [ids[i] for i in cover]}
+
+
+def _run_shards(patches: List[Patch], pos: Dict[str, int], producer: Dict, shard_of: List[int], count: int,
+                verify: bool, blocking: bool, context, profile: Optional[RunProfile]) -> Optional[List[Dict]]:
+    """Schedule every shard in the pool; None when cross-shard edges join all shards into one."""
+    def entries_of(node_shard: List[int]) -> List[List[int]]:
+        entries: List[List[int]] = [[] for _ in range(count)]
+        for e, p in enumerate(patches):
+            entries[node_shard[pos[p.id]]].append(e)
+        return entries
+
+    with ProcessPoolExecutor(max_workers=count, mp_context=context, initializer=_init_worker,
+                             initargs=((patches, pos, producer, shard_of, blocking),)) as pool:
+        with _stage(profile, 'shards'):
+            parts = list(pool.map(_schedule_shard, range(count), entries_of(shard_of), [verify] * count))
+        conflicted = [k for k, part in enumerate(parts) if part['conflicts']]
+        if not conflicted:
+            return parts
+
+        # shards joined by cross-shard dependencies are merged and scheduled again
+        group = list(range(count))
+
+        def find(x: int) -> int:
+            while group[x] != x:
+                x = group[x]
+            return x
+
+        for k in conflicted:
+            for other in parts[k]['conflicts']:
+                a, b = find(k), find(other)
+                if a != b:
+                    group[max(a, b)] = min(a, b)
+        if profile is not None:
+            profile.count(shard_conflicts=len(conflicted))
+        roots = [find(k) for k in range(count)]
+        if len(set(roots)) == 1:
+            return None
+        redo = sorted({roots[k] for k in conflicted})
+        entries = entries_of([roots[s] for s in shard_of])
+        with _stage(profile, 'reshard'):
+            again = dict(zip(redo, pool.map(_schedule_shard, redo, [entries[k] for k in redo], [False] * len(redo))))
+    return [again.get(k, part) for k, part in enumerate(parts) if roots[k] == k]
+
+
+def schedule_patches_sharded(patches: List[Patch], workers: Optional[int] = None,
+                             profile: Optional[RunProfile] = None, blocking: bool = True) -> Dict:
+    """schedule_patches() over independent shards in `workers` processes (default: CPU count)."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1:
+        return schedule_patches(patches, profile=profile, blocking=blocking)
+
+    with _stage(profile, 'partition'):
+        groups, pos, producer = _schema_groups(patches)
+        verify = True
+        if len(groups) <= 1 or max(map(len, groups)) > MAX_SCHEMA_SHARE * len(pos):
+            groups, pos = partition_patches(patches)
+            producer, verify = {}, False
+        shards = _pack(groups, workers)
+    if profile is not None:
+        profile.count(shard_mode='schema' if verify else 'components', shard_groups=len(groups))
+    if len(shards) <= 1:
+        return schedule_patches(patches, profile=profile, blocking=blocking)
+
+    shard_of = [0] * len(pos)
+    for k, members in enumerate(shards):
+        for i in members:
+            shard_of[i] = k
+    context = None
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        gc.freeze()  # keeps the children's collector off the inherited objects (less copy-on-write)
+    try:
+        parts = _run_shards(patches, pos, producer, shard_of, len(shards), verify, blocking, context, profile)
+    finally:
+        if context is not None:
+            gc.unfreeze()
+    if parts is None:
+        return schedule_patches(patches, profile=profile, blocking=blocking)
+    with _stage(profile, 'merge'):
+        return _merge(patches, pos, parts, blocking)
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+What-if plan simulation
+
+Tuning CLASS_PRIORITY / IMPACT_PRIORITY or leaving patches out used to mean editing the module and
+rerunning the whole pipeline. PlanSimulator builds the dependency graph once and evaluates
+scenarios against it:
+
+    sim = PlanSimulator(patches)
+    rows = sim.compare([
+        Scenario('impact first', impact_priority={'low': 9, 'medium': 5, 'high': 1}),
+        Scenario('confident only', min_confidence=60),
+        Scenario('without F-7', exclude={'F-7'}),
+    ])
+
+evaluate() returns plan metrics for one scenario; plan() returns exactly what schedule_patches()
+would return for the scenario's patches under its priority tables. Metrics that compare orders
+(`moved`, `mean_displacement`) are relative to the baseline: the current tables, nothing excluded.
+
+What is reused between scenarios: the CSR graph, the baseline layering, the policy-independent
+parts of the priority key (confidence rank, fanout, id rank) and, once the first exclusion needs
+them, every dependency's resolved producers. A patch's layer does not depend on priorities, so a priority-only scenario
+costs one packed-int key per patch and one sort. A scenario that excludes patches updates
+fanout, layers and unmatched dependencies only around the excluded patches (their predecessors,
+descendants and the dependencies they produced), without parsing or hashing anything; when the
+baseline itself has cycles it reruns the Kahn sweep over the kept nodes instead.
+"""
+import os
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+import sequencer_runner as runner  # noqa: E402
+from sequencer_runner import Patch, build_affects_index, build_compact_graph, object_key, tarjan_scc_int  # noqa: E402
+
+
+PHASE_NAMES = ('Additive', 'Corrective', 'Destructive')
+
+
+@dataclass
+class Scenario:
+    name: str = 'baseline'
+    class_priority: Optional[Dict[str, float]] = None  # default: runner.CLASS_PRIORITY
+    impact_priority: Optional[Dict[str, float]] = None  # default: runner.IMPACT_PRIORITY
+    exclude: Iterable[str] = ()  # patch ids left out of the plan
+    min_confidence: Optional[float] = None  # leave out patches below this confidence (last entry per id)
+
+
+class PlanSimulator:
+    """Dependency graph built once, evaluated under many priority policies / exclusion sets."""
+
+    def __init__(self, patches: List[Patch]):
+        self.patches = list(patches)
+        self.graph = graph = build_compact_graph(self.patches)
+        nodes, ids = graph.patches, graph.ids
+        n = self.n = len(ids)
+        offsets = graph.offsets
+
+        # categorical codes (class x impact) and policy-independent rank components
+        self._classes = sorted({p.classification for p in nodes})
+        self._impacts = sorted({p.impact for p in nodes})
+        cls_code = {c: k for k, c in enumerate(self._classes)}
+        imp_code = {c: k for k, c in enumerate(self._impacts)}
+        self._code = [cls_code[p.classification] * len(self._impacts) + imp_code[p.impact] for p in nodes]
+        conf_rank = {c: k for k, c in enumerate(sorted({p.confidence for p in nodes}, reverse=True))}
+        self._conf_rank = [conf_rank[p.confidence] for p in nodes]
+        self._id_rank = [0] * n
+        for k, i in enumerate(sorted(range(n), key=ids.__getitem__)):
+            self._id_rank[i] = k
+        self._fanout = [offsets[i + 1] - offsets[i] for i in range(n)]
+        # radices of the packed key: ((((cls * R_conf + conf) * R_imp + imp) * R_fan + fan) * n + id)
+        self._fan_radix = max(self._fanout, default=0) + 1
+        self._imp_unit = self._fan_radix * max(n, 1)
+        self._conf_unit = max(len(self._impacts), 1) * self._imp_unit
+        self._cls_unit = max(len(conf_rank), 1) * self._conf_unit
+        self._base_rest = self._rest(self._fanout)
+        self._base = self._layering(None)
+        self._baseline_order = None
+        self._preds = None
+        self._deps = None
+
+    # --- internals ------------------------------------------------------------------------------
+
+    def _rest(self, fanout: List[int]) -> List[int]:
+        """Policy-independent part of each packed key (confidence, fanout and id ranks)."""
+        top, n, unit = self._fan_radix - 1, max(self.n, 1), self._conf_unit
+        return [c * unit + (top - f) * n + r for c, f, r in zip(self._conf_rank, fanout, self._id_rank)]
+
+    def _layering(self, keep: Optional[bytearray]):
+        """Kahn sweep over the kept nodes: (depth, consumed order, fanout, kept count)."""
+        graph, n = self.graph, self.n
+        offsets, targets = graph.offsets, graph.targets
+        if keep is None:
+            indegree = array('i', graph.indegree)
+            fanout = self._fanout
+            kept = n
+        else:
+            indegree = array('i', [0]) * n
+            fanout = [0] * n
+            kept = 0
+            for v in range(n):
+                if keep[v]:
+                    kept += 1
+                    out = 0
+                    for k in range(offsets[v], offsets[v + 1]):
+                        w = targets[k]
+                        if keep[w]:
+                            indegree[w] += 1
+                            out += 1
+                    fanout[v] = out
+        depth = [0] * n
+        order = [i for i in range(n) if indegree[i] == 0 and (keep is None or keep[i])]
+        for i in order:
+            d = depth[i] + 1
+            for k in range(offsets[i], offsets[i + 1]):
+                m = targets[k]
+                if keep is not None and not keep[m]:
+                    continue
+                if depth[m] < d:
+                    depth[m] = d
+                indegree[m] -= 1
+                if indegree[m] == 0:
+                    order.append(m)
+        return depth, order, fanout, kept
+
+    def _keep(self, scenario: Scenario):
+        """(keep mask, dropped nodes), or (None, []) when the scenario keeps every patch."""
+        if not scenario.exclude and scenario.min_confidence is None:
+            return None, []
+        keep = bytearray(b'\x01') * self.n
+        pos = self.graph.pos
+        for pid in scenario.exclude:
+            i = pos.get(pid)
+            if i is not None:
+                keep[i] = 0
+        if scenario.min_confidence is not None:
+            for i, p in enumerate(self.graph.patches):
+                if p.confidence < scenario.min_confidence:
+                    keep[i] = 0
+        return keep, [i for i in range(self.n) if not keep[i]]
+
+    def _predecessors(self):
+        """Reverse CSR (pred_offsets, preds), built on first use."""
+        if self._preds is None:
+            offsets, targets, n = self.graph.offsets, self.graph.targets, self.n
+            pred_offsets = array('i', [0]) * (n + 1)
+            for i in range(n):
+                pred_offsets[i + 1] = pred_offsets[i] + self.graph.indegree[i]
+            fill = array('i', pred_offsets[:n])
+            preds = array('i', [0]) * len(targets)
+            for v in range(n):
+                for k in range(offsets[v], offsets[v + 1]):
+                    w = targets[k]
+                    preds[fill[w]] = v
+                    fill[w] += 1
+            self._preds = (pred_offsets, preds)
+        return self._preds
+
+    def _exclude(self, keep: bytearray, dropped: List[int]):
+        """Baseline layering with `dropped` removed, recomputed only where it changes.
+
+        Only valid for an acyclic baseline: dropping patches lowers the fanout of their
+        predecessors and can only lower the depth of their descendants, so those are the nodes
+        revisited, in baseline topological order.
+        """
+        depth, order, fanout, _ = self._base
+        pred_offsets, preds = self._predecessors()
+        offsets, targets = self.graph.offsets, self.graph.targets
+        depth, fanout, rest = list(depth), list(fanout), list(self._base_rest)
+        n = max(self.n, 1)
+        touched = bytearray(self.n)
+        stack = []
+        for u in dropped:
+            for k in range(pred_offsets[u], pred_offsets[u + 1]):
+                v = preds[k]
+                fanout[v] -= 1
+                rest[v] += n
+            for k in range(offsets[u], offsets[u + 1]):
+                w = targets[k]
+                if keep[w] and not touched[w]:
+                    touched[w] = 1
+                    stack.append(w)
+        while stack:
+            v = stack.pop()
+            for k in range(offsets[v], offsets[v + 1]):
+                w = targets[k]
+                if not touched[w]:
+                    touched[w] = 1
+                    stack.append(w)
+        kept_order = []
+        for v in order:
+            if not keep[v]:
+                continue
+            if touched[v]:
+                d = 0
+                for k in range(pred_offsets[v], pred_offsets[v + 1]):
+                    q = preds[k]
+                    if keep[q] and depth[q] >= d:
+                        d = depth[q] + 1
+                depth[v] = d
+            kept_order.append(v)
+        return depth, kept_order, fanout, rest
+
+    def _run(self, scenario: Scenario):
+        keep, dropped = self._keep(scenario)
+        depth, order, fanout, kept = self._base
+        rest = self._base_rest
+        if keep is not None:
+            if len(order) == self.n:
+                depth, order, fanout, rest = self._exclude(keep, dropped)
+                kept = len(order)
+            else:
+                depth, order, fanout, kept = self._layering(keep)
+                rest = self._rest(fanout)
+        if len(order) < kept:
+            return keep, dropped, None, depth
+
+        cp = scenario.class_priority if scenario.class_priority is not None else runner.CLASS_PRIORITY
+        ip = scenario.impact_priority if scenario.impact_priority is not None else runner.IMPACT_PRIORITY
+        cls_values = sorted({-cp.get(c, 0) for c in self._classes})
+        imp_values = sorted({-ip.get(i, 0) for i in self._impacts})
+        cls_rank = {v: k for k, v in enumerate(cls_values)}
+        imp_rank = {v: k for k, v in enumerate(imp_values)}
+        policy = [cls_rank[-cp.get(c, 0)] * self._cls_unit + imp_rank[-ip.get(i, 0)] * self._imp_unit
+                  for c in self._classes for i in self._impacts]
+        layer_unit = max(len(cls_values), 1) * self._cls_unit
+        code = self._code
+        ranked = sorted(order, key=lambda v: depth[v] * layer_unit + policy[code[v]] + rest[v])
+        return keep, dropped, ranked, depth
+
+    def _dependencies(self):
+        """Every dependency in input order with its producers, the indices of those nobody produces
+        and, per producer, the indices it satisfies. Built on the first exclusion."""
+        if self._deps is None:
+            pos = self.graph.pos
+            index = build_affects_index(self.patches)
+            producers: Dict = {}
+            occurrences = []
+            unmatched_at = []
+            satisfies: Dict[int, List[int]] = {}
+            for p in self.patches:
+                i = pos[p.id]
+                for d in p.dependencies:
+                    key = object_key(d)
+                    found = producers.get(key)
+                    if found is None:
+                        found = producers[key] = tuple(pos[q] for q in index.get(key, ()))
+                    if not found:
+                        unmatched_at.append(len(occurrences))
+                    for q in found:
+                        satisfies.setdefault(q, []).append(len(occurrences))
+                    occurrences.append((i, d, found))
+            self._deps = (occurrences, unmatched_at, satisfies)
+        return self._deps
+
+    def _unmatched(self, keep: Optional[bytearray], dropped: List[int]):
+        if keep is None:
+            return self.graph.unmatched
+        occurrences, unmatched_at, satisfies = self._dependencies()
+        found = {k for k in unmatched_at if keep[occurrences[k][0]]}
+        for u in dropped:
+            for k in satisfies.get(u, ()):
+                i, _, producers = occurrences[k]
+                if keep[i] and not any(keep[q] for q in producers):
+                    found.add(k)
+        ids = self.graph.ids
+        return [(ids[occurrences[k][0]], occurrences[k][1]) for k in sorted(found)]
+
+    def _baseline(self) -> List[int]:
+        if self._baseline_order is None:
+            self._baseline_order = self._run(Scenario())[2] or []
+        return self._baseline_order
+
+    # --- API ------------------------------------------------------------------------------------
+
+    def plan(self, scenario: Scenario) -> Dict:
+        """The schedule_patches() result for this scenario."""
+        keep, dropped, ranked, depth = self._run(scenario)
+        unmatched = self._unmatched(keep, dropped)
+        ids, nodes = self.graph.ids, self.graph.patches
+        if ranked is None:
+            kept = [v for v in range(self.n) if keep is None or keep[v]]
+            local = {v: k for k, v in enumerate(kept)}
+            adj = [[local[w] for w in self.graph[v] if w in local] for v in kept]
+            cycles = [[ids[kept[k]] for k in scc] for scc in tarjan_scc_int(adj)]
+            return {'status': 'blocked', 'cycles': cycles, 'unmatched': unmatched}
+        layers: List[List[str]] = []
+        phase_map: Dict[str, List[str]] = {name: [] for name in PHASE_NAMES}
+        for v in ranked:
+            if depth[v] == len(layers):
+                layers.append([])
+            layers[-1].append(ids[v])
+            phase_map[nodes[v].classification].append(ids[v])
+        phases = [(name, phase_map[name]) for name in PHASE_NAMES]
+        return {'status': 'ok', 'layers': layers, 'phases': phases, 'unmatched': unmatched}
+
+    def evaluate(self, scenario: Scenario) -> Dict:
+        """Comparable metrics for one scenario.
+
+        moved / mean_displacement compare the order of the patches scheduled both here and in the
+        baseline: how many changed position and by how many places on average.
+        """
+        keep, dropped, ranked, depth = self._run(scenario)
+        row = {'scenario': scenario.name, 'excluded': len(dropped), 'unmatched': len(self._unmatched(keep, dropped))}
+        if ranked is None:
+            row.update(status='blocked', patches=0, layers=0, max_layer_width=0, phases={}, moved=None,
+                       mean_displacement=None)
+            return row
+        widths: Dict[int, int] = {}
+        phases = dict.fromkeys(PHASE_NAMES, 0)
+        nodes = self.graph.patches
+        for v in ranked:
+            widths[depth[v]] = widths.get(depth[v], 0) + 1
+            phases[nodes[v].classification] += 1
+
+        baseline = self._baseline()
+        scheduled = bytearray(self.n)
+        for v in ranked:
+            scheduled[v] = 1
+        in_both = bytearray(self.n)
+        base_pos = [0] * self.n
+        k = 0
+        for v in baseline:
+            if scheduled[v]:
+                in_both[v] = 1
+                base_pos[v] = k
+                k += 1
+        moved = displacement = k = 0
+        for v in ranked:
+            if in_both[v]:
+                if base_pos[v] != k:
+                    moved += 1
+                    displacement += abs(base_pos[v] - k)
+                k += 1
+        row.update(status='ok', patches=len(ranked), layers=len(widths), max_layer_width=max(widths.values(), default=0),
+                   phases=phases, moved=moved, mean_displacement=round(displacement / k, 3) if k else 0.0)
+        return row
+
+    def compare(self, scenarios: Iterable[Scenario]) -> List[Dict]:
+        """evaluate() every scenario; rows come back in input order."""
+        return [self.evaluate(s) for s in scenarios]
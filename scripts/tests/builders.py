@@ -0,0 +1,50 @@
+"""Builders shared by the sequencer and trace tests: findings, patch chains and trace zips."""
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sequencer_bench import CLASSES, IMPACTS  # noqa: E402
+from sequencer_runner import Dependency, Patch  # noqa: E402
+
+MISSING = Dependency('ext', 'missing', 'view')  # produced by no patch
+
+
+def table(schema, name):
+    return Dependency(schema, name, 'table')
+
+
+def finding(pid, obj, deps=(), cls='Corrective', conf=80, **fields):
+    """A parser-output finding for object `obj`; extra keyword arguments become extra fields."""
+    return {'id': pid, 'classification': cls, 'confidence': conf, 'impact': 'medium',
+            'object_name': obj, 'dependencies': list(deps), **fields}
+
+
+def chain_patches(schema, n, prefix, fan=2, shift=0, confidence=(50, 40), impact_step=1, missing=(11, 5),
+                  extra_deps=None):
+    """n patches <prefix><i> producing <schema>.t<i>, each depending on t<i-1> and t<i//fan>.
+
+    Classification, confidence and impact cycle with i; patches with i % missing[0] == missing[1]
+    also depend on MISSING, after any `extra_deps(i)`.
+    """
+    patches = []
+    for i in range(n):
+        deps = [table(schema, f't{j}') for j in (i - 1, i // fan) if 0 <= j < i]
+        if extra_deps is not None:
+            deps.extend(extra_deps(i))
+        if i % missing[0] == missing[1]:
+            deps.append(MISSING)
+        patches.append(Patch(f'{prefix}{i}', CLASSES[(i + shift) % 3], confidence[0] + (i * 7) % confidence[1],
+                             IMPACTS[(i // impact_step) % 3], dependencies=deps, affects=[table(schema, f't{i}')]))
+    return patches
+
+
+def write_zip(path, members):
+    """Write a zip of {name: text or bytes} (or (name, data) pairs), creating its directory."""
+    path = os.fspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with zipfile.ZipFile(path, 'w') as z:
+        for name, data in (members.items() if isinstance(members, dict) else members):
+            z.writestr(name, data)
+    return path
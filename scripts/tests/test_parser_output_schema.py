@@ -6,6 +6,8 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from jsonschema import Draft7Validator
 
+from validate_parser_output import compile_fast_check, fast_checks, validate_file, validate_files
+
 
 def load_schema():
     here = os.path.abspath(os.path.dirname(__file__))
@@ -56,4 +58,81 @@ def test_invalid_wrong_types_and_enums():
     doc = [{"classification": "Fix", "confidence": "85", "impact": "critical"}]
     v = Draft7Validator(schema)
     errors = sorted(v.iter_errors(doc), key=lambda e: e.path)
-    assert errors, "Expected validation errors for wrong types and invalid enums"
\ No newline at end of file
+    assert errors, "Expected validation errors for wrong types and invalid enums"
+
+
+def test_validate_file_full_and_streaming_modes(tmp_path):
+    bad = {"findings": [
+        {"id": "A", "classification": "Additive", "confidence": 90},
+        {"id": "B", "classification": "Fix", "confidence": 500},
+        {"id": "C"},
+    ]}
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps(bad))
+
+    full = validate_file(str(path))
+    assert full['errors'] and full['findings'] == 3
+
+    streamed = validate_file(str(path), stream=True)
+    locations = [loc for loc, _ in streamed['errors']]
+    assert locations == ["findings.1.classification", "findings.1.confidence", "findings.2"]
+    assert streamed['findings'] == 3 and not streamed['truncated']
+
+    early = validate_file(str(path), stream=True, max_errors=1)
+    assert len(early['errors']) == 1 and early['truncated']
+
+    samples = [os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'samples', name))
+               for name in ('normal-findings.json', 'cycle-findings.json', 'introspection-sample.json')]
+    for results in (validate_files(samples, stream=True), validate_files(samples + [str(path)], jobs=2)):
+        assert [r['errors'] == [] for r in results][:3] == [True, True, True]
+    assert validate_files(samples + [str(path)], jobs=2)[-1]['errors']
+
+
+def test_stream_and_full_modes_agree_on_trailing_data(tmp_path):
+    finding = {"id": "A", "classification": "Additive", "confidence": 90}
+    cases = {
+        "junk.json": json.dumps([finding]) + " junk",
+        "two.json": json.dumps([finding]) + "\n" + json.dumps([finding]),
+        "wrapped.json": json.dumps({"findings": [finding]}) + "{}",
+        "concatenated.json": json.dumps(finding) + "\n" + json.dumps(finding),
+        "ok.json": json.dumps({"findings": [finding]}) + "\n\n",
+    }
+    for name, text in cases.items():
+        path = tmp_path / name
+        path.write_text(text)
+        full = validate_file(str(path))
+        streamed = validate_file(str(path), stream=True)
+        assert bool(full['errors']) == bool(streamed['errors']) == (name != "ok.json"), name
+        if full['errors']:
+            assert full['errors'][0][1].startswith("Invalid JSON: Extra data")
+
+
+def test_fast_check_agrees_with_jsonschema():
+    schema = load_schema()
+    document_ok, finding_ok = fast_checks()
+    assert document_ok is not None and finding_ok is not None
+    full = Draft7Validator(schema)
+
+    samples_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'samples'))
+    docs = []
+    for name in ('normal-findings.json', 'cycle-findings.json', 'introspection-sample.json'):
+        with open(os.path.join(samples_dir, name), 'r', encoding='utf-8') as fh:
+            docs.append(json.load(fh))
+    docs += [
+        [{"id": "X1", "confidence": 90}],  # missing classification
+        [{"classification": "Fix", "confidence": "85", "impact": "critical"}],  # wrong types and enums
+        [{"classification": "Additive", "confidence": 100.0}],  # integral float is an integer in draft 7
+        [{"classification": "Additive", "confidence": True}],
+        [{"classification": "Additive", "confidence": -1}],
+        [{"classification": "Additive", "dependencies": ["a", {"b": 1}, 3]}],
+        {"findings": [{"classification": "corrective", "affects": "public.t"}]},
+        {"findings": {"classification": "Additive"}},
+        {"other": []},
+        "not a document",
+    ]
+    for doc in docs:
+        assert document_ok(doc) == full.is_valid(doc), doc
+
+    # unsupported keywords disable the fast path instead of guessing
+    assert compile_fast_check({"type": "string", "pattern": "^a"}) is None
+    assert compile_fast_check({"$ref": "http://example.com/schema"}) is None
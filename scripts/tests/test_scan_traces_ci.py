@@ -0,0 +1,55 @@
+import multiprocessing
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scan_traces_ci  # noqa: E402
+
+PREFIX = 'rbac-Role-Based-Access-Con-'
+_scan_trace = scan_traces_ci.scan_trace
+
+
+def _crashing_scan_trace(entry, zipf):
+    # the worker process dies outright (no exception to catch) on one zip
+    if entry.endswith('-2'):
+        os._exit(1)
+    return _scan_trace(entry, zipf)
+
+
+def test_parallel_scan_matches_serial(tmp_path):
+    for k in range(6):
+        d = tmp_path / f'{PREFIX}{k}'
+        (d / 'trace').mkdir(parents=True)
+        with zipfile.ZipFile(d / 'trace' / 'trace.zip', 'w') as z:
+            z.writestr('0-trace.network', 'Set-Cookie: test_user=admin\n' if k % 2 else 'GET /?__ssr_probe=1\n')
+    (tmp_path / f'{PREFIX}corrupt').mkdir()
+    (tmp_path / f'{PREFIX}corrupt' / 'trace.zip').write_bytes(b'not a zip')
+    (tmp_path / f'{PREFIX}empty').mkdir()
+    (tmp_path / 'other-test').mkdir()
+
+    rows = scan_traces_ci.scan(str(tmp_path), workers=1)
+    assert [r[0] for r in rows] == sorted(r[0] for r in rows)
+    assert rows[0] == (f'{PREFIX}0', 'yes', 'no', 'no', 'no', 'no')
+    assert rows[1] == (f'{PREFIX}1', 'no', 'no', 'no', 'yes', 'no')
+    assert rows[6][:2] == (f'{PREFIX}corrupt', 'error')
+    assert rows[7] == (f'{PREFIX}empty', 'no-trace', 'no', 'no', 'no')
+    assert scan_traces_ci.scan(str(tmp_path), workers=3) == rows
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='patched worker needs fork')
+def test_dead_worker_costs_only_its_own_row(tmp_path, monkeypatch):
+    for k in range(6):
+        d = tmp_path / f'{PREFIX}{k}'
+        d.mkdir()
+        with zipfile.ZipFile(d / 'trace.zip', 'w') as z:
+            z.writestr('0-trace.network', 'GET /?__ssr_probe=1\n')
+    expected = scan_traces_ci.scan(str(tmp_path), workers=1)
+
+    monkeypatch.setattr(scan_traces_ci, 'scan_trace', _crashing_scan_trace)
+    rows = scan_traces_ci.scan(str(tmp_path), workers=3)
+    assert rows[2][:2] == (f'{PREFIX}2', 'error') and 'BrokenProcessPool' in rows[2][2]
+    assert rows[:2] + rows[3:] == expected[:2] + expected[3:]
@@ -1,7 +1,10 @@
 import json
 import os
+import subprocess
 import sys
 
+import pytest
+
 # Ensure scripts/ is importable
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
@@ -11,6 +14,22 @@ from sequencer_runner import (
     parse_json_findings,
     schedule_patches,
     sample_with_cycle,
+    auto_finding_id,
+    build_affects_index,
+    build_compact_graph,
+    build_graph,
+    bundle_members,
+    Dependency,
+    detect_cycles,
+    greedy_feedback_arcs,
+    iter_findings,
+    iter_patches,
+    load_bundle,
+    Patch,
+    priority_key,
+    rank_by_priority,
+    RunProfile,
+    tarjan_scc_int,
 )
 
 
@@ -130,4 +149,279 @@ def test_legacy_field_normalization():
     p = map_finding_to_patch(f)
     assert p.id == "L-1"
     assert p.impact == "low"
-    assert len(p.affects) == 1 and p.affects[0].name == "legacy_table"
\ No newline at end of file
+    assert len(p.affects) == 1 and p.affects[0].name == "legacy_table"
+
+
+def test_build_graph_links_every_producer():
+    t = Dependency('public', 't', 'table')
+    patches = [
+        Patch('A', 'Additive', 90, 'low', affects=[t]),
+        Patch('B', 'Corrective', 80, 'medium', affects=[t, t]),
+        Patch('C', 'Corrective', 70, 'medium', dependencies=[t], affects=[Dependency('public', 'c', 'function')]),
+        Patch('D', 'Destructive', 60, 'high', dependencies=[Dependency('public', 'missing', 'table')]),
+    ]
+    assert build_affects_index(patches)[('public', 't', 'table')] == ['A', 'B']
+
+    nodes, edges, indegree, unmatched = build_graph(patches)
+    assert 'C' in edges['A'] and 'C' in edges['B']
+    assert indegree['C'] == 2
+    assert nodes['A'].fanout == 1 and nodes['B'].fanout == 1
+    assert [pid for pid, _ in unmatched] == ['D']
+
+
+def test_tarjan_handles_long_chains_without_recursion():
+    n = 100_000
+    ids = [f'N{i}' for i in range(n)]
+    nodes = dict.fromkeys(ids)
+    edges = {ids[i]: {ids[i + 1]} for i in range(n - 1)}
+    edges[ids[-1]] = set()
+    assert detect_cycles(nodes, edges) is None
+
+    # closing the chain into a ring yields a single SCC containing every node
+    edges[ids[-1]] = {ids[0]}
+    cycles = detect_cycles(nodes, edges)
+    assert len(cycles) == 1 and len(cycles[0]) == n
+
+
+def test_tarjan_dense_graph_and_order():
+    # complete digraph on 300 nodes plus two disjoint 2-cycles
+    ids = [f'D{i}' for i in range(300)]
+    edges = {a: {b for b in ids if b != a} for a in ids}
+    edges.update({'X1': {'X2'}, 'X2': {'X1'}, 'Y1': {'Y2'}, 'Y2': {'Y1'}})
+    nodes = dict.fromkeys(list(edges))
+    cycles = detect_cycles(nodes, edges)
+    assert [sorted(c) for c in cycles[1:]] == [['X1', 'X2'], ['Y1', 'Y2']]
+    assert sorted(cycles[0]) == sorted(ids)
+
+
+def _write(tmp_path, name, text):
+    p = tmp_path / name
+    p.write_text(text)
+    return str(p)
+
+
+def test_streaming_ingest_matches_full_load(tmp_path):
+    findings = [
+        {"id": f"S{i}", "classification": "Additive", "confidence": i, "object_name": f"t{i}",
+         "dependencies": [f"public.t{i - 1}"] if i else [], "reason": "x" * (i % 7)}
+        for i in range(50)
+    ]
+    list_path = _write(tmp_path, "list.json", json.dumps(findings, indent=2))
+    wrapped_path = _write(tmp_path, "wrapped.json",
+                          json.dumps({"version": 12345, "meta": {"a": [1, 2]}, "findings": findings, "tail": True}))
+    ndjson_path = _write(tmp_path, "f.ndjson", "\n".join(json.dumps(f) for f in findings) + "\n\n")
+    jsonl_path = _write(tmp_path, "lines.jsonl", "\n".join(json.dumps(f) for f in findings))
+
+    expected = [(p.id, p.confidence, len(p.dependencies)) for p in parse_json_findings(list_path)]
+    for path in (list_path, wrapped_path, ndjson_path, jsonl_path):
+        # tiny chunks force values to straddle buffer boundaries
+        assert list(iter_findings(path, chunk_size=7)) == findings
+        assert [(p.id, p.confidence, len(p.dependencies)) for p in iter_patches(path)] == expected
+        assert [p.id for p in parse_json_findings(path, stream=True)] == [e[0] for e in expected]
+
+
+def test_streaming_ingest_edge_cases(tmp_path):
+    assert list(iter_findings(_write(tmp_path, "empty.json", "[ ]"))) == []
+    assert list(iter_findings(_write(tmp_path, "emptyw.json", '{"findings": []}'))) == []
+    with pytest.raises(ValueError):
+        list(iter_findings(_write(tmp_path, "obj.json", '{"other": 1}')))
+    with pytest.raises(ValueError):
+        list(iter_findings(_write(tmp_path, "bad.json", '[{"id": "a"} {"id": "b"}]')))
+
+
+def test_streaming_ingest_rejects_trailing_data(tmp_path):
+    # json.load fails on these with "Extra data"; the streaming reader must not stop at the first value
+    cases = {
+        "junk.json": '[{"id": "A"}] junk',
+        "two.json": '[{"id": "A"}]\n[{"id": "B"}]',
+        "wrapped.json": '{"findings": [{"id": "A"}]} {"findings": []}',
+        # NDJSON content is only accepted under a .ndjson/.jsonl name
+        "lines.json": '{"id": "A"}\n{"id": "B"}\n',
+    }
+    for name, text in cases.items():
+        path = _write(tmp_path, name, text)
+        with pytest.raises(ValueError):
+            json.loads(text)
+        with pytest.raises(ValueError):
+            list(iter_findings(path, chunk_size=5))
+        with pytest.raises(ValueError):
+            parse_json_findings(path, stream=True)
+    # trailing whitespace is still fine
+    assert list(iter_findings(_write(tmp_path, "ws.json", '[{"id": "A"}] \n\t\n'))) == [{"id": "A"}]
+
+
+def test_compact_graph_and_interned_dependencies():
+    f1 = {"id": "A", "classification": "Additive", "object_name": "t"}
+    f2 = {"id": "B", "classification": "Corrective", "object_name": "v", "dependencies": ["public.t", {"name": "t"}]}
+    f3 = {"id": "C", "classification": "Corrective", "object_name": "w", "dependencies": ["public.t", "public.v"]}
+    patches = [map_finding_to_patch(f) for f in (f1, f2, f3)]
+    # the same object parsed from different spellings is one shared instance
+    assert patches[1].dependencies[0] is patches[1].dependencies[1] is patches[0].affects[0]
+    assert not hasattr(patches[0], '__dict__')
+
+    g = build_compact_graph(patches)
+    assert g.ids == ['A', 'B', 'C']
+    assert list(g[0]) == [1, 2] and list(g[1]) == [2] and list(g[2]) == []
+    assert list(g.indegree) == [0, 1, 2]
+    assert [p.fanout for p in patches] == [2, 1, 0]
+
+    _, edges, indegree, _ = build_graph(patches)
+    assert edges == {'A': {'B', 'C'}, 'B': {'C'}, 'C': set()}
+    assert indegree == {'A': 0, 'B': 1, 'C': 2}
+
+
+def test_interned_dependencies_accept_non_string_parts():
+    # schema-valid findings may carry non-string names; interning must not reject them
+    d = parse_dependency({"schema": "public", "name": 5})
+    assert (d.schema, d.name, d.kind) == ("public", 5, "table")
+    assert parse_dependency({"schema": "public", "name": 5}) is d
+    assert parse_dependency({"name": ["x"]}).name == ["x"]
+
+    f1 = {"id": "A", "classification": "Additive", "object_name": "t", "dependencies": [{"name": 5}, {"name": 5.0}]}
+    p = map_finding_to_patch(f1)
+    assert p.dependencies[0] is p.dependencies[1] and p.dependencies[0].name == 5
+    assert {pid for pid, _ in schedule_patches([p])['unmatched']} == {"A"}
+
+def test_load_bundle_resolves_across_files(tmp_path):
+    bundle = tmp_path / "bundle"
+    bundle.mkdir()
+    (bundle / "indexes.json").write_text(json.dumps([
+        {"id": "I1", "classification": "Additive", "object_type": "index", "object_name": "t_idx",
+         "dependencies": ["public.t:table"]},
+    ]))
+    (bundle / "tables.json").write_text(json.dumps({"findings": [
+        {"id": "T1", "classification": "Additive", "object_type": "table", "object_name": "t",
+         "dependencies": [{"name": "role", "kind": "type"}]},
+    ]}))
+    (bundle / "schema.json").write_text(json.dumps([
+        {"id": "S1", "classification": "Additive", "object_type": "type", "object_name": "role"},
+    ]))
+    (bundle / "extra.ndjson").write_text(json.dumps(
+        {"id": "X1", "classification": "Corrective", "object_name": "v", "dependencies": ["public.t_idx:index"]}) + "\n")
+    (bundle / "notes.txt").write_text("ignored")
+
+    assert [os.path.basename(p) for p in bundle_members(str(bundle))] == [
+        "schema.json", "tables.json", "indexes.json", "extra.ndjson"]
+
+    serial = load_bundle(str(bundle), workers=1)
+    parallel = load_bundle(str(bundle), workers=2)
+    assert [p.id for p in serial] == [p.id for p in parallel] == ["S1", "T1", "I1", "X1"]
+    # dependencies from worker processes are re-interned against this process' objects
+    assert parallel[1].dependencies[0] is parallel[0].affects[0]
+
+    res = schedule_patches(parallel)
+    assert res["layers"] == [["S1"], ["T1"], ["I1"], ["X1"]]
+    assert res["unmatched"] == []
+
+
+def test_rank_by_priority_matches_priority_key_order():
+    patches = [
+        Patch('b', 'Corrective', 90, 'low', fanout=2),
+        Patch('a', 'Corrective', 90, 'low', fanout=2),
+        Patch('c', 'Additive', -5, 'unknown'),
+        Patch('d', 'Destructive', 1000, 'high', fanout=7),
+        Patch('e', 'Mystery', 50, 'medium'),
+    ]
+    expected = sorted(range(len(patches)), key=lambda i: priority_key(patches[i]))
+    assert rank_by_priority(patches) == expected == [2, 1, 0, 3, 4]
+
+    # non-integer confidence falls back to tuple keys
+    patches.append(Patch('f', 'Additive', 12.5, 'low'))
+    assert rank_by_priority(patches) == sorted(range(len(patches)), key=lambda i: priority_key(patches[i]))
+
+
+def test_auto_finding_id_is_stable():
+    # auto ids ignore key order and do not depend on the process hash seed
+    f = {"classification": "Corrective", "object_name": "noid", "confidence": 60}
+    assert auto_finding_id(f) == auto_finding_id(dict(reversed(list(f.items()))))
+    assert map_finding_to_patch(f).id == auto_finding_id(f)
+    code = ('import sys; sys.path.insert(0, sys.argv[1]); from sequencer_runner import map_finding_to_patch; '
+            'print(map_finding_to_patch({"classification": "Corrective", "object_name": "noid", "confidence": 60}).id)')
+    scripts = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    ids = {subprocess.run([sys.executable, '-c', code, scripts], capture_output=True, text=True, check=True,
+                          env=dict(os.environ, PYTHONHASHSEED=seed)).stdout.strip() for seed in ('1', '2')}
+    assert ids == {auto_finding_id(f)}
+
+
+def test_run_profile_stages_and_counters(tmp_path):
+    src = tmp_path / "findings.json"
+    src.write_text(json.dumps([
+        {"id": "A", "classification": "Additive", "object_name": "a"},
+        {"id": "B", "classification": "Corrective", "object_name": "b", "dependencies": ["public.a", "public.gone"]},
+        {"id": "C", "classification": "Corrective", "object_name": "c", "dependencies": ["public.a"]},
+    ]))
+    profile = RunProfile(cpu=True, memory=True)
+    with profile.stage('ingest'):
+        patches = load_bundle(str(src), profile=profile)
+    with profile.stage('schedule'):
+        result = schedule_patches(patches, profile=profile)
+    assert result == schedule_patches(patches)
+
+    report = profile.report()
+    assert [r['stage'] for r in report['stages']] == [
+        'ingest/parse', 'ingest/map', 'ingest',
+        'schedule/build_graph', 'schedule/layering', 'schedule/rank', 'schedule/emit_layers', 'schedule']
+    assert all(r['seconds'] >= 0 and r['peak_bytes'] >= 0 for r in report['stages'])
+    assert report['total_seconds'] == round(report['stages'][2]['seconds'] + report['stages'][-1]['seconds'], 6)
+    counters = report['counters']
+    assert (counters['patches'], counters['edges'], counters['unmatched_dependencies']) == (3, 2, 1)
+    assert counters['layer_widths'] == {'count': 2, 'min': 1, 'max': 2, 'mean': 1.5, 'p50': 1, 'p90': 1}
+    assert any('schedule_patches' in h['function'] for h in report['hotspots'])
+    json.dumps(report)
+
+    blocked = RunProfile()
+    schedule_patches(sample_with_cycle(), profile=blocked)
+    assert [r['stage'] for r in blocked.stages] == ['build_graph', 'layering', 'detect_cycles']
+    assert blocked.counters['scc_sizes']['count'] == 1 and 'hotspots' not in blocked.report()
+
+
+def test_non_blocking_schedules_acyclic_remainder():
+    def t(name):
+        return Dependency('public', name, 'table')
+
+    patches = sample_with_cycle() + [
+        Patch('A', 'Additive', 90, 'low', affects=[t('a')]),
+        Patch('B', 'Corrective', 80, 'low', dependencies=[t('a')], affects=[t('b')]),
+        Patch('C', 'Corrective', 80, 'low', dependencies=[t('obj8'), t('a')], affects=[t('c')]),  # downstream of the cycle
+    ]
+    assert schedule_patches(patches)['status'] == 'blocked'
+    res = schedule_patches(patches, blocking=False)
+    assert res['status'] == 'partial'
+    assert res['layers'] == [['A'], ['B']]
+    assert res['held'] == ['P8', 'P9', 'C']
+    assert res['cycles'] == schedule_patches(patches)['cycles']
+    assert len(res['feedback_edges']) == 1 and len(res['feedback_patches']) == 1
+    edge = res['feedback_edges'][0]
+    assert {edge['from'], edge['to']} == {'P8', 'P9'}
+    assert edge['objects'] == [{'schema': 'public', 'name': f"obj{edge['from'][1:]}", 'kind': 'table'}]
+
+    # without cycles both modes agree
+    acyclic = [p for p in patches if p.id not in ('P8', 'P9')]
+    assert schedule_patches(acyclic, blocking=False) == schedule_patches(acyclic)
+
+    # rings with chords: dropping the suggested edges (or patches) leaves no cycle
+    ring = []
+    for r in range(5):
+        for k in range(60):
+            deps = [t(f'r{r}_{(k - 1) % 60}'), t(f'r{r}_{(k * 7) % 60}'), t(f'r{r}_{(k * 13 + 5) % 60}')]
+            ring.append(Patch(f'R{r}_{k}', 'Corrective', 50, 'low', dependencies=deps, affects=[t(f'r{r}_{k}')]))
+    res = schedule_patches(ring, blocking=False)
+    assert len(res['cycles']) == 5 and len(res['held']) == len(ring) and res['layers'] == []
+    graph = build_compact_graph(ring)
+    cut = {(graph.pos[e['from']], graph.pos[e['to']]) for e in res['feedback_edges']}
+    assert not tarjan_scc_int([[w for w in graph[v] if (v, w) not in cut] for v in range(len(graph))])
+    removed = {graph.pos[pid] for pid in res['feedback_patches']}
+    assert not tarjan_scc_int([[w for w in graph[v] if v not in removed and w not in removed] for v in range(len(graph))])
+    # the exhaustive minimality pass keeps only arcs that each close a cycle on their own
+    scc = tarjan_scc_int(graph)[0]
+    minimal = greedy_feedback_arcs(graph, scc, minimize_work=10 ** 9)
+    assert len(minimal) <= len([e for e in cut if e[0] in scc])
+    # check on the SCC's own subgraph: the other rings would keep the whole graph cyclic anyway
+    local = {v: i for i, v in enumerate(scc)}
+
+    def without(arcs):
+        return [[local[w] for w in graph[v] if w in local and (v, w) not in arcs] for v in scc]
+
+    assert not tarjan_scc_int(without(set(minimal)))
+    for arc in minimal:
+        assert tarjan_scc_int(without(set(minimal) - {arc}))
@@ -0,0 +1,51 @@
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sequencer_bench
+from sequencer_bench import DEFAULT_BASELINE, GENERATORS, STAGES, compare, run_case
+from sequencer_runner import map_finding_to_patch, schedule_patches
+
+
+def test_generators_produce_expected_shapes():
+    shapes = {}
+    for name, gen in GENERATORS.items():
+        patches = [map_finding_to_patch(f) for f in gen(120)]
+        assert len({p.id for p in patches}) == 120
+        shapes[name] = schedule_patches(patches)
+    assert len(shapes['wide']['layers']) == 1
+    assert len(shapes['chain']['layers']) == 120
+    assert len(shapes['legacy']['layers']) == 120
+    assert shapes['cycles']['status'] == 'blocked' and len(shapes['cycles']['cycles']) == 40
+    assert all(not res['unmatched'] for res in shapes.values())
+
+
+def test_run_case_and_compare():
+    rows = run_case('diamond', 200)
+    assert [r['stage'] for r in rows] == [name for name, _ in STAGES]
+    assert all(r['seconds'] >= 0 and r['peak_bytes'] > 0 for r in rows)
+
+    slower = [dict(r, seconds=r['seconds'] * 10 + 1) for r in rows]
+    assert len(compare(slower, rows, tolerance=1.5, min_seconds=0.05)) == len(rows)
+    assert compare(rows, rows, tolerance=1.5, min_seconds=0.05) == []
+    assert compare(slower, rows, tolerance=1.5, min_seconds=0.05, metrics=('peak_bytes',)) == []
+    bigger = [dict(r, peak_bytes=r['peak_bytes'] * 2) for r in rows]
+    assert len(compare(bigger, rows, tolerance=1.5, min_seconds=0.05, metrics=('peak_bytes',))) == len(rows)
+
+
+def test_run_case_keeps_fastest_pass(monkeypatch):
+    delays = [0.05, 0.001, 0.03]
+    monkeypatch.setattr(sequencer_bench, 'STAGES', [('sleep', lambda ctx: time.sleep(delays.pop(0)))])
+    [row] = run_case('chain', 10, memory=False, repeat=3)
+    assert not delays and row['stage'] == 'sleep' and row['seconds'] < 0.02
+
+
+def test_committed_baseline_covers_every_case():
+    # re-record with `make bench-baseline` when stages or shapes change
+    with open(DEFAULT_BASELINE, 'r', encoding='utf-8') as fh:
+        rows = json.load(fh)['results']
+    cases = {(r['shape'], r['size'], r['stage']) for r in rows}
+    assert cases == {(shape, size, name) for shape in GENERATORS for size in (1000, 10000) for name, _ in STAGES}
@@ -0,0 +1,48 @@
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sequencer_runner
+from sequencer_cache import SequencerCache, findings_digest, schedule_patches_cached
+from sequencer_runner import map_finding_to_patch, sample_patches, sample_with_cycle, schedule_patches
+
+
+def test_cache_hit_returns_identical_result(tmp_path):
+    cache = SequencerCache(str(tmp_path))
+    for patches in (sample_patches(), sample_with_cycle()):
+        first = schedule_patches_cached(patches, cache)
+        second = schedule_patches_cached(patches, cache)
+        assert first == second == schedule_patches(patches)
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_digest_covers_normalized_findings_and_priorities(monkeypatch):
+    legacy = map_finding_to_patch({"finding_id": "A", "class": "additive", "severity": "Low",
+                                   "creates": [{"object_schema": "public", "object_name": "t"}]})
+    modern = map_finding_to_patch({"id": "A", "classification": "Additive", "impact": "low",
+                                   "affects": ["public.t:table"]})
+    assert findings_digest([legacy]) == findings_digest([modern])
+
+    before = findings_digest([modern])
+    monkeypatch.setitem(sequencer_runner.CLASS_PRIORITY, "Destructive", 9)
+    assert findings_digest([modern]) != before
+
+
+def test_corrupt_entries_and_lru_eviction(tmp_path):
+    cache = SequencerCache(str(tmp_path))
+    patches = sample_patches()
+    key = findings_digest(patches)
+    (tmp_path / f"{key}.json").write_text("{not json")
+    assert cache.get(key) is None and not (tmp_path / f"{key}.json").exists()
+
+    cache.put("old", {"status": "ok", "layers": [], "phases": [], "unmatched": []})
+    cache.put("new", {"status": "ok", "layers": [], "phases": [], "unmatched": []})
+    past = time.time() - 100
+    os.utime(tmp_path / "old.json", (past, past))
+    os.utime(tmp_path / "new.json", (past + 10, past + 10))
+    cache.get("old")  # touching 'old' makes 'new' the eviction candidate
+    cache.max_bytes = os.path.getsize(tmp_path / "old.json")
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == ["old.json"]
@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from builders import finding
+from sequencer_catalog import CatalogIndex, catalog_key, load_catalog, normalize_identifier, normalize_kind
+from sequencer_runner import map_finding_to_patch, parse_dependency, schedule_patches
+
+
+def test_catalog_normalization_rules():
+    assert normalize_identifier(' Users ') == 'users'
+    assert normalize_identifier('"Users"') == 'Users'
+    assert normalize_identifier('"say ""hi"""') == 'say "hi"'
+    # whitespace around a quoted name is dropped, inside the quotes it is part of the name
+    assert normalize_identifier('  "My Table" ') == 'My Table'
+    assert normalize_identifier('" padded "') == ' padded '
+    assert normalize_kind('BASE TABLE') == normalize_kind('view') == normalize_kind('S') == 'relation'
+    assert normalize_kind('PROCEDURE') == 'function' and normalize_kind('enum') == 'type'
+    assert catalog_key('', 'Create_User(text, int)', 'function') == ('public', 'create_user', 'function')
+
+
+def test_catalog_resolves_existing_objects(tmp_path):
+    snapshot = {
+        'tables': [{'table_schema': 'public', 'table_name': 'Orders', 'table_type': 'VIEW'},
+                   {'nspname': 'audit', 'relname': 'log', 'relkind': 'r'}],
+        'functions': ['public.create_user(text)'],
+        'types': [{'schema': 'public', 'typname': '"UserRole"'}, None, {'typname': 5}],
+    }
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(snapshot))
+    catalog = load_catalog(str(path))
+    assert len(catalog) == 4
+
+    deps = ["public.orders", "PUBLIC.ORDERS:view", "audit.log", "public.create_user:function",
+            "public.UserRole:type", "public.\"UserRole\":type", "public.missing", "\"Public\".orders"]
+    result = schedule_patches([map_finding_to_patch(finding("A", "a", deps, cls="Additive"))])
+    assert [d.name for _, d in catalog.missing(result['unmatched'])] == ['UserRole', 'missing', 'orders']
+    assert [d.schema for _, d in catalog.missing(result['unmatched'])] == ['public', 'public', '"Public"']
+
+    # NDJSON snapshots and findings-style records (scripts/samples/introspection-sample.json)
+    ndjson = tmp_path / 'catalog.ndjson'
+    ndjson.write_text('{"schema": "public", "object_name": "old_table", "object_type": "table"}\n'
+                      '{"routine_schema": "public", "routine_name": "create_user", "routine_type": "FUNCTION"}\n')
+    assert len(load_catalog(str(ndjson))) == 2
+    sample = os.path.join(os.path.dirname(__file__), '..', 'samples', 'introspection-sample.json')
+    assert len(load_catalog(sample)) == 3
+
+
+def test_catalog_leaves_odd_identifiers_unmatched():
+    catalog = CatalogIndex([('public', '5', 'table'), ('public', '"My Table"', 'table'), ('public', 'x', 'table')])
+    deps = [{"schema": "public", "name": 5}, {"schema": 7, "name": "x"},
+            ' "My Table" ', 'public." My Table "', 'public."My Table"']
+    result = schedule_patches([map_finding_to_patch(finding("A", "a", deps))])
+    missing = [d.name for _, d in catalog.missing(result['unmatched'])]
+    # non-string parts never match (not even the catalog's '5'); quoted names keep inner spaces
+    assert missing == [5, "x", '" My Table "']
+    # unhashable parts are not looked up at all
+    assert catalog.missing([("B", parse_dependency({"name": ["x"]}))])[0][1].name == ["x"]
@@ -0,0 +1,84 @@
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sequencer_incremental import IncrementalScheduler
+from sequencer_runner import map_finding_to_patch, schedule_patches
+
+
+def _finding(pid, obj, deps=(), cls='Corrective', conf=80):
+    return {'id': pid, 'classification': cls, 'confidence': conf, 'impact': 'medium',
+            'object_name': obj, 'dependencies': list(deps)}
+
+
+def _plain(plan):
+    plan = dict(plan)
+    plan['unmatched'] = [(pid, (d.schema, d.name, d.kind)) for pid, d in plan['unmatched']]
+    return plan
+
+
+def test_incremental_diff_reports_changes():
+    sched = IncrementalScheduler([
+        _finding('A', 'a', cls='Additive'),
+        _finding('B', 'b', ['public.a']),
+        _finding('C', 'c', ['public.b', 'public.missing']),
+    ])
+    assert sched.plan()['layers'] == [['A'], ['B'], ['C']]
+
+    diff = sched.add_finding(_finding('M', 'missing', cls='Additive'))
+    assert diff['added'] == {'M': 0}
+    assert diff['moved'] == {}
+    assert [pid for pid, _ in diff['unmatched_resolved']] == ['C']
+
+    diff = sched.update_finding(_finding('B', 'b'))
+    assert diff['moved'] == {'B': (1, 0), 'C': (2, 1)}
+    assert sched.indegree('C') == 2
+
+    diff = sched.update_finding(_finding('A', 'a', ['public.c'], cls='Additive'))
+    assert diff['status'] == 'ok'
+    diff = sched.update_finding(_finding('B', 'b', ['public.a']))
+    assert diff['status'] == 'blocked' and sorted(diff['cycles'][0]) == ['A', 'B', 'C']
+
+    diff = sched.remove_finding('A')
+    assert diff['previous_status'] == 'blocked' and diff['status'] == 'ok'
+    assert diff['removed'] == ['A']
+    assert sched.plan()['layers'] == [['M', 'B'], ['C']]
+
+    with pytest.raises(ValueError):
+        sched.add_finding(_finding('B', 'b'))
+    with pytest.raises(KeyError):
+        sched.remove_finding('nope')
+
+
+def test_incremental_matches_full_reschedule():
+    rng = random.Random(1234)
+    classes = ['Additive', 'Corrective', 'Destructive']
+
+    def rand_finding(pid, n):
+        deps = [f'public.o{rng.randint(0, n + 3)}' for _ in range(rng.randint(0, 3))]
+        return _finding(pid, f'o{rng.randint(0, n)}', deps, rng.choice(classes), rng.randint(0, 100))
+
+    for _ in range(60):
+        n = rng.randint(1, 20)
+        findings = {f'F{i}': rand_finding(f'F{i}', n) for i in range(n)}
+        sched = IncrementalScheduler(list(findings.values()))
+        for step in range(20):
+            op = rng.random()
+            if op < 0.35 or not findings:
+                pid = f'F{n + step}'
+                findings[pid] = rand_finding(pid, n)
+                sched.add_finding(findings[pid])
+            elif op < 0.7:
+                pid = rng.choice(list(findings))
+                findings[pid] = rand_finding(pid, n)
+                sched.update_finding(findings[pid])
+            else:
+                pid = rng.choice(list(findings))
+                del findings[pid]
+                sched.remove_finding(pid)
+            expected = schedule_patches([map_finding_to_patch(f) for f in findings.values()])
+            assert _plain(sched.plan()) == _plain(expected)
@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sequencer_ingest import ingest_validated
+from sequencer_runner import parse_json_findings
+
+
+def _codes(signals):
+    return {s['code']: s for s in signals}
+
+
+def test_ingest_validated_matches_parse_and_reports_signals(tmp_path):
+    findings = [
+        {"id": "A", "classification": "Additive", "confidence": 95, "object_name": "t"},
+        {"finding_id": "B", "classification": "corrective", "confidence": 30, "depends_on": ["public.t"],
+         "affected": [{"schema": "public", "name": "v"}]},
+        {"classification": "Destructive", "object_name": "old"},
+        {"id": "A", "classification": "Corrective", "object_name": "t2"},
+    ]
+    path = tmp_path / "findings.json"
+    path.write_text(json.dumps({"findings": findings}))
+
+    patches, signals, digest = ingest_validated(str(path))
+    assert [p.id for p in patches] == [p.id for p in parse_json_findings(str(path))]
+    assert digest == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    codes = _codes(signals)
+    assert not any(s['level'] == 'error' for s in signals)
+    assert codes['legacy_field:finding_id']['examples'] == ['findings.1']
+    assert 'legacy_field:depends_on' in codes and 'legacy_field:affected' in codes
+    assert codes['low_confidence']['examples'] == ['B']
+    assert codes['duplicate_id']['examples'] == ['A']
+    assert codes['auto_id']['count'] == 1
+    assert codes['inferred_affects']['count'] == 3
+    assert 'shape:wrapped' in codes
+
+
+def test_ingest_validated_hard_failures(tmp_path):
+    bad = tmp_path / "bad.json"
+    bad.write_text(json.dumps([{"id": "X", "classification": "Fix"}, {"id": "Y", "classification": "Additive"}]))
+    patches, signals, _ = ingest_validated(str(bad))
+    codes = _codes(signals)
+    assert codes['schema_violation']['level'] == 'error'
+    assert codes['schema_violation']['examples'][0].startswith('0.classification:')
+    assert [p.id for p in patches] == ['Y']
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('[{"id": "A", "classification": "Additive"}, {"id": "B", "classif')
+    _, signals, _ = ingest_validated(str(truncated))
+    assert _codes(signals)['corrupted_artifact']['level'] == 'error'
+
+    # a second document or junk after the findings is corrupt too, and only the first value's findings map
+    for name, text in (('joined.json', '[{"id": "A", "classification": "Additive"}][{"id": "B", "classification": "Additive"}]'),
+                       ('junk.json', '{"findings": [{"id": "A", "classification": "Additive"}]}\n\x00garbage')):
+        joined = tmp_path / name
+        joined.write_text(text)
+        patches, signals, digest = ingest_validated(str(joined))
+        assert _codes(signals)['corrupted_artifact']['level'] == 'error'
+        assert [p.id for p in patches] == ['A']
+        assert digest == hashlib.sha256(joined.read_bytes()).hexdigest()
+
+    # invalid UTF-8 where parsing stops (and beyond it) is corrupt, not a crash
+    for name, data in (('mid.json', b'[{"id":"A","classification":"Additive"},' + b'\xff\xfe' * 200000 + b']'),
+                       ('tail.json', b'[{"id":"A","classification":"Additive"}]  ' + b'\xff\xfe' * 200000)):
+        binary = tmp_path / name
+        binary.write_bytes(data)
+        _, signals, digest = ingest_validated(str(binary))
+        assert _codes(signals)['corrupted_artifact']['level'] == 'error'
+        assert digest == hashlib.sha256(data).hexdigest()
+
+    good = tmp_path / "good.json"
+    good.write_text('[]')
+    _, signals, _ = ingest_validated(str(good), expect_sha256='0' * 64)
+    codes = _codes(signals)
+    assert codes['checksum_mismatch']['level'] == 'error'
+    _, signals, digest = ingest_validated(str(good))
+    assert _codes(signals)['empty_artifact']['level'] == 'warning'
+    _, signals, _ = ingest_validated(str(good), expect_sha256=digest.upper())
+    assert 'checksum_mismatch' not in _codes(signals)
@@ -0,0 +1,85 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from builders import finding
+from sequencer_bench import gen_chain, gen_cycles, gen_diamond
+from sequencer_output import plan_summary, read_plan_file, write_plan_file, write_plan_json, write_plan_ndjson
+from sequencer_runner import map_finding_to_patch, schedule_patches
+
+
+def _results():
+    ok = schedule_patches([map_finding_to_patch(f) for f in gen_diamond(40)]
+                          + [map_finding_to_patch(finding('Ü-1', 'u', ['ext.missing:view'], cls='Additive'))])
+    blocked = schedule_patches([map_finding_to_patch(f) for f in gen_cycles(9)])
+    return ok, blocked
+
+
+def test_json_and_ndjson_writers_round_trip():
+    ok, blocked = _results()
+    signals = [{'category': 'semantic', 'level': 'info', 'code': 'auto_id', 'message': 'm', 'count': 1, 'examples': []}]
+
+    buf = io.StringIO()
+    write_plan_json(ok, buf, signals=signals, execution_plan={'status': 'ok', 'unmatched': ok['unmatched']})
+    doc = json.loads(buf.getvalue())
+    assert doc['layers'] == ok['layers']
+    assert list(doc['phases'].items()) == [(name, ids) for name, ids in ok['phases']]
+    assert doc['unmatched'] == [{'id': 'Ü-1', 'schema': 'ext', 'name': 'missing', 'kind': 'view'}]
+    assert doc['signals'] == signals
+    # one record shape for unmatched dependencies, top level and inside the execution plan
+    assert doc['execution_plan']['unmatched'] == doc['unmatched']
+
+    buf = io.StringIO()
+    write_plan_ndjson(ok, buf, signals=signals, execution_plan={'status': 'ok', 'unmatched': ok['unmatched']})
+    records = [json.loads(line) for line in buf.getvalue().splitlines()]
+    unmatched = [{k: v for k, v in r.items() if k != 'type'} for r in records if r['type'] == 'unmatched']
+    assert unmatched == records[-1]['unmatched'] == doc['unmatched']
+    assert records[0] == {'type': 'plan', 'status': 'ok', 'unmatched': 1, 'layers': len(ok['layers']), 'patches': 41}
+    assert [r['ids'] for r in records if r['type'] == 'layer'] == ok['layers']
+    assert [(r['phase'], r['ids']) for r in records if r['type'] == 'phase'] == ok['phases']
+    assert [r['type'] for r in records].count('signal') == 1
+
+    buf = io.StringIO()
+    write_plan_json(blocked, buf)
+    assert json.loads(buf.getvalue()) == {'status': 'blocked', 'cycles': blocked['cycles'], 'unmatched': []}
+    assert plan_summary(blocked) == 'status=blocked cycles=3 unmatched=0'
+    assert plan_summary(ok).startswith(f"status=ok patches=41 layers={len(ok['layers'])} Additive=")
+
+
+def test_plan_file_round_trip(tmp_path):
+    findings = gen_cycles(9) + gen_diamond(20)[12:]
+    partial = schedule_patches([map_finding_to_patch(f) for f in findings], blocking=False)
+    assert partial['status'] == 'partial' and partial['layers'] and partial['feedback_edges']
+    for result in _results() + (partial,):
+        path = str(tmp_path / 'plan.bin')
+        write_plan_file(result, path)
+        assert read_plan_file(path) == result
+
+    bogus = tmp_path / 'bogus.bin'
+    bogus.write_bytes(b'not a plan file at all')
+    with pytest.raises(ValueError):
+        read_plan_file(str(bogus))
+
+
+def test_cli_quiet_and_machine_formats(tmp_path):
+    src = tmp_path / 'findings.json'
+    src.write_text(json.dumps(gen_chain(30)))
+    runner = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'sequencer_runner.py'))
+    base = [sys.executable, runner, '--input', str(src), '--no-cache']
+
+    quiet = subprocess.run(base + ['--quiet'], capture_output=True, text=True, check=True).stdout.splitlines()
+    assert quiet == ['Loaded 30 patches from ' + str(src),
+                     'status=ok patches=30 layers=30 Additive=10 Corrective=10 Destructive=10 unmatched=0']
+
+    plan_file = str(tmp_path / 'plan.bin')
+    out = subprocess.run(base + ['--format', 'ndjson', '--plan-file', plan_file], capture_output=True, text=True, check=True)
+    records = [json.loads(line) for line in out.stdout.splitlines()]
+    assert records[0]['type'] == 'plan' and len([r for r in records if r['type'] == 'layer']) == 30
+    assert read_plan_file(plan_file)['layers'] == [r['ids'] for r in records if r['type'] == 'layer']
+    assert 'Loaded 30 patches' in out.stderr
@@ -0,0 +1,53 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sequencer_planner import plan_parallel_execution
+from sequencer_runner import Dependency, Patch, sample_patches, sample_with_cycle
+
+
+def _patch(pid, cls='Additive', deps=(), conf=80):
+    return Patch(pid, cls, conf, 'low', dependencies=[Dependency('public', d, 'table') for d in deps],
+                 affects=[Dependency('public', pid.lower(), 'table')])
+
+
+def test_longest_path_first_list_scheduling():
+    # A(3) -> B(1) is the critical chain; C, D, E are short independent patches
+    patches = [_patch('C', conf=99), _patch('D', conf=98), _patch('E', conf=97), _patch('A', conf=10), _patch('B', deps=['a'])]
+    plan = plan_parallel_execution(patches, workers=2, costs={'A': 3})
+    assert plan['status'] == 'ok'
+    additive = plan['phases'][0]
+    starts = {a['id']: a['start'] for a in additive['assignments']}
+    assert starts['A'] == 0 and starts['B'] == 3
+    assert plan['makespan'] == 4 == plan['lower_bound']
+    assert all(len(batch) <= 2 for batch in additive['batches'])
+
+
+def test_phase_barriers_and_deferral():
+    patches = [
+        _patch('X', 'Corrective'),
+        _patch('Y', 'Additive', deps=['x']),  # needs a Corrective patch -> deferred
+        _patch('Z', 'Destructive'),
+        _patch('W', 'Additive'),
+    ]
+    plan = plan_parallel_execution(patches, workers=4)
+    assert plan['deferred'] == {'Y': 'Corrective'}
+    by_phase = {ph['phase']: ph for ph in plan['phases']}
+    assert [a['id'] for a in by_phase['Additive']['assignments']] == ['W']
+    assert by_phase['Corrective']['start'] == 1 and by_phase['Corrective']['batches'] == [['X'], ['Y']]
+    assert by_phase['Destructive']['start'] == 3
+    assert plan['makespan'] == 4
+
+
+def test_sample_plan_and_errors():
+    plan = plan_parallel_execution(sample_patches(), workers=1)
+    ids = [a['id'] for ph in plan['phases'] for a in ph['assignments']]
+    assert sorted(ids) == sorted(p.id for p in sample_patches())
+    assert plan['makespan'] == len(ids) == plan['total_work']
+
+    assert plan_parallel_execution(sample_with_cycle(), workers=2)['status'] == 'blocked'
+    with pytest.raises(ValueError):
+        plan_parallel_execution(sample_patches(), workers=0)
@@ -0,0 +1,53 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from builders import chain_patches, table
+from sequencer_bench import gen_cycles, gen_diamond
+from sequencer_runner import Patch, RunProfile, map_finding_to_patch, schedule_patches
+from sequencer_shards import partition_patches, schedule_patches_sharded
+
+
+def _patches(cross_schema=False, cycles=False):
+    def extra_deps(s):
+        def deps(i):
+            out = [table(f's{s}', 't29')] if cycles and i == 0 else []
+            if cross_schema and s == 4 and i == 7:
+                out.append(table('s1', 't3'))
+            return out
+        return deps
+
+    patches = []
+    for s in range(6):
+        patches += chain_patches(f's{s}', 30, f's{s}-', shift=s, extra_deps=extra_deps(s))
+    # a duplicate id (last one wins) and a schema split across two producers of the same object
+    patches.append(Patch('s2-3', 'Corrective', 10, 'high', dependencies=[table('s2', 't1')], affects=[table('s2', 't3')]))
+    patches.append(Patch('x-1', 'Additive', 90, 'low', affects=[table('s5', 't0')]))
+    return patches
+
+
+def test_sharded_schedule_matches_serial():
+    for cross_schema in (False, True):
+        for cycles in (False, True):
+            for blocking in (True, False):
+                patches = _patches(cross_schema, cycles)
+                profile = RunProfile()
+                sharded = schedule_patches_sharded(patches, workers=3, profile=profile, blocking=blocking)
+                assert sharded == schedule_patches(patches, blocking=blocking)
+                assert profile.counters['shard_mode'] == 'schema'
+                assert ('shard_conflicts' in profile.counters) == cross_schema
+
+    # one schema: falls back to weakly connected components
+    patches = [map_finding_to_patch(f) for f in gen_cycles(12) + gen_diamond(40)[14:]]
+    profile = RunProfile()
+    assert schedule_patches_sharded(patches, workers=2, profile=profile, blocking=False) == \
+        schedule_patches(patches, blocking=False)
+    assert profile.counters['shard_mode'] == 'components'
+
+
+def test_partition_patches_components():
+    components, pos = partition_patches(_patches(cross_schema=True))
+    ids = list(pos)
+    by_schema = sorted(sorted({ids[i].split('-')[0] for i in comp}) for comp in components)
+    assert by_schema == [['s0'], ['s1', 's4'], ['s2'], ['s3'], ['s5', 'x']]
@@ -0,0 +1,65 @@
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import sequencer_runner
+from builders import chain_patches, table
+from sequencer_runner import Patch, schedule_patches
+from sequencer_whatif import PlanSimulator, Scenario
+
+
+def _patches():
+    patches = chain_patches('s', 40, 'P', fan=3, confidence=(40, 50), impact_step=2, missing=(13, 4))
+    # a second producer of t5, and a two-patch cycle that only excluding C1 breaks
+    patches.append(Patch('P5b', 'Corrective', 70, 'low', affects=[table('s', 't5')]))
+    patches.append(Patch('C1', 'Additive', 30, 'low', dependencies=[table('s', 'c2')], affects=[table('s', 'c1')]))
+    patches.append(Patch('C2', 'Destructive', 95, 'high', dependencies=[table('s', 'c1')], affects=[table('s', 'c2')]))
+    return patches
+
+
+def test_plan_matches_schedule_patches(monkeypatch):
+    policies = [(None, None),
+                ({'Additive': 1, 'Corrective': 2, 'Destructive': 3}, None),
+                (None, {'low': 1, 'medium': 1, 'high': 5}),
+                ({'Additive': 2, 'Corrective': 2}, {'high': 0.5})]
+    exclusions = [(), ('C1',), ('C2', 'P5', 'P12'), ('C1', 'P0', 'P5b')]
+    # the cyclic baseline reruns the Kahn sweep, the acyclic one updates the baseline layering
+    for patches in (_patches(), _patches()[:-2]):
+        sim = PlanSimulator(patches)
+        for (cp, ip), exclude, min_confidence in itertools.product(policies, exclusions, (None, 60)):
+            scenario = Scenario('s', cp, ip, exclude, min_confidence)
+            with monkeypatch.context() as m:
+                if cp is not None:
+                    m.setattr(sequencer_runner, 'CLASS_PRIORITY', cp)
+                if ip is not None:
+                    m.setattr(sequencer_runner, 'IMPACT_PRIORITY', ip)
+                kept = [p for p in patches if p.id not in exclude
+                        and (min_confidence is None or p.confidence >= min_confidence)]
+                expected = schedule_patches(kept)
+                assert sim.plan(scenario) == expected
+
+
+def test_evaluate_metrics():
+    sim = PlanSimulator(_patches())
+    blocked, unblocked, flipped = sim.compare([
+        Scenario('baseline'),
+        Scenario('drop C1', exclude={'C1'}),
+        Scenario('drop C1, destructive first', class_priority={'Destructive': 9}, exclude={'C1'}),
+    ])
+    assert blocked['status'] == 'blocked' and blocked['moved'] is None
+
+    assert unblocked['status'] == 'ok'
+    assert (unblocked['excluded'], unblocked['patches']) == (1, 42)
+    assert unblocked['phases'] == {'Additive': 14, 'Corrective': 14, 'Destructive': 14}
+    assert unblocked['unmatched'] == 4  # three ext.missing, plus C2's dependency on C1
+    assert unblocked['moved'] == 0  # nothing to compare against: the baseline is blocked
+
+    assert flipped['layers'] == unblocked['layers']
+    assert flipped['max_layer_width'] == unblocked['max_layer_width']
+
+    acyclic = PlanSimulator([p for p in _patches() if p.id != 'C1'])
+    same, flipped = acyclic.compare([Scenario(), Scenario('destructive first', class_priority={'Destructive': 9})])
+    assert (same['moved'], same['mean_displacement']) == (0, 0.0)
+    assert flipped['moved'] > 0 and flipped['mean_displacement'] > 0
@@ -0,0 +1,86 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import scan_traces_ci
+from builders import write_zip
+from scan_traces_ci import SIGNALS, scan
+from trace_index import TraceIndex
+
+PREFIX = 'rbac-Role-Based-Access-Con-'
+
+
+def _write_trace(root, k, members):
+    return write_zip(root / f'{PREFIX}{k}' / 'trace.zip', members)
+
+
+def test_rescan_only_changed_traces(tmp_path, monkeypatch):
+    root = tmp_path / 'artifacts'
+    root.mkdir()
+    for k in range(4):
+        _write_trace(root, k, [('0-trace.trace', 'GET /?__ssr_probe=1'), ('1-trace.network', f'row {k}')])
+    (root / f'{PREFIX}bad').mkdir()
+    (root / f'{PREFIX}bad' / 'trace.zip').write_bytes(b'not a zip')
+    db = str(tmp_path / 'index.sqlite')
+
+    calls = []
+    scan_stream = scan_traces_ci.scanner.scan_stream
+    monkeypatch.setattr(scan_traces_ci.scanner, 'scan_stream', lambda *a: calls.append(1) or scan_stream(*a))
+
+    index = TraceIndex(db, SIGNALS)
+    rows = scan(str(root), workers=1, index=index)
+    assert (index.hits, index.misses, len(calls)) == (0, 5, 8)
+    assert rows == scan(str(root), workers=1)
+    index.close()
+
+    # unchanged: answered from the index without opening a zip; the error row was not stored
+    calls.clear()
+    index = TraceIndex(db, SIGNALS)
+    assert scan(str(root), workers=1, index=index) == rows
+    assert (index.hits, index.misses, len(calls)) == (4, 1, 0)
+
+    # touched only: the central directory CRC matches, nothing is decompressed
+    os.utime(root / f'{PREFIX}1' / 'trace.zip', ns=(1, 1))
+    # changed: only the new member is scanned
+    _write_trace(root, 2, [('0-trace.trace', 'GET /?__ssr_probe=1'), ('1-trace.network', 'row 2'),
+                           ('2-trace.network', 'Set-Cookie: test_user=1')])
+    calls.clear()
+    rows = scan(str(root), workers=1, index=index)
+    assert len(calls) == 1
+    assert rows == scan(str(root), workers=1)
+    assert rows[2] == (f'{PREFIX}2', 'yes', 'no', 'no', 'yes', 'no')
+
+    # deleted traces are pruned (three good traces remain; the corrupt one is never stored)
+    os.remove(root / f'{PREFIX}3' / 'trace.zip')
+    scan(str(root), workers=1, index=index)
+    assert index.conn.execute('SELECT COUNT(*) FROM traces').fetchone()[0] == 3
+    index.close()
+
+    # another signal table starts a fresh index
+    index = TraceIndex(db, {'probe': [('__ssr_probe',)]})
+    assert index.conn.execute('SELECT COUNT(*) FROM traces').fetchone()[0] == 0
+    index.close()
+
+
+def test_failed_scan_is_retried_next_run(tmp_path, monkeypatch):
+    root = tmp_path / 'artifacts'
+    root.mkdir()
+    _write_trace(root, 0, [('0-trace.trace', 'GET /?__ssr_probe=1')])
+    db = str(tmp_path / 'index.sqlite')
+
+    def flaky(*args):
+        raise OSError('Resource temporarily unavailable')
+
+    with monkeypatch.context() as m:
+        m.setattr(scan_traces_ci, 'scan_members', flaky)
+        index = TraceIndex(db, SIGNALS)
+        assert scan(str(root), workers=1, index=index)[0][1] == 'error'
+        index.close()
+
+    # same size and mtime, but the error was not cached: the zip is scanned again
+    index = TraceIndex(db, SIGNALS)
+    assert scan(str(root), workers=1, index=index) == scan(str(root), workers=1)
+    assert (index.hits, index.misses) == (0, 1)
+    assert scan(str(root), workers=1, index=index)[0][1] == 'yes' and index.hits == 1
+    index.close()
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from builders import write_zip
+from trace_query import TraceQuery
+
+
+def _naive(data, patterns, regexes, context):
+    lines = data.split(b'\n')
+    if data.endswith(b'\n'):
+        lines.pop()
+    text = [ln.decode('utf-8', errors='ignore') for ln in lines]
+    records, start = [], 0
+    for k, ln in enumerate(lines):
+        hits = [(i, p) for p in patterns for i in range(len(ln)) if ln.lower().startswith(p.lower().encode(), i)]
+        hits += [(m.start(), r) for r in regexes for m in re.finditer(r.encode(), ln, re.IGNORECASE)]
+        for col, pattern in hits:
+            records.append({'type': 'match', 'line': k + 1, 'column': col, 'offset': start + col, 'pattern': pattern,
+                            'text': text[k], 'before': text[max(0, k - context):k], 'after': text[k + 1:k + 1 + context]})
+        start += len(ln) + 1
+    return records
+
+
+def test_query_member_matches_naive_search():
+    rnd = random.Random(5)
+    patterns, regexes = ['ab', 'Ba', 'xyz'], [r'c+d']
+    for _ in range(150):
+        data = ''.join(rnd.choice(['a', 'b', 'c', 'd', 'x', 'y', 'z', 'A', '\n', '\n']) for _ in range(rnd.randint(0, 80)))
+        data = data.encode()
+        for context in (0, 1, 3):
+            query = TraceQuery(patterns, regexes, context=context, chunk_size=rnd.randint(1, 9))
+            chunks = [data[i:i + query.chunk_size] for i in range(0, len(data), query.chunk_size)]
+            got = list(query.query_member(chunks))
+            assert [r['offset'] for r in got] == sorted(r['offset'] for r in got)
+            key = lambda r: (r['offset'], r['pattern'])  # noqa: E731
+            assert sorted(got, key=key) == sorted(_naive(data, patterns, regexes, context), key=key)
+
+
+def test_run_streams_ndjson(tmp_path):
+    run = tmp_path / 'run' / 'rbac-a'
+    write_zip(run / 'trace.zip', {'0-trace.network': 'GET /\nSet-Cookie: test_user=admin\nok\n' * 3,
+                                  'resources/shot.png': b'test_user'})
+    (run.parent / 'broken.zip').write_bytes(b'not a zip')
+
+    out = io.StringIO()
+    summary = TraceQuery(['TEST_USER'], context=1, max_count=2).run([str(tmp_path / 'run')], out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['type'] for r in records] == ['error', 'match', 'match', 'summary']
+    assert records[1]['member'] == '0-trace.network'
+    assert (records[1]['line'], records[1]['before'], records[1]['after']) == (2, ['GET /'], ['ok'])
+    assert records[2]['line'] == 5
+    assert summary == records[-1] == {'type': 'summary', 'zips': 2, 'members': 2, 'matches': 2}
+
+
+def test_summary_counts_a_zip_that_fails_partway(tmp_path, monkeypatch):
+    path = write_zip(tmp_path / 'trace.zip', [(f'{k}-trace.network', 'Set-Cookie: test_user=1\n') for k in range(3)])
+    query = TraceQuery(['test_user'])
+    query_member = query.query_member
+    calls = []
+
+    def failing(chunks):
+        calls.append(1)
+        if len(calls) == 2:
+            raise OSError('read error')
+        return query_member(chunks)
+
+    monkeypatch.setattr(query, 'query_member', failing)
+    out = io.StringIO()
+    summary = query.run([path], out)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r['type'] for r in records] == ['match', 'error', 'summary']
+    # the matches already written are counted along with the members they came from
+    assert summary == {'type': 'summary', 'zips': 1, 'members': 2, 'matches': 1}
+
+
+def test_find_in_trace_keeps_text_output(tmp_path):
+    path = write_zip(tmp_path / 'trace.zip', {
+        'a.txt': ''.join(f'line {i}\n' for i in range(6)) + 'GET TEST_USER\nafter 1\nafter 2\nafter 3\ntest_user\n',
+        'b.txt': 'nothing here',
+        'c.txt': 'test_user first\nx\n',
+    })
+    script = os.path.join(os.path.dirname(__file__), '..', 'find_in_trace.py')
+    out = subprocess.run([sys.executable, script, path, 'Test_User'], capture_output=True, text=True, check=True)
+    assert out.stdout.splitlines() == [
+        f'Searching {path} for test_user', '', '-- a.txt', 'line 3', 'line 4', 'line 5', 'GET TEST_USER',
+        'after 1', 'after 2', '', '-- c.txt', 'test_user first', 'x']
@@ -0,0 +1,63 @@
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from builders import write_zip
+from trace_scan import SignalMatcher, SignalScanner, iter_line_blocks, read_spans
+
+
+def test_matcher_matches_naive_search():
+    needles = ['ab', 'abc', 'bca', 'CA', 'c', 'aab', 'x-Y']
+    matcher = SignalMatcher(needles)
+    rnd = random.Random(7)
+    for _ in range(300):
+        text = ''.join(rnd.choice('aAbBcC-xy') for _ in range(rnd.randint(0, 40)))
+        low = text.lower()
+        expected = {n: low.find(n.lower()) for n in needles if n.lower() in low}
+        assert matcher.find(text) == expected
+        assert matcher.find(text.encode()) == expected
+        assert matcher.find(text, ['c', 'bca']) == {n: i for n, i in expected.items() if n in ('c', 'bca')}
+        occurrences = sorted((i, -len(n), n) for n in needles for i in range(len(text))
+                             if low.startswith(n.lower(), i))
+        assert list(matcher.finditer(text)) == [(i, n) for i, _, n in occurrences]
+
+    assert SignalMatcher(['Set-Cookie'], ignore_case=False).find('set-cookie: a; Set-Cookie: b') == {'Set-Cookie': 15}
+
+
+def test_scanner_signals_and_zip(tmp_path):
+    scanner = SignalScanner({
+        'probe': [('__ssr_probe=',)],
+        'cookie_on_probe': [('test_user', '__ssr_probe')],
+        'fallback': [('/api/test/set-test-user',), ('set-cookie', 'test_user')],
+    })
+    assert scanner.scan('GET /?__ssr_probe=1') == {'probe'}
+    assert scanner.scan('Set-Cookie: test_user=admin') == {'fallback'}
+
+    trace = write_zip(tmp_path / 'trace.zip', {
+        '0-trace.network': 'Set-Cookie: test_user=admin\n',
+        '1-trace.trace': 'goto /?__SSR_PROBE=1 cookie test_user\n',
+        'resources/a.png': b'\x89PNG\r\n',
+    })
+    assert scanner.scan_zip(trace) == {'probe', 'cookie_on_probe', 'fallback'}
+    # a probe in a screenshot or an unknown binary blob does not count
+    write_zip(trace, {'resources/page@1.jpeg': b'__ssr_probe=1', 'resources/blob': b'\x00\x01__ssr_probe=1'})
+    assert scanner.scan_zip(trace) == set()
+
+
+def test_streams_match_whole_text():
+    matcher = SignalMatcher(['abc', 'bcab', 'C', 'cc-x'])
+    rnd = random.Random(3)
+    for _ in range(200):
+        data = ''.join(rnd.choice('abcC-x\n') for _ in range(rnd.randint(0, 60))).encode()
+        cuts = sorted(rnd.sample(range(len(data) + 1), min(len(data) + 1, rnd.randint(0, 8))))
+        chunks = [data[i:j] for i, j in zip([0] + cuts, cuts + [len(data)]) if j > i]
+        assert matcher.find_stream(chunks) == matcher.find(data)
+        assert list(matcher.finditer_stream(chunks)) == list(matcher.finditer(data))
+        spans = sorted((s, s + rnd.randint(0, 9)) for s in rnd.sample(range(len(data) + 1), min(3, len(data) + 1)))
+        assert read_spans(chunks, spans) == [data[s:e] for s, e in spans]
+        blocks = list(iter_line_blocks(chunks))
+        assert b''.join(b for _, b in blocks) == data
+        assert all(b.endswith(b'\n') for _, b in blocks[:-1])
+        assert all(data[off:off + len(b)] == b for off, b in blocks)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Persistent index of scanned traces
+
+The CI watch-and-sweep tooling reruns scan_traces_ci.py over mostly the same artifact directories.
+TraceIndex keeps what earlier runs found in a SQLite file so a rerun only scans what changed:
+
+- traces: one row per zip path with its size, mtime, CRC and result row. A zip whose size and
+  mtime are unchanged is answered from here without being opened.
+- a zip whose size or mtime changed has its CRC recomputed from the central directory (member
+  names, CRC-32s and sizes; no decompression). If that matches, it was only touched or downloaded
+  again, and the stored row is reused.
+- members: the signals looked for and found in each scanned member, keyed by member name, CRC and
+  size. When a zip really changed, members that did not change are not decompressed again.
+
+Entries are only valid for one signal table: the index stores a digest of the signals (and
+INDEX_VERSION) and starts over when it differs. Bump INDEX_VERSION whenever scanning semantics
+change.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import zipfile
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from trace_scan import SignalScanner, iter_chunks  # noqa: E402
+
+
+INDEX_VERSION = 1
+INDEX_NAME = '.trace-scan-index.sqlite'
+
+# (name, crc, size, signals looked for, signals found)
+MemberRecord = Tuple[str, int, int, List[str], List[str]]
+
+
+def signals_digest(signals: Dict) -> str:
+    policy = {'version': INDEX_VERSION, 'signals': signals}
+    return hashlib.sha256(json.dumps(policy, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def zip_crc(z: zipfile.ZipFile) -> int:
+    """CRC-32 over the central directory entries (name, CRC-32, size) of a zip."""
+    crc = 0
+    for info in z.infolist():
+        crc = zlib.crc32(f'{info.filename}\0{info.CRC}\0{info.file_size}\n'.encode('utf-8'), crc)
+    return crc
+
+
+def scan_members(scanner: SignalScanner, z: zipfile.ZipFile,
+                 known: Dict[str, MemberRecord]) -> Tuple[Set[str], List[MemberRecord]]:
+    """SignalScanner.scan_zip, reusing `known` member results whose CRC and size still match.
+
+    Returns the signals hit and a record per member looked at (members after the point where every
+    signal was hit are not).
+    """
+    hit: Set[str] = set()
+    records: List[MemberRecord] = []
+    for info in z.infolist():
+        needed = [name for name in scanner.signals if name not in hit]
+        record = known.get(info.filename)
+        if record is not None and record[1:3] == (info.CRC, info.file_size) and set(needed) <= set(record[3]):
+            found = set(record[4]).intersection(needed)
+            records.append(record)
+        else:
+            found = scanner.scan_stream(iter_chunks(z, info.filename), needed)
+            records.append((info.filename, info.CRC, info.file_size, needed, sorted(found)))
+        hit |= found
+        if len(hit) == len(scanner.signals):
+            break
+    return hit, records
+
+
+class TraceIndex:
+    def __init__(self, path: str, signals: Dict):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            digest = signals_digest(signals)
+            stored = self.conn.execute("SELECT value FROM meta WHERE key = 'signals'").fetchone()
+            if stored is None or stored[0] != digest:
+                self.conn.execute('DROP TABLE IF EXISTS traces')
+                self.conn.execute('DROP TABLE IF EXISTS members')
+                self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('signals', ?)", (digest,))
+            self.conn.execute('CREATE TABLE IF NOT EXISTS traces (path TEXT PRIMARY KEY, size INTEGER, '
+                              'mtime_ns INTEGER, crc INTEGER, row TEXT)')
+            self.conn.execute('CREATE TABLE IF NOT EXISTS members (path TEXT, name TEXT, crc INTEGER, size INTEGER, '
+                              'checked TEXT, hit TEXT, PRIMARY KEY (path, name))')
+
+    def close(self):
+        self.conn.close()
+
+    def lookup(self, zip_path: str) -> Tuple[Optional[tuple], Optional[int]]:
+        """(stored row if size and mtime are unchanged, stored CRC)."""
+        st = os.stat(zip_path)
+        found = self.conn.execute('SELECT size, mtime_ns, crc, row FROM traces WHERE path = ?',
+                                  (os.path.abspath(zip_path),)).fetchone()
+        if found is None:
+            self.misses += 1
+            return None, None
+        if (found[0], found[1]) == (st.st_size, st.st_mtime_ns):
+            self.hits += 1
+            return tuple(json.loads(found[3])), found[2]
+        self.misses += 1
+        return None, found[2]
+
+    def stored_row(self, zip_path: str) -> Optional[tuple]:
+        found = self.conn.execute('SELECT row FROM traces WHERE path = ?', (os.path.abspath(zip_path),)).fetchone()
+        return None if found is None else tuple(json.loads(found[0]))
+
+    def known_members(self, zip_path: str) -> Dict[str, MemberRecord]:
+        cur = self.conn.execute('SELECT name, crc, size, checked, hit FROM members WHERE path = ?',
+                                (os.path.abspath(zip_path),))
+        return {name: (name, crc, size, json.loads(checked), json.loads(hit)) for name, crc, size, checked, hit in cur}
+
+    def store(self, zip_path: str, crc: Optional[int], row: tuple, members: Optional[List[MemberRecord]] = None):
+        """Record a zip's result row; `members` (if given) replaces its member records."""
+        path = os.path.abspath(zip_path)
+        st = os.stat(zip_path)
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO traces VALUES (?, ?, ?, ?, ?)',
+                              (path, st.st_size, st.st_mtime_ns, crc, json.dumps(row)))
+            if members is not None:
+                self.conn.execute('DELETE FROM members WHERE path = ?', (path,))
+                self.conn.executemany('INSERT INTO members VALUES (?, ?, ?, ?, ?, ?)',
+                                      [(path, name, mcrc, size, json.dumps(checked), json.dumps(hit))
+                                       for name, mcrc, size, checked, hit in members])
+
+    def prune(self, root: str, keep: Set[str]):
+        """Forget traces under root that are not in `keep` (zip paths seen by this run)."""
+        prefix = os.path.join(os.path.abspath(root), '')
+        keep = {os.path.abspath(p) for p in keep}
+        stale = [(path,) for path, in self.conn.execute('SELECT path FROM traces') if path.startswith(prefix) and path not in keep]
+        with self.conn:
+            self.conn.executemany('DELETE FROM traces WHERE path = ?', stale)
+            self.conn.executemany('DELETE FROM members WHERE path = ?', stale)
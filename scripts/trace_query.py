@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Trace query CLI
+
+Searches Playwright trace zips for any number of literal patterns and regexes and streams every
+match as NDJSON, with lines of context:
+
+    python scripts/trace_query.py tmp-ci-artifacts/ -e /api/test/set-test-user -e __ssr_probe \\
+        -r 'CI: SSR (initialUser|PROBE)' -C 2 > matches.ndjson
+
+Paths are zips or directories (searched recursively for *.zip, in sorted order). Records:
+
+    {"type": "match", "zip", "member", "line" (1-based), "column" (byte), "offset" (byte),
+     "pattern", "text", "before": [...], "after": [...]}
+    {"type": "error", "zip", "error"}            unreadable or corrupt zip; the query goes on
+    {"type": "summary", "zips", "members", "matches"}
+
+The summary counts every member opened and match written, including those of a zip that failed
+partway (its error record follows its matches).
+
+Members are streamed in blocks of whole lines (trace_scan.iter_line_blocks) and never held whole;
+binary members are skipped unless --include-binary. Literals are matched case-insensitively by
+default (--case-sensitive to change that, for regexes too). Line offsets are computed once per
+block that has a match, and context lines that fall in a neighbouring block are carried over from
+the previous block or filled in from the next, so no line is split or searched twice. A regex
+matches within a block of whole lines; anchor it to one line if it could span several.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import zipfile
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from trace_scan import CHUNK_SIZE, SignalMatcher, iter_chunks, iter_line_blocks  # noqa: E402
+
+
+DEFAULT_CONTEXT = 3
+
+
+def iter_zip_paths(paths: Iterable[str]) -> Iterator[str]:
+    """Zips named directly, then every *.zip under each directory, in sorted order."""
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for fn in sorted(filenames):
+                    if fn.endswith('.zip'):
+                        yield os.path.join(dirpath, fn)
+        else:
+            yield path
+
+
+class TraceQuery:
+    def __init__(self, patterns: Sequence[str] = (), regexes: Sequence[str] = (), context: int = DEFAULT_CONTEXT,
+                 ignore_case: bool = True, include_binary: bool = False, max_count: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE):
+        if not patterns and not regexes:
+            raise ValueError('no patterns')
+        self.matcher = SignalMatcher(patterns, ignore_case) if patterns else None
+        flags = re.IGNORECASE if ignore_case else 0
+        self.regexes = [(r, re.compile(r.encode('utf-8'), flags)) for r in regexes]
+        self.context = context
+        self.include_binary = include_binary
+        self.max_count = max_count
+        self.chunk_size = chunk_size
+
+    def _hits(self, block: bytes) -> List[tuple]:
+        """(offset, pattern) of every match in a block, by offset."""
+        hits = [] if self.matcher is None else list(self.matcher.finditer(block))
+        for source, regex in self.regexes:
+            hits.extend((m.start(), source) for m in regex.finditer(block))
+        if self.regexes:
+            hits.sort(key=lambda h: h[0])
+        return hits
+
+    def query_member(self, chunks: Iterable[bytes]) -> Iterator[Dict]:
+        """Match records (without zip/member) for one member's chunks, in offset order."""
+        context = self.context
+        before: deque = deque(maxlen=context)  # last lines of the previous blocks
+        pending: List[Dict] = []  # records still waiting for after-context lines
+        line_base = 0
+        count = 0
+        for offset, block in iter_line_blocks(chunks):
+            hits = self._hits(block)
+            if self.max_count is not None:
+                hits = hits[:self.max_count - count]
+            if not hits and not pending:
+                if context:
+                    before.extend(_last_lines(block, context))
+                line_base += block.count(b'\n') + (not block.endswith(b'\n'))
+                continue
+            lines = block.split(b'\n')
+            if block.endswith(b'\n'):
+                lines.pop()
+            text = [None] * len(lines)  # decoded on demand
+
+            def line(k):
+                if text[k] is None:
+                    text[k] = lines[k].decode('utf-8', errors='ignore')
+                return text[k]
+
+            for rec in pending:
+                need = context - len(rec['after'])
+                rec['after'].extend(line(k) for k in range(min(need, len(lines))))
+            if hits:
+                starts = [0]
+                for ln in lines:
+                    starts.append(starts[-1] + len(ln) + 1)
+                for off, pattern in hits:
+                    k = bisect_right(starts, off) - 1
+                    prior = [line(j) for j in range(max(0, k - context), k)]
+                    if len(prior) < context:
+                        prior = [b.decode('utf-8', errors='ignore') for b in before][len(prior) - context:] + prior
+                    pending.append({'type': 'match', 'line': line_base + k + 1, 'column': off - starts[k],
+                                    'offset': offset + off, 'pattern': pattern, 'text': line(k), 'before': prior,
+                                    'after': [line(j) for j in range(k + 1, min(len(lines), k + 1 + context))]})
+                count += len(hits)
+            while pending and len(pending[0]['after']) == context:
+                yield pending.pop(0)
+            if context:
+                before.extend(lines[-context:])
+            line_base += len(lines)
+            if self.max_count is not None and count >= self.max_count:
+                break
+        yield from pending
+
+    def query_zip(self, zip_path: str) -> Iterator[Dict]:
+        """For every member of a zip, a {'type': 'member'} record followed by its match records."""
+        with zipfile.ZipFile(zip_path) as z:
+            for name in z.namelist():
+                yield {'type': 'member', 'zip': zip_path, 'member': name}
+                chunks = iter_chunks(z, name, self.chunk_size, skip_binary=not self.include_binary)
+                for rec in self.query_member(chunks):
+                    yield {'type': rec.pop('type'), 'zip': zip_path, 'member': name, **rec}
+
+    def run(self, paths: Iterable[str], out) -> Dict:
+        """Write NDJSON records for every zip under paths to `out`; returns the summary record."""
+        summary = {'type': 'summary', 'zips': 0, 'members': 0, 'matches': 0}
+        for zip_path in iter_zip_paths(paths):
+            summary['zips'] += 1
+            try:
+                for rec in self.query_zip(zip_path):
+                    if rec['type'] == 'member':
+                        summary['members'] += 1
+                        continue
+                    summary['matches'] += 1
+                    out.write(json.dumps(rec, ensure_ascii=False) + '\n')
+            except (OSError, zipfile.BadZipFile) as e:
+                out.write(json.dumps({'type': 'error', 'zip': zip_path, 'error': str(e)}) + '\n')
+        out.write(json.dumps(summary) + '\n')
+        return summary
+
+
+def _last_lines(block: bytes, n: int) -> List[bytes]:
+    lines = block.rsplit(b'\n', n + 1)
+    if block.endswith(b'\n'):
+        lines.pop()
+    return lines[-n:]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Search trace zips and stream matches as NDJSON')
+    parser.add_argument('paths', nargs='+', help='trace zips or directories holding them')
+    parser.add_argument('-e', '--pattern', action='append', default=[], help='literal pattern (repeatable)')
+    parser.add_argument('-r', '--regex', action='append', default=[], help='regular expression (repeatable)')
+    parser.add_argument('-C', '--context', type=int, default=DEFAULT_CONTEXT,
+                        help=f'lines of context before and after each match (default {DEFAULT_CONTEXT})')
+    parser.add_argument('--case-sensitive', action='store_true', help='match patterns and regexes case-sensitively')
+    parser.add_argument('--include-binary', action='store_true', help='also search members that look binary')
+    parser.add_argument('--max-count', type=int, help='stop after this many matches per member')
+    args = parser.parse_args(argv)
+    if not args.pattern and not args.regex:
+        parser.error('give at least one -e PATTERN or -r REGEX')
+    query = TraceQuery(args.pattern, args.regex, context=args.context, ignore_case=not args.case_sensitive,
+                       include_binary=args.include_binary, max_count=args.max_count)
+    query.run(args.paths, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
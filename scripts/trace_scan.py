@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Trace scanning engine
+
+The Playwright trace scripts (scan_traces.py, scan_traces_ci.py, inspect_trace.py,
+inspect_c273c.py) look for a handful of signatures in every member of a trace.zip. They used to run
+one `in` test per keyword and call `data.lower()` again for every case-insensitive one, and kept
+testing every keyword even after the answer was known.
+
+Here a member is case-folded once and every needle is looked up in that copy with str.find, which
+runs in C. A single combined regex would make one pass instead, but CPython's re does not build an
+automaton for alternations: on a 34 MB member an 11-needle IGNORECASE alternation took 4.4 s, the
+fold plus 11 finds 0.25 s. What the engine saves instead is work:
+
+- needles are searched lazily, only while a signal still depends on them; a signal stops at its
+  first matching alternative, and an alternative at its first missing needle;
+- a needle containing another needle that is already known to be missing is not searched;
+- SignalScanner.scan_zip stops reading a trace once every signal is hit.
+
+Members are never read whole. iter_members opens each with ZipFile.open and yields decompressed
+chunks of CHUNK_SIZE bytes; the *_stream methods search each chunk with the last
+len(longest needle) - 1 bytes of the previous one prepended, so a match that straddles a chunk
+boundary is still seen, once. Members that are binary by extension (screenshots, fonts, media) are
+skipped without being opened, and others whose first chunk sniffs as binary (magic number or a NUL
+byte) after one chunk. Memory per member is about two chunks whatever its size.
+"""
+import os
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+
+Text = Union[str, bytes]
+
+CHUNK_SIZE = 1 << 20
+BINARY_EXTENSIONS = frozenset(('.png', '.jpg', '.jpeg', '.gif', '.webp', '.bmp', '.ico', '.avif', '.woff', '.woff2',
+                               '.ttf', '.otf', '.eot', '.mp4', '.webm', '.ogg', '.mp3', '.wav', '.zip', '.gz', '.br',
+                               '.wasm', '.pdf'))
+BINARY_MAGIC = (b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'RIFF', b'wOFF', b'wOF2', b'\x1aE\xdf\xa3', b'PK\x03\x04',
+                b'\x1f\x8b', b'%PDF', b'\x00asm')
+SNIFF_BYTES = 1024
+
+
+class SignalMatcher:
+    """Case-insensitive multi-needle search over one folded copy of the text.
+
+    bytes are folded with bytes.lower(), which only folds ASCII, so needles used on bytes should
+    be ASCII.
+    """
+
+    def __init__(self, needles: Iterable[str], ignore_case: bool = True):
+        self.needles: Tuple[str, ...] = tuple(dict.fromkeys(needles))
+        if not all(self.needles):
+            raise ValueError('empty needle')
+        self.ignore_case = ignore_case
+        folded = [n.lower() if ignore_case else n for n in self.needles]
+        self._keys = {str: folded, bytes: [f.encode('utf-8') for f in folded]}
+        self._index = {n: i for i, n in enumerate(self.needles)}
+        # needles contained in each needle: if one of them is missing, so is the needle
+        self._contains = [[j for j, g in enumerate(folded) if j != i and g in f] for i, f in enumerate(folded)]
+        # bytes carried over between chunks: enough for any needle to straddle the boundary
+        self._overlap = max(len(k) for k in self._keys[bytes]) - 1 if folded else 0
+
+    def search(self, text: Text) -> 'Search':
+        """Lazy lookups of the needles in text (folded once, here)."""
+        return Search(self, text.lower() if self.ignore_case else text)
+
+    def find(self, text: Text, needles: Iterable[str] = None) -> Dict[str, int]:
+        """Offset of the first occurrence of every needle (of `needles`, default all) found in text."""
+        search = self.search(text)
+        found = {}
+        for n in sorted(self.needles if needles is None else needles, key=len):
+            off = search.offset(n)
+            if off >= 0:
+                found[n] = off
+        return found
+
+    def finditer(self, text: Text) -> Iterator[Tuple[int, str]]:
+        """Every occurrence as (offset, needle), by offset (needles at one offset longest first)."""
+        search = self.search(text)
+        hits = []
+        for i, n in enumerate(self.needles):
+            key = self._keys[type(text)][i]
+            off = search.offset(n)
+            while off >= 0:
+                hits.append((off, -len(key), i))
+                off = search.folded.find(key, off + 1)
+        hits.sort()
+        return ((off, self.needles[i]) for off, _, i in hits)
+
+    def _windows(self, chunks: Iterable[bytes]) -> Iterator[Tuple[int, bytes, int]]:
+        """(offset, window, limit) per chunk; window is the chunk behind the previous overlap.
+
+        Every match starting before `limit` lies entirely in this window, and every match
+        starting at or after it is seen again in the next one (the last window has no limit).
+        """
+        it = iter(chunks)
+        tail, base = b'', 0
+        chunk = next(it, None)
+        while chunk is not None:
+            following = next(it, None)
+            window = tail + chunk if tail else chunk
+            limit = len(window) if following is None else max(len(window) - self._overlap, 0)
+            yield base, window, limit
+            tail, base, chunk = window[limit:], base + limit, following
+
+    def find_stream(self, chunks: Iterable[bytes], needles: Iterable[str] = None) -> Dict[str, int]:
+        """find() over a stream of byte chunks; offsets count bytes from the start of the stream."""
+        remaining = sorted(self.needles if needles is None else needles, key=len)
+        found: Dict[str, int] = {}
+        for base, window, _ in self._windows(chunks):
+            search = self.search(window)
+            for n in remaining:
+                off = search.offset(n)
+                if off >= 0:
+                    found[n] = base + off
+            remaining = [n for n in remaining if n not in found]
+            if not remaining:
+                break
+        return found
+
+    def finditer_stream(self, chunks: Iterable[bytes]) -> Iterator[Tuple[int, str]]:
+        """finditer() over a stream of byte chunks, each occurrence reported once."""
+        for base, window, limit in self._windows(chunks):
+            for off, n in self.finditer(window):
+                if off >= limit:
+                    break
+                yield base + off, n
+
+
+class Search:
+    """One text under a SignalMatcher: first offsets, looked up on demand and memoized."""
+
+    def __init__(self, matcher: SignalMatcher, folded: Text):
+        self.matcher = matcher
+        self.folded = folded
+        self._keys = matcher._keys[type(folded)]
+        self._offsets: Dict[int, int] = {}
+
+    def offset(self, needle: str) -> int:
+        """First offset of needle, or -1."""
+        i = self.matcher._index[needle]
+        off = self._offsets.get(i)
+        if off is None:
+            if any(self._offsets.get(j) == -1 for j in self.matcher._contains[i]):
+                off = -1
+            else:
+                off = self.folded.find(self._keys[i])
+            self._offsets[i] = off
+        return off
+
+
+class SignalScanner:
+    """Named signals over one SignalMatcher.
+
+    `signals` maps a name to its alternatives; a signal is hit in a member when every needle of
+    one alternative appears in it, e.g. {'fallback': [('/api/test/set-test-user',),
+    ('set-cookie', 'test_user')]}.
+    """
+
+    def __init__(self, signals: Dict[str, Sequence[Sequence[str]]], ignore_case: bool = True):
+        self.signals = {name: [tuple(alt) for alt in alts] for name, alts in signals.items()}
+        self.matcher = SignalMatcher((s for alts in self.signals.values() for alt in alts for s in alt), ignore_case)
+
+    def scan(self, text: Text, signals: Optional[Iterable[str]] = None) -> Set[str]:
+        """Names of the signals (of `signals`, default all) hit in text."""
+        search = self.matcher.search(text)
+        return {name for name in (self.signals if signals is None else signals)
+                if any(all(search.offset(n) >= 0 for n in alt) for alt in self.signals[name])}
+
+    def scan_stream(self, chunks: Iterable[bytes], signals: Optional[Iterable[str]] = None) -> Set[str]:
+        """scan() over a stream of byte chunks; stops reading once every signal is hit."""
+        names = list(self.signals if signals is None else signals)
+        found: Set[str] = set()
+        hit: Set[str] = set()
+        for _, window, _ in self.matcher._windows(chunks):
+            search = self.matcher.search(window)
+            found.update(n for name in names if name not in hit for alt in self.signals[name] for n in alt
+                         if n not in found and search.offset(n) >= 0)
+            hit.update(name for name in names if any(all(n in found for n in alt) for alt in self.signals[name]))
+            if len(hit) == len(names):
+                break
+        return hit
+
+    def scan_zip(self, zip_path: str) -> Set[str]:
+        """Signals hit by any member of a zip; stops reading once all are hit."""
+        hit: Set[str] = set()
+        for _, chunks in iter_members(zip_path):
+            hit |= self.scan_stream(chunks, [name for name in self.signals if name not in hit])
+            if len(hit) == len(self.signals):
+                break
+        return hit
+
+
+def is_binary(name: str, head: bytes = b'') -> bool:
+    """Whether a member is binary, by extension or by sniffing its first bytes."""
+    if os.path.splitext(name)[1].lower() in BINARY_EXTENSIONS:
+        return True
+    return head.startswith(BINARY_MAGIC) or b'\x00' in head[:SNIFF_BYTES]
+
+
+def iter_chunks(z: zipfile.ZipFile, name: str, chunk_size: int = CHUNK_SIZE,
+                skip_binary: bool = True) -> Iterator[bytes]:
+    """Decompressed chunks of one member; nothing for binary members.
+
+    A member that fails to decompress (bad CRC, unsupported method) ends its stream at the error;
+    the chunks already yielded stand.
+    """
+    if skip_binary and is_binary(name):
+        return
+    try:
+        with z.open(name) as f:
+            chunk = f.read(chunk_size)
+            if skip_binary and is_binary(name, chunk):
+                return
+            while chunk:
+                yield chunk
+                chunk = f.read(chunk_size)
+    except Exception:
+        return
+
+
+def iter_members(zip_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, Iterator[bytes]]]:
+    """(name, chunks) for every member; binary members yield no chunks."""
+    with zipfile.ZipFile(zip_path) as z:
+        for name in z.namelist():
+            yield name, iter_chunks(z, name, chunk_size)
+
+
+def read_spans(chunks: Iterable[bytes], spans: Sequence[Tuple[int, int]]) -> List[bytes]:
+    """The bytes of each (start, end) span of a stream, for spans sorted by start."""
+    pieces: List[List[bytes]] = [[] for _ in spans]
+    base = 0
+    first = 0
+    for chunk in chunks:
+        top = base + len(chunk)
+        while first < len(spans) and spans[first][1] <= base:
+            first += 1
+        for k in range(first, len(spans)):
+            start, end = spans[k]
+            if start >= top:
+                break
+            if end > base:
+                pieces[k].append(chunk[max(start - base, 0):end - base])
+        base = top
+        if first == len(spans):
+            break
+    return [b''.join(p) for p in pieces]
+
+
+def iter_line_blocks(chunks: Iterable[bytes]) -> Iterator[Tuple[int, bytes]]:
+    """(offset, block) runs of whole lines; a chunk's unfinished last line moves to the next block."""
+    rest, base = b'', 0
+    for chunk in chunks:
+        block = rest + chunk if rest else chunk
+        cut = block.rfind(b'\n') + 1
+        if cut:
+            yield base, block[:cut]
+        rest, base = block[cut:], base + cut
+    if rest:
+        yield base, rest
@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
 """Simple validator for parser output using the JSON Schema in docs/parser-output.schema.json
 
-Usage: python scripts/validate_parser_output.py <findings.json>
+Usage: python scripts/validate_parser_output.py <findings.json> [<findings.json> ...]
+                                                [--stream] [--max-errors N] [--jobs N]
+
+Several files are validated in one process with a single compiled validator; findings are first
+checked by a fast predicate compiled from the schema and only failures go through jsonschema for
+detailed messages. --stream validates findings one at a time as they are read (the document is
+never fully loaded) and reports each error under the finding's own path; --max-errors stops a
+file early; --jobs fans files out across a process pool (each worker compiles the schema once).
 """
+import argparse
+import functools
 import json
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
 
 try:
     from jsonschema import Draft7Validator
@@ -13,6 +24,10 @@ except Exception:
     print("Missing dependency 'jsonschema'. Install with: python -m pip install -r requirements.txt", file=sys.stderr)
     sys.exit(2)
 
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+
+from sequencer_runner import iter_findings  # noqa: E402
+
 
 def load_schema():
     here = os.path.abspath(os.path.dirname(__file__))
@@ -26,31 +41,228 @@ def load_schema():
         return json.load(fh)
 
 
-def main():
-    if len(sys.argv) != 2:
-        print("Usage: python scripts/validate_parser_output.py <findings.json>")
-        sys.exit(2)
+@functools.lru_cache(maxsize=None)
+def compiled_validators():
+    """Return (document validator, single-finding validator), built once per process."""
+    schema = load_schema()
+    Draft7Validator.check_schema(schema)
+    finding = {'$ref': '#/definitions/finding', 'definitions': schema['definitions']}
+    return Draft7Validator(schema), Draft7Validator(finding)
 
-    path = sys.argv[1]
-    if not os.path.exists(path):
-        print(f"File not found: {path}", file=sys.stderr)
-        sys.exit(2)
 
-    with open(path, 'r', encoding='utf-8') as fh:
-        data = json.load(fh)
+# --- fast path ------------------------------------------------------------------------------
+# The findings schema only uses a handful of keywords (type, enum, minimum/maximum, items, anyOf,
+# properties/required, local $ref, oneOf). compile_fast_check() turns such a schema into nested
+# closures that answer "valid or not" an order of magnitude faster than Draft7Validator; only
+# instances it rejects are re-run through jsonschema to produce the detailed messages. A schema
+# using any other keyword compiles to None and validation stays on the generic path.
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+_TYPE_CHECKS = {
+    'string': lambda v: isinstance(v, str),
+    # draft 7: integral floats such as 1.0 are integers, booleans are not
+    'integer': lambda v: (isinstance(v, int) and not isinstance(v, bool)) or (isinstance(v, float) and v.is_integer()),
+    'number': _is_number,
+    'object': lambda v: isinstance(v, dict),
+    'array': lambda v: isinstance(v, list),
+    'boolean': lambda v: isinstance(v, bool),
+    'null': lambda v: v is None,
+}
+_ANNOTATIONS = {'$schema', 'definitions', 'description', 'title', '$comment', 'examples', 'default'}
+_FAST_KEYWORDS = {'type', 'enum', 'minimum', 'maximum', 'items', 'anyOf', 'oneOf', 'properties',
+                  'required', 'additionalProperties', '$ref'} | _ANNOTATIONS
+
+
+def _always(v) -> bool:
+    return True
+
+
+def compile_fast_check(schema, root=None):
+    """Compile a (sub)schema to a predicate, or None if it uses unsupported keywords."""
+    root = schema if root is None else root
+    if schema is True or schema == {}:
+        return _always
+    if not isinstance(schema, dict) or set(schema) - _FAST_KEYWORDS:
+        return None
+    if '$ref' in schema:
+        ref = schema['$ref']
+        if not ref.startswith('#/'):
+            return None
+        target = root
+        for part in ref[2:].split('/'):
+            if not isinstance(target, dict) or part not in target:
+                return None
+            target = target[part]
+        return compile_fast_check(target, root)
+
+    checks = []
+    if 'type' in schema:
+        type_check = _TYPE_CHECKS.get(schema['type']) if isinstance(schema['type'], str) else None
+        if type_check is None:
+            return None
+        checks.append(type_check)
+    if 'enum' in schema:
+        if not all(isinstance(x, str) for x in schema['enum']):
+            return None
+        allowed = frozenset(schema['enum'])
+        checks.append(lambda v: isinstance(v, str) and v in allowed)
+    if 'minimum' in schema:
+        lo = schema['minimum']
+        checks.append(lambda v: not _is_number(v) or v >= lo)
+    if 'maximum' in schema:
+        hi = schema['maximum']
+        checks.append(lambda v: not _is_number(v) or v <= hi)
+    for keyword in ('anyOf', 'oneOf'):
+        if keyword in schema:
+            subs = [compile_fast_check(sub, root) for sub in schema[keyword]]
+            if any(sub is None for sub in subs):
+                return None
+            if keyword == 'anyOf':
+                checks.append(lambda v, subs=subs: any(sub(v) for sub in subs))
+            else:
+                checks.append(lambda v, subs=subs: sum(1 for sub in subs if sub(v)) == 1)
+    if 'items' in schema:
+        item = compile_fast_check(schema['items'], root)
+        if item is None or isinstance(schema['items'], list):
+            return None
+        checks.append(lambda v: not isinstance(v, list) or all(item(x) for x in v))
+    if 'properties' in schema or 'required' in schema or 'additionalProperties' in schema:
+        if schema.get('additionalProperties', True) is not True:
+            return None
+        props = {}
+        for name, sub in schema.get('properties', {}).items():
+            c = compile_fast_check(sub, root)
+            if c is None:
+                return None
+            if c is not _always:
+                props[name] = c
+        required = tuple(schema.get('required', ()))
+
+        def check_object(v):
+            if not isinstance(v, dict):
+                return True
+            for name in required:
+                if name not in v:
+                    return False
+            for name, value in v.items():
+                c = props.get(name)
+                if c is not None and not c(value):
+                    return False
+            return True
+        checks.append(check_object)
 
+    if not checks:
+        return _always
+    if len(checks) == 1:
+        return checks[0]
+    return lambda v: all(c(v) for c in checks)
+
+
+@functools.lru_cache(maxsize=None)
+def fast_checks():
+    """Return (document check, single-finding check); either may be None (use jsonschema)."""
     schema = load_schema()
-    validator = Draft7Validator(schema)
-    errors = sorted(validator.iter_errors(data), key=lambda e: e.path)
-
-    if errors:
-        print("Validation failed:")
-        for e in errors:
-            path = ".".join(str(p) for p in e.path) or "<root>"
-            print(f"- {path}: {e.message}")
+    return compile_fast_check(schema), compile_fast_check({'$ref': '#/definitions/finding'}, schema)
+
+
+def _format_path(prefix, path) -> str:
+    return ".".join(str(p) for p in list(prefix) + list(path)) or "<root>"
+
+
+def validate_file(path: str, stream: bool = False, max_errors: Optional[int] = None) -> Dict:
+    """Validate one findings file; returns {'path', 'findings', 'errors': [(location, message)], 'truncated'}."""
+    result = {'path': path, 'findings': None, 'errors': [], 'truncated': False}
+    errors = result['errors']
+    if not os.path.exists(path):
+        errors.append(('<root>', f'File not found: {path}'))
+        return result
+    document_validator, finding_validator = compiled_validators()
+    document_ok, finding_ok = fast_checks()
+
+    if not stream:
+        try:
+            with open(path, 'r', encoding='utf-8') as fh:
+                data = json.load(fh)
+        except ValueError as e:
+            errors.append(('<root>', f'Invalid JSON: {e}'))
+            return result
+        arr = data.get('findings') if isinstance(data, dict) else data
+        result['findings'] = len(arr) if isinstance(arr, list) else None
+        if document_ok is not None and document_ok(data):
+            return result
+        found = []
+        for e in document_validator.iter_errors(data):
+            if max_errors is not None and len(found) >= max_errors:
+                result['truncated'] = True
+                break
+            found.append(e)
+        found.sort(key=lambda e: e.path)
+        errors.extend((_format_path((), e.path), e.message) for e in found)
+        return result
+
+    # errors are reported under the finding's own path: <i> for a list, findings.<i> when wrapped,
+    # <i> (0-based record number) for NDJSON
+    count = 0
+    layout = {}
+    try:
+        for finding in iter_findings(path, layout=layout):
+            if finding_ok is not None and finding_ok(finding):
+                count += 1
+                continue
+            prefix = ['findings', count] if layout.get('shape') == 'wrapped' else [count]
+            for e in finding_validator.iter_errors(finding):
+                if max_errors is not None and len(errors) >= max_errors:
+                    result['truncated'] = True
+                    result['findings'] = count + 1
+                    return result
+                errors.append((_format_path(prefix, e.path), e.message))
+            count += 1
+    except ValueError as e:
+        errors.append(('<root>', str(e)))
+    result['findings'] = count
+    return result
+
+
+def validate_files(paths: List[str], stream: bool = False, max_errors: Optional[int] = None,
+                   jobs: int = 1) -> List[Dict]:
+    """Validate many files; jobs > 1 fans them out over a process pool (results keep input order)."""
+    if jobs > 1 and len(paths) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            return list(pool.map(validate_file, paths, [stream] * len(paths), [max_errors] * len(paths)))
+    return [validate_file(p, stream, max_errors) for p in paths]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Validate parser output against docs/parser-output.schema.json')
+    parser.add_argument('paths', nargs='+', metavar='findings.json')
+    parser.add_argument('--stream', action='store_true', help='Validate findings one at a time while reading the file')
+    parser.add_argument('--max-errors', type=int, help='Stop validating a file after this many errors')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='Validate files in this many worker processes')
+    args = parser.parse_args(argv)
+
+    if len(args.paths) == 1 and not os.path.exists(args.paths[0]):
+        print(f"File not found: {args.paths[0]}", file=sys.stderr)
+        sys.exit(2)
+
+    results = validate_files(args.paths, stream=args.stream, max_errors=args.max_errors, jobs=args.jobs)
+    failed = [r for r in results if r['errors']]
+    single = len(results) == 1
+    for r in results:
+        if r['errors']:
+            print("Validation failed:" if single else f"Validation failed: {r['path']}")
+            for loc, message in r['errors']:
+                print(f"- {loc}: {message}")
+            if r['truncated']:
+                print(f"- (stopped after {len(r['errors'])} errors)")
+        elif not single:
+            print(f"OK: {r['path']} ({r['findings']} findings)")
+    if failed:
         sys.exit(1)
 
-    print("OK: parser output is valid")
+    print("OK: parser output is valid" if single else f"OK: {len(results)} files valid")
 
 
 if __name__ == '__main__':